@@ -0,0 +1,187 @@
+#####Asyncio interface to the GEE* functions
+
+"""
+Async versions of the GEE* functions for asyncio applications
+
+Every GEE* function blocks while it initializes Earth Engine, requests metadata
+with getInfo and starts its export tasks, which freezes an event loop. This module
+runs them in a bounded thread pool (at most defaultWorkers blocking calls at once,
+the others wait their turn) and awaits the export tasks by polling their status
+from the event loop, with asyncio.sleep between polls, so hundreds of extraction
+jobs can be in flight from one process without holding a thread each.
+
+aio.GEEgridmetPtsAvg(...) takes the same parameters as downloadData.GEEgridmetPtsAvg
+and returns what it returns (the list of tasks, or a DataFrame with mode = 'direct').
+
+Example:
+
+    import asyncio
+    from geedataextract import aio
+
+    async def main():
+        jobs = [aio.GEEgridmetPtsAvg('pts', ['tmin'], yr, yr, 'month', 0, 0, 'me', 'gridmet')
+                for yr in range(1980, 2020)]
+        tasks = [t for ts in await asyncio.gather(*jobs) for t in ts]
+        return await aio.waitTasks(tasks)
+
+    states = asyncio.run(main())
+
+(asyncio.run needs Python 3.7; on older versions use
+asyncio.get_event_loop().run_until_complete(main()).)
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from geedataextract import downloadData
+from geedataextract import taskScheduler
+
+#maximum number of blocking Earth Engine calls running at once
+defaultWorkers = 32
+
+#seconds between status polls: initial interval, maximum interval and factor applied while nothing changes
+pollInterval = 10
+maxInterval = 300
+backoff = 2
+
+sharedExecutor = [None]
+executorLock = threading.Lock()
+
+def getExecutor():
+    """
+    Returns the thread pool that runs the blocking calls, created with defaultWorkers threads on first use
+    """
+    with executorLock:
+        if sharedExecutor[0] is None:
+            sharedExecutor[0] = ThreadPoolExecutor(max_workers = defaultWorkers)
+        return sharedExecutor[0]
+
+def setExecutor(executor):
+    """
+    Replaces the thread pool that runs the blocking calls, e.g. with ThreadPoolExecutor(max_workers = 8)
+    """
+    with executorLock:
+        sharedExecutor[0] = executor
+
+async def run(fn, *args, **kwargs):
+    """
+    Runs the blocking call fn(*args, **kwargs) in the thread pool and returns its result
+    """
+    #get_running_loop is Python 3.7+; in a coroutine, get_event_loop returns the same loop on 3.5/3.6
+    loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)()
+    return await loop.run_in_executor(getExecutor(), functools.partial(fn, *args, **kwargs))
+
+def asyncVersion(fn):
+    """
+    Returns a coroutine function that runs fn in the thread pool
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+
+    wrapper.__doc__ = 'Async version of downloadData.' + fn.__name__ + '\n' + (fn.__doc__ or '')
+
+    return wrapper
+
+GEEtcPts = asyncVersion(downloadData.GEEtcPts)
+GEEicPts = asyncVersion(downloadData.GEEicPts)
+GEElcPts = asyncVersion(downloadData.GEElcPts)
+GEEsoilPts = asyncVersion(downloadData.GEEsoilPts)
+GEEtopoPts = asyncVersion(downloadData.GEEtopoPts)
+GEEgridmetPtsAvg = asyncVersion(downloadData.GEEgridmetPtsAvg)
+GEEgridmetPtsSum = asyncVersion(downloadData.GEEgridmetPtsSum)
+GEEphenMODIS = asyncVersion(downloadData.GEEphenMODIS)
+GEEviLandsat = asyncVersion(downloadData.GEEviLandsat)
+GEElaiMODIS = asyncVersion(downloadData.GEElaiMODIS)
+GEElstMODIS = asyncVersion(downloadData.GEElstMODIS)
+GEEviMODIS = asyncVersion(downloadData.GEEviMODIS)
+GEEsmos = asyncVersion(downloadData.GEEsmos)
+GEEterraClimatePtsAvgMonth = asyncVersion(downloadData.GEEterraClimatePtsAvgMonth)
+GEEnasaNEXGDDP = asyncVersion(downloadData.GEEnasaNEXGDDP)
+GEEmonthTRMM = asyncVersion(downloadData.GEEmonthTRMM)
+GEEprismPtsAvgMonth = asyncVersion(downloadData.GEEprismPtsAvgMonth)
+GEEmacaGCMs = asyncVersion(downloadData.GEEmacaGCMs)
+GEEetMODIS = asyncVersion(downloadData.GEEetMODIS)
+GEEcollectionPts = asyncVersion(downloadData.GEEcollectionPts)
+
+def taskDescription(task):
+    """
+    Returns the export description of a task, TaskHandle or CachedResult
+    """
+    if hasattr(task, 'description'):
+        return task.description
+    return getattr(task, 'config', {}).get('description', task.id)
+
+async def taskState(task):
+    """
+    Returns the state of a started ee.batch.Task, or None if its status could not be requested
+    """
+    try:
+        return (await run(task.status)).get('state')
+    except Exception:
+        #network error: ask again at the next poll
+        return None
+
+async def waitTasks(tasks, scheduler = None, timeout = None):
+    """
+    Awaits the export tasks returned by the GEE* functions, without blocking the event loop
+
+    Requires:
+
+    tasks - list of ee.batch.Task, taskScheduler.TaskHandle or resultCache.CachedResult
+
+    Optional parameters
+
+    scheduler - the taskScheduler.TaskScheduler the tasks were submitted to, polled in the thread pool
+        so that it starts queued tasks and restarts transient failures. Default: None
+
+    timeout - maximum number of seconds to wait. Default: None (no limit)
+
+    The status of all running tasks is requested concurrently, pollInterval seconds apart; the interval
+    is multiplied by backoff (up to maxInterval) while no task changes state.
+
+    Returns a dictionary of export description -> state.
+    """
+    start = time.time()
+    interval = pollInterval
+
+    state_d = {}
+    running = []
+    for task in tasks:
+        if hasattr(task, 'done'):
+            #TaskHandle (updated by the scheduler) or CachedResult
+            state_d[taskDescription(task)] = task.state
+        else:
+            state_d[taskDescription(task)] = 'READY'
+            running.append(task)
+
+    while True:
+        if scheduler is not None:
+            await run(scheduler.poll)
+
+        states = await asyncio.gather(*[taskState(task) for task in running])
+
+        changed = False
+        for task, state in zip(running, states):
+            if state is not None and state != state_d[taskDescription(task)]:
+                state_d[taskDescription(task)] = state
+                changed = True
+        for task in tasks:
+            if hasattr(task, 'done') and task.state != state_d[taskDescription(task)]:
+                state_d[taskDescription(task)] = task.state
+                changed = True
+
+        running = [task for task in running if state_d[taskDescription(task)] not in taskScheduler.doneStates]
+        if not running and all([t.done() for t in tasks if hasattr(t, 'done')]):
+            break
+
+        interval = pollInterval if changed else min(interval * backoff, maxInterval)
+        if timeout is not None and time.time() - start + interval > timeout:
+            break
+
+        await asyncio.sleep(interval)
+
+    return state_d
@@ -0,0 +1,184 @@
+#####Collection metadata cache for the GEE* functions
+
+"""
+Persistent cache of image collection metadata shared by all GEE* functions
+
+Several functions need the date range of a collection before they can build
+their time-series. Probing it with sort(...).first().getInfo() sorts the whole
+collection and costs one blocking request per end, per sensor or metric. The
+cache stores, for each dataset id, the system:index of the first and last images
+and the band names, in a JSON file that is reused until the entry is older than ttl.
+Datasets missing from the cache are fetched together in a single request.
+
+Example:
+
+    from geedataextract import collectionCache
+
+    #keep entries for a week
+    collectionCache.setCache(collectionCache.CollectionCache(ttl = 7*86400))
+
+    #forget everything, e.g. after new images were added to a collection
+    collectionCache.getCache().clear()
+"""
+
+import json
+import os
+import threading
+import time
+
+#default location of the cache file and time (seconds) after which an entry is fetched again
+cacheFile = os.path.join(os.path.expanduser('~'), '.geedataextract', 'collections.json')
+ttl = 86400
+
+class CollectionCache(object):
+    """
+    Cache of dataset id -> {'firstIndex', 'lastIndex', 'bands', 'time'}
+
+    Optional parameters
+
+    path - JSON file the cache is stored in. If None, the cache is only kept in memory. Default: cacheFile
+
+    ttl - number of seconds an entry is used before it is fetched again. Default: ttl (one day)
+    """
+
+    def __init__(self, path = cacheFile, ttl = ttl):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """
+        Reads the cache file, if it exists
+        """
+        self.entries = {}
+
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except ValueError:
+            #corrupt cache file: start again
+            self.entries = {}
+
+    def save(self):
+        """
+        Writes the cache file
+        """
+        if self.path is None:
+            return
+
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent = 1, sort_keys = True)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """
+        Removes every entry from the cache
+        """
+        with self.lock:
+            self.entries = {}
+            self.save()
+
+    def isFresh(self, datasetId):
+        """
+        Returns True if datasetId is cached and younger than ttl
+        """
+        entry = self.entries.get(datasetId)
+        return entry is not None and time.time() - entry['time'] < self.ttl
+
+    def fetch(self, datasetIds):
+        """
+        Fetches the first and last system:index and the band names of every dataset in
+        datasetIds with a single getInfo request, and stores them in the cache
+        """
+        import ee
+
+        def probe(datasetId):
+            col = ee.ImageCollection(datasetId)
+            #limit() with a sort property still orders the collection on the server; the gain is that
+            #both ends and the band names of every dataset come back in one request
+            first = ee.Image(col.limit(1, 'system:time_start', True).first())
+            last = ee.Image(col.limit(1, 'system:time_start', False).first())
+            return ee.List([first.get('system:index'), last.get('system:index'), first.bandNames()])
+
+        infoL = ee.List([probe(datasetId) for datasetId in datasetIds]).getInfo()
+
+        with self.lock:
+            for datasetId, info in zip(datasetIds, infoL):
+                entry = {}
+                entry['firstIndex'] = info[0]
+                entry['lastIndex'] = info[1]
+                entry['bands'] = info[2]
+                entry['time'] = time.time()
+                self.entries[datasetId] = entry
+
+            self.save()
+
+    def getMany(self, datasetIds):
+        """
+        Returns the cache entries of datasetIds, fetching all stale entries in one request
+        """
+        with self.lock:
+            stale = []
+            for datasetId in datasetIds:
+                if not self.isFresh(datasetId) and datasetId not in stale:
+                    stale.append(datasetId)
+
+            if len(stale) > 0:
+                self.fetch(stale)
+
+            return [self.entries[datasetId] for datasetId in datasetIds]
+
+    def get(self, datasetId):
+        """
+        Returns the cache entry of datasetId
+        """
+        return self.getMany([datasetId])[0]
+
+#cache shared by all functions, created on first use
+sharedCache = [None]
+cacheLock = threading.Lock()
+
+def getCache():
+    """
+    Returns the cache shared by all GEE* functions
+    """
+    with cacheLock:
+        if sharedCache[0] is None:
+            sharedCache[0] = CollectionCache()
+        return sharedCache[0]
+
+def setCache(cache):
+    """
+    Replaces the cache shared by all GEE* functions, e.g. to change its path or ttl
+    """
+    with cacheLock:
+        sharedCache[0] = cache
+
+def prefetch(datasetIds):
+    """
+    Makes sure all datasetIds are cached, fetching the missing ones in a single request
+    """
+    getCache().getMany(datasetIds)
+
+def indexRange(datasetId):
+    """
+    Returns the system:index of the first and last images of datasetId
+    """
+    entry = getCache().get(datasetId)
+    return entry['firstIndex'], entry['lastIndex']
+
+def bandNames(datasetId):
+    """
+    Returns the band names of datasetId
+    """
+    return getCache().get(datasetId)['bands']
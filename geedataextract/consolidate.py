@@ -0,0 +1,424 @@
+#####Consolidation of exported CSV tables
+
+"""
+Merges the CSV tables exported by the GEE* functions into one long table
+
+Every export is named after its description (e.g. cm_tmin_2015_2017_pts1.csv or
+projm_NEX_pr_rcp45_CCSM4_2006_2010_ptsB.csv). parseDescription() recovers the
+time step, dataset, metric(s), scenario, model and geometry ('pts1', 'ptsB' or
+'poly1') from that name, and consolidate() streams every table of a folder, one
+row at a time, into a single CSV with the columns
+
+    geeID, startDate, timeStep, dataset, metric, model, scenario, geom, value
+
+Memory use does not depend on the number or size of the tables.
+
+Exports with the suffix '_dn' (deferScale) hold bands in their stored units; their
+values are converted to physical units here, with the scale and offset of the
+dataset in registry.
+
+Example:
+
+    from geedataextract import consolidate
+
+    consolidate.consolidate('~/Google Drive/geeOut', 'all_data.csv')
+"""
+
+import csv
+import datetime
+import glob
+import os
+import re
+
+from geedataextract import extractEngine
+from geedataextract import registry
+
+columns = ['geeID', 'startDate', 'timeStep', 'dataset', 'metric', 'model', 'scenario', 'geom', 'value']
+
+#time step and dataset of each description prefix
+prefix_d = {}
+prefix_d['cd'] = ('day', 'GRIDMET')
+prefix_d['cm'] = ('month', 'GRIDMET')
+prefix_d['cy'] = ('year', 'GRIDMET')
+prefix_d['rl'] = ('lowest', None)
+prefix_d['rm'] = ('month', None)
+prefix_d['ry'] = ('year', None)
+prefix_d['projd'] = ('day', None)
+prefix_d['projm'] = ('month', None)
+prefix_d['projy'] = ('year', None)
+prefix_d['tcy'] = ('month', 'TERRACLIMATE')
+prefix_d['pri'] = ('month', 'PRISM')
+prefix_d['p'] = ('year', None)
+prefix_d['s'] = (None, None)
+prefix_d['f'] = (None, None)
+
+#datasets of static exports named s_<metric>_<dataset> or s_<metric>_<year>
+static_d = {}
+static_d['soil'] = 'soil'
+static_d['topo'] = 'SRTM'
+static_d['sin'] = 'SRTM'
+static_d['cos'] = 'SRTM'
+
+#suffixes added after the geometry suffix (reducers, deferScale, since, chunkSize, timeAsBands) and by google
+#drive to duplicates
+suffixPattern = re.compile(r'(_ptsB|_poly1|_pts1)(_r[A-Za-z0-9-]+)?(_dn)?(_u\d{8})?(_c\d+)?(_tb\d+)?'
+                           r'( \(\d+\))?$')
+
+#columns written by the reducers, which hold the value of the single metric of a table
+valueColumns = list(extractEngine.reducer_d.values())
+
+#other statistics written by combined reducers (reducers), stored as the metric '<metric>_<statistic>'
+statPattern = re.compile(r'^(median|stdDev|variance|min|max|count|p\d+)$')
+
+#wide column written by timeAsBands: YYYYMMdd_band
+widePattern = re.compile(r'^(\d{8})_(.+)$')
+
+#statistic of the metrics that the GEE* functions reduce with another reducer than the mean, by dataset
+defaultStat_d = {}
+defaultStat_d['soil'] = {'subgroupsWorld': 'mode', 'subordersUS': 'mode'}
+defaultStat_d['SRTM'] = {'aspect_sin': 'sum', 'aspect_cos': 'sum'}
+
+def parseDescription(name):
+    """
+    Parses the file name (or description) of an export. Returns None if name does not
+    follow the naming convention of the GEE* functions, otherwise a dictionary with:
+
+    timeStep - 'day', 'month', 'year', 'lowest' or None for static data
+
+    dataset - e.g. 'GRIDMET', 'NEX', 'MACA', 'L8', 'MOD13Q1', 'soil'
+
+    metrics - list of metrics (several if exported with singlePass = True)
+
+    model, scenario - climate projection model and scenario, or None. Ensemble exports have the model
+        'ensemble' or 'ensembleStats' and their scenarios joined with '-' (the rows give the model and
+        scenario; ensembleStats rows get the model 'ensemble_<statistic>')
+
+    startYear, endYear - years of the time-series (startYear only for NLCD), or None
+
+    geom - 'ptsB', 'poly1' or 'pts1'
+
+    reducers - list of statistics of an export reduced with reducers, or None
+
+    deferScale - True if the values are in the stored units of the bands (suffix '_dn') and are converted
+        with the registry scale and offset of the dataset
+
+    since - last date already extracted before an incremental export (YYYYMMDD), or None
+
+    chunk - chunk number (chunkSize), or None
+
+    """
+    name = os.path.basename(name)
+    if name.lower().endswith('.csv'):
+        name = name[:-4]
+
+    m = suffixPattern.search(name)
+    if m is None:
+        return None
+
+    desc = {}
+    desc['geom'] = m.group(1)[1:]
+    desc['reducers'] = m.group(2)[2:].split('-') if m.group(2) else None
+    desc['deferScale'] = m.group(3) is not None
+    desc['since'] = m.group(4)[2:] if m.group(4) else None
+    desc['chunk'] = int(m.group(5)[2:]) if m.group(5) else None
+
+    tokens = name[:m.start()].split('_')
+    if tokens[0] not in prefix_d or len(tokens) < 2:
+        return None
+
+    timeStep, dataset = prefix_d[tokens[0]]
+    desc['timeStep'] = timeStep
+    desc['model'] = None
+    desc['scenario'] = None
+    desc['startYear'] = None
+    desc['endYear'] = None
+
+    rest = tokens[1:]
+
+    try:
+        if tokens[0] in ['s', 'f']:
+            #s_tc_2011, f_lc_2011, s_oc-soilDepth_soil, s_elev_topo, s_aspect_sin
+            if rest[-1].isdigit():
+                desc['startYear'] = int(rest[-1])
+                dataset = 'NLCD'
+                metrics = '_'.join(rest[:-1])
+            elif rest[-1] in static_d:
+                dataset = static_d[rest[-1]]
+                metrics = '_'.join(rest[:-1]) if rest[-1] in ['soil', 'topo'] else '_'.join(rest)
+            else:
+                return None
+        else:
+            desc['startYear'] = int(rest[-2])
+            desc['endYear'] = int(rest[-1])
+            rest = rest[:-2]
+
+            if tokens[0] == 'p':
+                #p_MCD12Q2_GreenInc
+                dataset = rest[0]
+                metrics = '_'.join(rest[1:])
+            elif tokens[0].startswith('proj'):
+                #projm_NEX_pr_rcp45_CCSM4, projm_NEX_pr_rcp45-rcp85_ensemble(Stats)
+                dataset = rest[0]
+                metrics = rest[1]
+                desc['scenario'] = rest[2]
+                desc['model'] = '_'.join(rest[3:])
+            elif dataset is None:
+                #rm_MOD13Q1_NDVI, ry_L8_NDVI, rm_TRMM_pr
+                dataset = rest[0]
+                metrics = '_'.join(rest[1:])
+            else:
+                #cm_tmin-vpd, tcy_pr, pri_ppt
+                metrics = '_'.join(rest)
+    except (IndexError, ValueError):
+        return None
+
+    if not metrics:
+        return None
+
+    desc['dataset'] = dataset
+    desc['metrics'] = metrics.split('-')
+
+    return desc
+
+def defaultStat(desc, metric):
+    """
+    Returns the statistic of metric in the exports of desc made without reducers: 'histogram' for the
+    land cover fractions of buffers and polygons (f_lc), the entries of defaultStat_d, otherwise 'mean'
+    """
+    if desc['dataset'] == 'NLCD' and metric == 'lc' and desc['geom'] != 'pts1':
+        return 'histogram'
+    return defaultStat_d.get(desc['dataset'], {}).get(metric, 'mean')
+
+def statMetric(metric, stat, default = None):
+    """
+    Returns the metric of a statistic column: metric for the single statistic of a table reduced
+    without reducers (the statistics of valueColumns: mean, sum, mode, histogram) or for default,
+    the statistic of the function, with reducers; otherwise '<metric>_<statistic>', so that the
+    statistics of combined reducers such as 'mean' and 'sum' are stored as different metrics
+    """
+    if stat is None:
+        return metric
+    if default is None and stat in valueColumns:
+        return metric
+    if stat == default:
+        return metric
+    return metric + '_' + stat
+
+def splitStat(col):
+    """
+    Returns the band and statistic of a column '<band>_<statistic>' written by a combined reducer,
+    or (col, None)
+    """
+    band, sep, stat = col.rpartition('_')
+    if sep and (stat in valueColumns or statPattern.match(stat)):
+        return band, stat
+    return col, None
+
+def parseDate(value):
+    """
+    Converts the startDate written by Earth Engine (milliseconds, ISO string or
+    '{type=Date, value=...}') to 'YYYY-MM-DD'. Returns '' for empty values.
+    """
+    value = str(value).strip()
+    if value == '':
+        return ''
+
+    m = re.search(r'value=(-?\d+)', value)
+    if m is not None:
+        value = m.group(1)
+
+    if re.match(r'^-?\d+(\.\d+)?$', value) and len(value.split('.')[0].lstrip('-')) > 8:
+        epoch = datetime.datetime(1970, 1, 1)
+        return (epoch + datetime.timedelta(milliseconds = float(value))).strftime('%Y-%m-%d')
+
+    if re.match(r'^\d{8}$', value):
+        return value[0:4] + '-' + value[4:6] + '-' + value[6:8]
+
+    return value[0:10]
+
+def convertValue(value, scale, stat = None):
+    """
+    Converts a value reduced from a band in its stored units (deferScale) to physical units with the
+    (scale, offset) of its metric, or returns value unchanged if scale is None. stat is the statistic
+    of the value (statistics across models and over the pixels of ensembleStats are joined with '_',
+    e.g. 'stdDev_mean'): standard deviations are only multiplied by the scale and variances by its
+    square, counts and histograms are not converted.
+    """
+    stats = stat.split('_') if stat else []
+    if scale is None or 'count' in stats or 'histogram' in stats:
+        return value
+
+    try:
+        x = float(value)
+    except (TypeError, ValueError):
+        return value
+
+    if 'variance' in stats:
+        return x * scale[0] ** 2
+    if 'stdDev' in stats:
+        return x * abs(scale[0])
+
+    return x * scale[0] + scale[1]
+
+def tableRows(rows, desc):
+    """
+    Yields the long rows (dictionaries with the keys in columns) of the rows of one exported table
+    (dictionaries of column -> value), described by desc (see parseDescription). Values of exports
+    with deferScale are converted to physical units (see convertValue).
+    """
+    metrics = desc['metrics']
+
+    #registry entry holding the scale and offset of the metrics of a deferScale export
+    dataset = registry.get(desc['dataset']) if desc.get('deferScale') else None
+
+    #statistic stored under the bare metric name when the table was reduced with reducers
+    def default(band):
+        return defaultStat(desc, band) if desc.get('reducers') else None
+
+    for row in rows:
+        geeID = row.get(extractEngine.ID_field, '')
+        startDate = parseDate(row.get('startDate', ''))
+        if startDate == '' and desc['startYear'] is not None and desc['endYear'] is None:
+            startDate = str(desc['startYear']) + '-01-01'
+
+        #ensemble exports give the model and scenario of each row
+        model = row.get('model') or desc['model'] or ''
+        scenario = row.get('scenario') or desc['scenario'] or ''
+
+        for col, value in row.items():
+            if col is None or value is None or value == '':
+                continue
+
+            member = model
+
+            if col.startswith('ens_') and len(metrics) == 1:
+                #ensembleStats: one column per statistic across models, e.g. ens_p90 -> model ensemble_p90
+                band, stat = metrics[0], col[4:]
+                metric = band
+                date = startDate
+                member = 'ensemble_' + col[4:]
+            elif (col in valueColumns or statPattern.match(col)) and len(metrics) == 1:
+                band, stat = metrics[0], col
+                metric = statMetric(band, stat, default(band))
+                date = startDate
+            elif col in metrics:
+                band, stat = col, None
+                metric = col
+                date = startDate
+            elif splitStat(col)[0] in metrics:
+                #several metrics reduced with reducers: <metric>_<statistic>
+                band, stat = splitStat(col)
+                metric = statMetric(band, stat, default(band))
+                date = startDate
+            else:
+                m = widePattern.match(col)
+                if m is None:
+                    continue
+                date = parseDate(m.group(1))
+                band, stat = splitStat(m.group(2)) if desc['reducers'] else (m.group(2), None)
+                #band names of single-metric tables may differ from the metric (e.g. LST_Day_1km)
+                if len(metrics) == 1:
+                    band = metrics[0]
+                metric = statMetric(band, stat, default(band))
+
+            if dataset is not None:
+                value = convertValue(value, dataset.scale(band), stat)
+
+            out = {}
+            out['geeID'] = geeID
+            out['startDate'] = date
+            out['timeStep'] = desc['timeStep'] or ''
+            out['dataset'] = desc['dataset']
+            out['metric'] = metric
+            out['model'] = member
+            out['scenario'] = scenario
+            out['geom'] = desc['geom']
+            out['value'] = value
+
+            yield out
+
+def iterRows(path, desc = None):
+    """
+    Yields the long rows (dictionaries with the keys in columns) of one exported table,
+    reading it one line at a time
+    """
+    if desc is None:
+        desc = parseDescription(path)
+
+    with open(path) as f:
+        for out in tableRows(csv.DictReader(f), desc):
+            yield out
+
+def findExports(folder, pattern = '*.csv'):
+    """
+    Returns two lists: the (path, description) of every export in folder matching pattern,
+    and the paths of files whose name does not follow the naming convention
+    """
+    exports = []
+    skipped = []
+
+    for path in sorted(glob.glob(os.path.join(os.path.expanduser(folder), pattern))):
+        desc = parseDescription(path)
+        if desc is None:
+            skipped.append(path)
+        else:
+            exports.append((path, desc))
+
+    return exports, skipped
+
+def iterFolder(folder, pattern = '*.csv'):
+    """
+    Yields the long rows of every export in folder, one table after the other
+    """
+    exports, skipped = findExports(folder, pattern)
+
+    for path, desc in exports:
+        for row in iterRows(path, desc):
+            yield row
+
+def consolidate(folder, outFile, pattern = '*.csv', append = False):
+    """
+    Streams every export in folder into a single long CSV table
+
+    Requires:
+
+    folder - local folder with the exported CSV files (e.g. the synced google drive folderOut)
+
+    outFile - name of the CSV file to write
+
+    Optional parameters
+
+    pattern - glob pattern of the files to merge. Default: '*.csv'
+
+    append - If True, the rows are added to outFile if it exists, e.g. the incremental exports
+        of a GEE* function called with since (pattern = '*_u*.csv'). Default: False
+
+    Returns the number of rows written and the list of files that were skipped because their
+    name does not follow the naming convention of the GEE* functions.
+    """
+    exports, skipped = findExports(folder, pattern)
+    outFile = os.path.abspath(os.path.expanduser(outFile))
+
+    header = not (append and os.path.exists(outFile))
+
+    if not header:
+        #tables consolidated before the geom column was added cannot take the new rows
+        with open(outFile) as f:
+            if next(csv.reader(f), columns) != columns:
+                raise ValueError(outFile + ' does not have the columns ' + ', '.join(columns) +
+                                 ': consolidate the exports again without append')
+
+    nRows = 0
+    with open(outFile, 'a' if append else 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = columns)
+        if header:
+            writer.writeheader()
+
+        for path, desc in exports:
+            if os.path.abspath(path) == outFile:
+                continue
+            for row in iterRows(path, desc):
+                writer.writerow(row)
+                nRows += 1
+
+    return nRows, skipped
@@ -0,0 +1,104 @@
+#####Direct retrieval of small extractions
+
+"""
+Fetches reduced tables directly from Earth Engine instead of exporting them to Drive
+
+For a few sites and years, starting an export, waiting in the task queue and
+downloading the CSV takes far longer than the computation itself. With
+mode = 'direct', the GEE* functions request the rows of each reduced table with
+getInfo, in pages of defaultPageSize features (table.toList(pageSize, offset))
+fetched in parallel by up to defaultWorkers threads, and return them at once as a pandas
+DataFrame in the long format of consolidate:
+
+    geeID, startDate, timeStep, dataset, metric, model, scenario, geom, value
+
+Only jobs of at most directLimit rows (points/polygons x time steps) are fetched
+directly; larger jobs raise a ValueError and should be exported.
+
+Example:
+
+    from geedataextract import downloadData
+
+    df = downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2015, 2017, 'month', 0, 0, 'me', 'gridmet',
+                                       mode = 'direct')
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geedataextract import consolidate
+
+#maximum number of rows of a direct job, features per getInfo request and number of parallel requests
+directLimit = 100000
+defaultPageSize = 1000
+defaultWorkers = 8
+
+def checkSize(pts1, nSteps = 1):
+    """
+    Returns the number of features of pts1, raising a ValueError if reducing nSteps images over
+    them gives more than directLimit rows
+    """
+    nFeatures = pts1.size().getInfo()
+
+    if nFeatures * nSteps > directLimit:
+        raise ValueError('Direct retrieval is limited to ' + str(directLimit) + ' rows (' +
+                         str(nFeatures * nSteps) + " requested), use mode = 'export'")
+
+    return nFeatures
+
+def plainValue(value):
+    """
+    Converts a property fetched with getInfo to the value written in an exported CSV
+    (dates become milliseconds)
+    """
+    if isinstance(value, dict) and value.get('type') == 'Date':
+        return value.get('value')
+    return value
+
+def fetchRows(table, nRows, pageSize = None, maxWorkers = None):
+    """
+    Returns the properties of the features of table (at most nRows), requested in pages of
+    pageSize features by maxWorkers threads (default: defaultPageSize and defaultWorkers).
+    Rows are returned in the order of table.
+    """
+    if pageSize is None:
+        pageSize = defaultPageSize
+    if maxWorkers is None:
+        maxWorkers = defaultWorkers
+
+    def page(offset):
+        return table.toList(pageSize, offset).getInfo()
+
+    offsets = list(range(0, max(nRows, 1), pageSize))
+
+    with ThreadPoolExecutor(max_workers = min(maxWorkers, len(offsets))) as executor:
+        pages = list(executor.map(page, offsets))
+
+    rows = []
+    for features in pages:
+        for feature in features:
+            props = feature.get('properties', {})
+            rows.append(dict([(k, plainValue(v)) for k, v in props.items()]))
+
+    return rows
+
+def fetchFrame(table, description, nRows):
+    """
+    Returns the rows of table, exported as description, as a pandas DataFrame with the consolidate.columns
+    """
+    import pandas as pd
+
+    desc = consolidate.parseDescription(description)
+    rows = list(consolidate.tableRows(fetchRows(table, nRows), desc))
+
+    return pd.DataFrame(rows, columns = consolidate.columns)
+
+def concatFrames(frames):
+    """
+    Returns the DataFrames fetched by a GEE* function as a single DataFrame
+    """
+    import pandas as pd
+
+    if len(frames) == 0:
+        return pd.DataFrame([], columns = consolidate.columns)
+
+    return pd.concat(frames, ignore_index = True)
@@ -5,7 +5,14 @@
 Functions for extracting data from GEE
 """
 
-def GEEtcPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30):
+from geedataextract import collectionCache
+from geedataextract import directFetch
+from geedataextract import eeSession
+from geedataextract import extractEngine
+from geedataextract import localBackend
+from geedataextract import registry
+
+def GEEtcPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30, **options):
     """    
     Calculates tree cover % at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -26,76 +33,43 @@ def GEEtcPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30):
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 30
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
+
+    options = extractEngine.extractOptions(options, timeSeries = False)
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     #define landcover images
-    tc = ee.Image("USGS/NLCD/NLCD" + str(yr)).select('percent_tree_cover')
+    nlcd = registry.get('NLCD')
+    tc = ee.Image(nlcd.collection + str(yr)).select(nlcd.band('tc'))
 
-    if buf > 0:
-        bufL = [buf]
-        def bufferPoly(feature):
-            return feature.buffer(bufL[0])
+    #reduce regions, filter out null values, remove geometry and export table
+    tasks += extractEngine.extractImage(tc, pts1, buf, poly, 's_tc_'+str(yr), folderOut, scalePix, **options)
 
-        ptsB = pts1.map(bufferPoly)
-        
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = ptsB.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_tc_'+str(yr)+'_ptsB',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print ("buffered pts by:" + str(buf))
-
-    elif poly > 0:
-                     
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_tc_'+str(yr)+'_poly1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print ("spatial mean in poly: no buffer")
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
 
-    else:
- 
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_tc_'+str(yr)+'_pts1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print("value at point: no buffer")
-
-def GEEicPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30):
+    return tasks
+
+
+def GEEicPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30, **options):
     """    
     Calculates % impervious cover at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -116,76 +90,43 @@ def GEEicPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30):
     Optional parameters    
 
     scalePix - scale/spatial resolution. Default: 30
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
+
+    options = extractEngine.extractOptions(options, timeSeries = False)
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     #define landcover images
-    tc = ee.Image("USGS/NLCD/NLCD" + str(yr)).select('impervious')
+    nlcd = registry.get('NLCD')
+    tc = ee.Image(nlcd.collection + str(yr)).select(nlcd.band('ic'))
 
-    if buf > 0:
-        bufL = [buf]
-        def bufferPoly(feature):
-            return feature.buffer(bufL[0])
+    #reduce regions, filter out null values, remove geometry and export table
+    tasks += extractEngine.extractImage(tc, pts1, buf, poly, 's_ic_'+str(yr), folderOut, scalePix, **options)
 
-        ptsB = pts1.map(bufferPoly)
-        
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = ptsB.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_ic_'+str(yr)+'_ptsB',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print ("buffered pts by:" + str(buf))
-
-    elif poly > 0:
-        
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_ic_'+str(yr)+'_poly1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print ("spatial mean in poly: no buffer")
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
 
-    else:
- 
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_ic_'+str(yr)+'_pts1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print("value at point: no buffer")
-
-def GEElcPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30):
+    return tasks
+
+
+def GEElcPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30, **options):
     """    
     Calculates land cover at point OR histogram within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -206,78 +147,51 @@ def GEElcPts(ptsFile,yr,buf,poly,username,folderOut, scalePix = 30):
     Optional parameters    
 
     scalePix - scale/spatial resolution. Default: 30
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-    
+
+    options = extractEngine.extractOptions(options, timeSeries = False)
+
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     #define landcover images
-    tc = ee.Image("USGS/NLCD/NLCD" + str(yr)).select('landcover')
+    nlcd = registry.get('NLCD')
+    tc = ee.Image(nlcd.collection + str(yr)).select(nlcd.band('lc'))
+
+    #reduce regions, filter out null values, remove geometry and export table
+    if any([(buf > 0),(poly > 0)]):
+        #frequency table of land cover types within buffer or polygon
+        tasks += extractEngine.extractImage(tc, pts1, buf, poly, 'f_lc_'+str(yr), folderOut, scalePix,
+                                            reducer = 'frequencyHistogram', **options)
+    else:
+        tasks += extractEngine.extractImage(tc, pts1, buf, poly, 's_lc_'+str(yr),
+                                            folderOut, scalePix, **options)
 
-    if buf > 0:
-        bufL = [buf]
-        def bufferPoly(feature):
-            return feature.buffer(bufL[0])
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
 
-        ptsB = pts1.map(bufferPoly)
-        
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = ptsB.select([ID_field]),
-                                        reducer = ee.Reducer.frequencyHistogram(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('histogram', None))
-                                                .select(['.*'],None,False),
-                                                description = 'f_lc_'+str(yr)+'_ptsB',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print ("buffered pts by:" + str(buf))
-
-    elif poly > 0:
-               
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.frequencyHistogram(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('histogram', None))
-                                                .select(['.*'],None,False),
-                                                description = 'f_lc_'+str(yr)+'_poly1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print ("spatial mean in poly: no buffer")
+    return tasks
 
-    else:
- 
-        #reduce regions, filter out null values, remove geometry and export table
-        table_tc_pts = tc.reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix)
-        task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 's_lc_'+str(yr)+'_pts1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-
-        #print("value at point: no buffer")
-
-
-def GEEsoilPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 250):
+
+def GEEsoilPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 250, singlePass = False, backend = 'ee',
+               **options):
     """    
     Calculates soil metrics at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -310,175 +224,76 @@ def GEEsoilPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 250):
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 250
+
+    singlePass - If True, all metrics are stacked as bands and reduced in a single pass, exporting
+        one table (one Earth Engine task) with one column per metric. Default: False
+
+    backend - 'ee' to extract on Earth Engine, or 'local' to read local rasters with localBackend: username is
+        then the local data folder, and the options are not supported. Default: 'ee'
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
 
-    #define dictionary for raster random names
-    soil_d = {}
-    soil_d["soilDepth"] = "BDTICM_M_250m"
-    soil_d["bulkDensity"] = "BLDFIE_I"
-    soil_d["cec"] = "CECSOL_I"
-    soil_d["clay"] = "CLYPPT_I"
-    soil_d["cfrag"] = "CRFVOL_I"
-    soil_d["ph"] = "PHIHOX_I"
-    soil_d["silt"] = "SLTPPT_I"
-    soil_d["sand"] = "SNDPPT_I"
-    soil_d["oc"] = "ORCDRC_I"
-    soil_d["subordersUS"] = "TAXOUSDA_250m"
-    soil_d["subgroupsWorld"] = "TAXNWRB_250m"
-    
-        
+    options = extractEngine.extractOptions(options, timeSeries = False)
+
+    if localBackend.useLocal(backend, options):
+        return localBackend.GEEsoilPts(ptsFile, metric, buf, poly, username, folderOut, scalePix, singlePass)
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
 
-    for met in metric:
-        metL = [met]
-    
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
+    tasks = []
 
-            ptsB = pts1.map(bufferPoly)
-        
-            if any([(met == 'subgroupsWorld'),(met == 'subordersUS')]):
-
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met]))
-                table_tc_pts = soilImage.reduceRegions(collection = ptsB.select([ID_field]),
-                                                    reducer = ee.Reducer.mode(),
-                                                    scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                        .filter(ee.Filter.neq('mode', None))
-                                                        .select(['.*'],None,False),
-                                                        description = 's_'+str(met)+'_soil_ptsB',
-                                                        folder = folderOut,
-                                                        fileFormat = 'CSV')
-            
-            elif met == 'soilDepth':
-
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met])).float()
-                table_tc_pts = soilImage.reduceRegions(collection = ptsB.select([ID_field]),
-                                                    reducer = ee.Reducer.mean(),
-                                                    scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                        .filter(ee.Filter.neq('mean', None))
-                                                        .select(['.*'],None,False),
-                                                        description = 's_'+str(met)+'_soil_ptsB',
-                                                        folder = folderOut,
-                                                        fileFormat = 'CSV')
-            else:
+    soil = registry.get('soil')
 
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met])).float().divide(100)
-                table_tc_pts = soilImage.reduceRegions(collection = ptsB.select([ID_field]),
-                                                    reducer = ee.Reducer.mean(),
-                                                    scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                        .filter(ee.Filter.neq('mean', None))
-                                                        .select(['.*'],None,False),
-                                                        description = 's_'+str(met)+'_soil_ptsB',
-                                                        folder = folderOut,
-                                                        fileFormat = 'CSV')
-            task_tc.start()
-
-            #print ("buffered pts by:" + str(buf))
-
-        elif poly > 0:
-
-            if any([(met == 'subgroupsWorld'),(met == 'subordersUS')]):
-
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met]))
-                table_tc_pts = soilImage.reduceRegions(collection = pts1.select([ID_field]),
-                                            reducer = ee.Reducer.mode(),
-                                            scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mode', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_'+str(met)+'_soil_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            
-            elif met == 'soilDepth':
-
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met])).float()
-                table_tc_pts = soilImage.reduceRegions(collection = pts1.select([ID_field]),
-                                            reducer = ee.Reducer.mean(),
-                                            scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_'+str(met)+'_soil_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            else:
+    #soil image for one metric, class maps are not converted
+    def soilImage(met):
+        return extractEngine.scaleImage(ee.Image(soil.collection + str(soil.band(met))), soil, [met])
 
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met])).float().divide(100)
-                table_tc_pts = soilImage.reduceRegions(collection = pts1.select([ID_field]),
-                                            reducer = ee.Reducer.mean(),
-                                            scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_'+str(met)+'_soil_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            
-            task_tc.start()
-
-            #print ("spatial mean in poly: no buffer")
+    #class maps are reduced with the mode, continuous maps with the mean
+    modeL = [met for met in metric if met in ['subgroupsWorld', 'subordersUS']]
+    meanL = [met for met in metric if met not in modeL]
 
+    #a single pass can only share one reducer, so class and continuous maps are reduced separately
+    if singlePass:
+        metricL = [mets for mets in [modeL, meanL] if len(mets) > 0]
+    else:
+        metricL = extractEngine.metricGroups(metric)
+
+    for mets in metricL:
+
+        if mets[0] in modeL:
+            reducer = 'mode'
         else:
+            reducer = 'mean'
 
-            if any([(met == 'subgroupsWorld'),(met == 'subordersUS')]):
-
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met]))
-                table_tc_pts = soilImage.reduceRegions(collection = pts1.select([ID_field]),
-                                            reducer = ee.Reducer.mode(),
-                                            scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mode', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_'+str(met)+'_soil_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            
-            elif met == 'soilDepth':
-
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met])).float()
-                table_tc_pts = soilImage.reduceRegions(collection = pts1.select([ID_field]),
-                                            reducer = ee.Reducer.mean(),
-                                            scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_'+str(met)+'_soil_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            else:
+        if len(mets) == 1:
+            image = soilImage(mets[0])
+        else:
+            image = ee.Image.cat([soilImage(met).rename(met) for met in mets])
+
+        tasks += extractEngine.extractImage(image, pts1, buf, poly, 's_'+'-'.join(mets)+'_soil', folderOut, scalePix,
+                                            reducer = reducer, bands = mets, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
 
-                soilImage = ee.Image("users/aschwantes/" + str(soil_d[met])).float().divide(100)
-                table_tc_pts = soilImage.reduceRegions(collection = pts1.select([ID_field]),
-                                            reducer = ee.Reducer.mean(),
-                                            scale = scalePix)
-                task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_'+str(met)+'_soil_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            
-            task_tc.start()
-
-            #print("value at point: no buffer")
-
-def GEEtopoPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 30):
+
+def GEEtopoPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 30, backend = 'ee', **options):
     """    
     Calculates topography metrics at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -489,7 +304,7 @@ def GEEtopoPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 30):
     metric - list of metrics to include in output ['elev', 'slope', 'aspect']
         elev: elevation (meters)
         slope: (radians)
-        aspect: (radians) unless spatial average then two outputs will be produced
+        aspect: (radians) unless spatial average then two columns will be produced, in a single export
             aspect_sin: Sum of the sin(aspect)
             aspect_cos: Sum of the cos(aspect)
             You can then later take the circular average using atan2(aspectSinSum, aspectCosSum)
@@ -505,178 +320,71 @@ def GEEtopoPts(ptsFile,metric,buf,poly,username,folderOut, scalePix = 30):
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 30
+
+    backend - 'ee' to extract on Earth Engine, or 'local' to read local rasters with localBackend: username is
+        then the local data folder, and the options are not supported. Default: 'ee'
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-            
+
+    options = extractEngine.extractOptions(options, timeSeries = False)
+
+    if localBackend.useLocal(backend, options):
+        return localBackend.GEEtopoPts(ptsFile, metric, buf, poly, username, folderOut, scalePix)
+
     # load required libraries
     import ee
     import math
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     #define topo images
-    srtm = ee.Image('USGS/SRTMGL1_003')
+    srtm = ee.Image(registry.get('SRTM').collection)
     slopeI = ee.Terrain.slope(srtm).multiply(math.pi/180)
     aspectI = ee.Terrain.aspect(srtm).multiply(math.pi/180)
 
-    aspectS = aspectI.sin();
-    aspectC = aspectI.cos();
-    
-    if buf > 0:
-        bufL = [buf]
-        def bufferPoly(feature):
-            return feature.buffer(bufL[0])
+    #sin and cos of aspect as two bands, summed in a single pass
+    aspectSC = aspectI.sin().addBands(aspectI.cos()).select([0, 1], ['aspect_sin', 'aspect_cos'])
 
-        ptsB = pts1.map(bufferPoly)
-        
-        #reduce regions, filter out null values, remove geometry and export table
-
-        if 'elev' in metric:
-            table_tc_pts = srtm.reduceRegions(collection = ptsB.select([ID_field]),
-                                              reducer = ee.Reducer.mean(),
-                                              scale = scalePix)
-            task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_elev_topo_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-
-        if 'slope' in metric:
-            table_tc_pts = slopeI.reduceRegions(collection = ptsB.select([ID_field]),
-                                              reducer = ee.Reducer.mean(),
-                                              scale = scalePix)
-            task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_slope_topo_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-
-        if 'aspect' in metric:
-            table_AS_pts = aspectS.reduceRegions(collection = ptsB.select([ID_field]),
-                                                 reducer = ee.Reducer.sum(),
-                                                 scale = scalePix)
-            table_AC_pts = aspectC.reduceRegions(collection = ptsB.select([ID_field]),
-                                                 reducer = ee.Reducer.sum(),
-                                                 scale = scalePix)
-            task_AS = ee.batch.Export.table.toDrive(collection = table_AS_pts
-                                                    .filter(ee.Filter.neq('sum', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_aspect_sin_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_AC = ee.batch.Export.table.toDrive(collection = table_AC_pts
-                                                    .filter(ee.Filter.neq('sum', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_aspect_cos_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_AS.start()
-            task_AC.start()
-
-        #print ("buffered pts by:" + str(buf))
-
-    elif poly > 0:
-        
-        #reduce regions, filter out null values, remove geometry and export table
-
-        if 'elev' in metric:
-            table_tc_pts = srtm.reduceRegions(collection = pts1.select([ID_field]),
-                                              reducer = ee.Reducer.mean(),
-                                              scale = scalePix)
-            task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_elev_topo_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-
-        if 'slope' in metric:
-            table_tc_pts = slopeI.reduceRegions(collection = pts1.select([ID_field]),
-                                              reducer = ee.Reducer.mean(),
-                                              scale = scalePix)
-            task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_slope_topo_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-
-        if 'aspect' in metric:
-            table_AS_pts = aspectS.reduceRegions(collection = pts1.select([ID_field]),
-                                                 reducer = ee.Reducer.sum(),
-                                                 scale = scalePix)
-            table_AC_pts = aspectC.reduceRegions(collection = pts1.select([ID_field]),
-                                                 reducer = ee.Reducer.sum(),
-                                                 scale = scalePix)
-            task_AS = ee.batch.Export.table.toDrive(collection = table_AS_pts
-                                                    .filter(ee.Filter.neq('sum', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_aspect_sin_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_AC = ee.batch.Export.table.toDrive(collection = table_AC_pts
-                                                    .filter(ee.Filter.neq('sum', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_aspect_cos_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_AS.start()
-            task_AC.start()
-
-        #print ("spatial mean in poly: no buffer")
+    #reduce regions, filter out null values, remove geometry and export table
+    if 'elev' in metric:
+        tasks += extractEngine.extractImage(srtm, pts1, buf, poly, 's_elev_topo',
+                                            folderOut, scalePix, **options)
 
-    else:
+    if 'slope' in metric:
+        tasks += extractEngine.extractImage(slopeI, pts1, buf, poly, 's_slope_topo',
+                                            folderOut, scalePix, **options)
+
+    if 'aspect' in metric:
+        if any([(buf > 0),(poly > 0)]):
+            #sums of sin and cos, for a circular average of aspect
+            tasks += extractEngine.extractImage(aspectSC, pts1, buf, poly, 's_aspect_sin-aspect_cos_topo',
+                                                folderOut, scalePix, reducer = 'sum',
+                                                bands = ['aspect_sin', 'aspect_cos'], **options)
+        else:
+            tasks += extractEngine.extractImage(aspectI, pts1, buf, poly, 's_aspect_topo',
+                                                folderOut, scalePix, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
 
-        if 'elev' in metric:
-            table_tc_pts = srtm.reduceRegions(collection = pts1.select([ID_field]),
-                                              reducer = ee.Reducer.mean(),
-                                              scale = scalePix)
-            task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_elev_topo_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-        if 'slope' in metric:
-            table_tc_pts = slopeI.reduceRegions(collection = pts1.select([ID_field]),
-                                              reducer = ee.Reducer.mean(),
-                                              scale = scalePix)
-            task_tc = ee.batch.Export.table.toDrive(collection = table_tc_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_slope_topo_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-
-        if 'aspect' in metric:
-            table_A_pts = aspectI.reduceRegions(collection = pts1.select([ID_field]),
-                                                 reducer = ee.Reducer.mean(),
-                                                 scale = scalePix)
-            task_A = ee.batch.Export.table.toDrive(collection = table_A_pts
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 's_aspect_topo_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_A.start()
-            
-        #print("value at point: no buffer")
-
-def GEEgridmetPtsAvg(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username,folderOut, scalePix = 4000):
+    return tasks
+
+
+def GEEgridmetPtsAvg(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username,folderOut, scalePix = 4000,
+                     singlePass = False, timeAsBands = False, backend = 'ee', **options):
     """    
     Calculates climate temporal monthly averages at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -706,24 +414,43 @@ def GEEgridmetPtsAvg(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 4000
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
+
+    singlePass - If True, all metrics are stacked as bands and reduced in a single pass, exporting
+        one table (one Earth Engine task) with one column per metric. Default: False
+
+    backend - 'ee' to extract on Earth Engine, or 'local' to read local rasters with localBackend: username is
+        then the local data folder, and timeAsBands and the options are not supported. Default: 'ee'
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+    if localBackend.useLocal(backend, options, timeAsBands = timeAsBands):
+        return localBackend.GEEgridmetPtsAvg(ptsFile, metric, startYear, endYear, timeStep, buf, poly,
+                                             username, folderOut, scalePix, singlePass)
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
-    lastImage = ee.Image(ee.ImageCollection('IDAHO_EPSCOR/GRIDMET')
-                         .sort('system:time_start',False)
-                         .first())
-    lastImageDate = lastImage.get('system:index').getInfo()
+    gridmet = registry.get('GRIDMET')
+    lastImageDate = collectionCache.indexRange(gridmet.collection)[1]
 
     endYearReal = min((int(lastImageDate[0:4])-1),endYear)
-    
+
     years = list(range(startYear, endYearReal + 1))
 
     if endYear > endYearReal:
@@ -735,150 +462,37 @@ def GEEgridmetPtsAvg(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username
     yearsEE = ee.List(years)
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
 
-    ID_field = "geeID"
+    tasks = []
 
     time_d = {}
     time_d['month'] = 'cm'
     time_d['year'] = 'cy'
     time_d['day'] = 'cd'
 
-    clim_d = {}
-    clim_d['tmax'] = 'tmmx'
-    clim_d['tmin'] = 'tmmn'
-    clim_d['vpd'] = 'vpd'
-    
-    for met in metric:
-        metL = [met]
-        Gridmet_pr = ee.ImageCollection('IDAHO_EPSCOR/GRIDMET').select(clim_d[met])
-        
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-        elif timeStep == 'day':
-
-            img_col = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
-
-        #else:
-            #print("incorrect time step specified")
-
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(clim_d[metL[0]])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(clim_d[metL[0]])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for ' + met)
+    for mets in extractEngine.metricGroups(metric, singlePass):
+        Gridmet_pr = ee.ImageCollection(gridmet.collection).select([gridmet.band(met) for met in mets], mets)
 
-        else:
-            def table_m(image):
-                table = (image
-                    .select(clim_d[metL[0]])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for ' + met)
-
-
-def GEEgridmetPtsSum(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username,folderOut, scalePix = 4000):
+        if timeStep == 'day':
+
+            Gridmet_pr = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
+
+        img_col = extractEngine.aggregateTime(Gridmet_pr, timeStep, yearsEE, monthsEE, years[0])
+
+        tasks += extractEngine.extractCollection(img_col, mets, pts1, buf, poly,
+                                                 str(time_d[timeStep])+'_'+'-'.join(mets)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEgridmetPtsSum(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username,folderOut, scalePix = 4000,
+                     timeAsBands = False, **options):
     """    
     Calculates climate temporal sums and spatial averages at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -907,22 +521,34 @@ def GEEgridmetPtsSum(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 4000
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    lastImage = ee.Image(ee.ImageCollection('IDAHO_EPSCOR/GRIDMET')
-                         .sort('system:time_start',False)
-                         .first())
-    lastImageDate = lastImage.get('system:index').getInfo()
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
+
+    gridmet = registry.get('GRIDMET')
+    lastImageDate = collectionCache.indexRange(gridmet.collection)[1]
 
     endYearReal = min((int(lastImageDate[0:4])-1),endYear)
-    
+
     years = list(range(startYear, endYearReal + 1))
 
     if endYear > endYearReal:
@@ -934,180 +560,37 @@ def GEEgridmetPtsSum(ptsFile,metric,startYear,endYear,timeStep,buf,poly,username
     yearsEE = ee.List(years)
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
 
-    ID_field = "geeID"
+    tasks = []
 
     time_d = {}
     time_d['month'] = 'cm'
     time_d['year'] = 'cy'
     time_d['day'] = 'cd'
-    #time_d['week'] = 'cw'
 
-    #dt = datetime.datetime(1979, 1, 1)
-    #end = datetime.datetime(2018, 1, 2)
-    #step = datetime.timedelta(days=7)
+    for met in metric:
+        Gridmet_pr = ee.ImageCollection(gridmet.collection).select(gridmet.band(met))
 
-    #result = []
+        if timeStep == 'day':
 
-    #while dt < end:
-    #    result.append(dt.strftime('%Y-%m-%d'))
-    #    dt += step
+            Gridmet_pr = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-    #dateS = [num for num in result if int(num[0:4]) >= startYear and int(num[0:4]) <= endYear]
-    #dateS1 = [[num for num in result if int(num[0:4]) == endYear+1][0]]
-    #dateS.extend(list(dateS1))
+        img_col = extractEngine.aggregateTime(Gridmet_pr, timeStep, yearsEE, monthsEE, years[0], stat = 'sum')
 
-    #dateSEE = ee.List(dateS[0:(len(dateS)-1)])
-    #dateEEE = ee.List(dateS[1:len(dateS)])
-                
-    #weekEE = ee.List(list(range(0,(len(dateS)-1))))
-    
-    for met in metric:
-        metL = [met]
-        Gridmet_pr = ee.ImageCollection('IDAHO_EPSCOR/GRIDMET').select(met)
-        
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .sum()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (Gridmet_pr
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .sum()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-##        elif timeStep == 'week':
-##
-##            def map_m(i):
-##                i = ee.Number(i).int()
-##                
-##                image2 = (Gridmet_pr
-##                    .filterDate(dateSEE.get(i), dateEEE.get(i))
-##                    .first())
-##                filtered = (Gridmet_pr
-##                    .filterDate(dateSEE.get(i), dateEEE.get(i))
-##                    .sum()
-##                    .copyProperties(image2,['system:time_start','system:time_end']))
-##                return filtered
-##
-##            img_col = ee.ImageCollection(weekEE.map(map_m).flatten())
-
-        elif timeStep == 'day':
-
-            img_col = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
-
-        #else:
-            #print("incorrect time step specified")
-            
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for ' + met)
+        tasks += extractEngine.extractCollection(img_col, met, pts1, buf, poly,
+                                                 str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands, **options)
 
-        else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for ' + met)
-
-def GEEphenMODIS(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, scalePix = 500):
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEphenMODIS(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, scalePix = 500, timeAsBands = False,
+                 **options):
     """    
     Calculates phenology metric at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
 
@@ -1136,124 +619,63 @@ def GEEphenMODIS(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, s
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 500
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     years = ee.List(list(range(startYear, endYear + 1)))
-    
+
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
 
-    #define dictionary for raster random names
-    phen_d = {}
-    phen_d['GreenInc'] = 'Onset_Greenness_Increase1'
-    phen_d['GreenMax'] = 'Onset_Greenness_Maximum1'
-    phen_d['GreenDec'] = 'Onset_Greenness_Decrease1'
-    phen_d['GreenMin'] = 'Onset_Greenness_Minimum1'
+    tasks = []
+
+    phen = registry.get('MCD12Q2')
 
     for met in metric:
 
-        modis1 = ee.ImageCollection('MODIS/MCD12Q2').select(phen_d[met])
-        
+        modis1 = ee.ImageCollection(phen.collection).select(phen.band(met))
+
         def map_m(i):
-            i = ee.Number(i)
+            start = ee.Date.fromYMD(ee.Number(i).int(), 1, 1)
             filtered = (modis1
-                .filter(ee.Filter.calendarRange(i, i, 'year'))
+                .filterDate(start, start.advance(1, 'year'))
                 .first())
             return filtered
 
         img_col = ee.ImageCollection(years.map(map_m).flatten())
 
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(phen_d[met])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'p_MCD12Q2_'+str(met)+'_'+str(startYear)+'_'+str(endYear)+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-            #print ('buffered pts by:' + str(buf) + ' for phen for ' + str(met))
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(phen_d[met])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'p_MCD12Q2_'+str(met)+'_'+str(startYear)+'_'+str(endYear)+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-            #print ('spatial mean in poly: no buffer for phen for ' + str(met))
+        tasks += extractEngine.extractCollection(img_col, phen.band(met), pts1, buf, poly,
+                                                 'p_'+phen.name+'_'+str(met)+'_'+str(startYear)+'_'+str(endYear),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands, **options)
 
-        else:
-            def table_m(image):
-                table = (image
-                    .select(phen_d[met])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'p_MCD12Q2_'+str(met)+'_'+str(startYear)+'_'+str(endYear)+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for phen for ' + str(met))
-
-def GEEviLandsat(ptsFile,metric,timeStep,sensor,buf,poly,username,folderOut, scalePix = 30):
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEviLandsat(ptsFile,metric,timeStep,sensor,buf,poly,username,folderOut, scalePix = 30, **options):
     """    
     Calculates vegetation/water indices for Landsat at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
 
@@ -1285,99 +707,63 @@ def GEEviLandsat(ptsFile,metric,timeStep,sensor,buf,poly,username,folderOut, sca
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 30
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    import math
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
 
-    #define dictionary for raster random names
-    sensor_d = {}
-    sensor_d['L4'] = 'LANDSAT/LT04/C01/T1_SR'
-    sensor_d['L5'] = 'LANDSAT/LT05/C01/T1_SR'
-    sensor_d['L7'] = 'LANDSAT/LE07/C01/T1_SR'
-    sensor_d['L8'] = 'LANDSAT/LC08/C01/T1_SR'
+    tasks = []
 
     time_d = {}
     time_d['lowest'] = 'rl'
     time_d['month'] = 'rm'
     time_d['year'] = 'ry'
-    
-    
-    #Computes the bits we need to extract.
-    def getQABits(image, start, end, newName):
-        pattern = 0
-        listB = list(range(start, end+1))
-        for one in listB:
-            pattern += math.pow(2, one)
-            pattern = int(pattern)
-    
-        return (image.select([0], [newName])
-                  .bitwiseAnd(pattern)
-                  .rightShift(start))
-    
+
+    #date range of every sensor, fetched in one request if not cached
+    collectionCache.prefetch([registry.get(sen).collection for sen in sensor])
+
     for sen in sensor:
-        LS = ee.ImageCollection(sensor_d[sen])
-        #senL = [sen]
-        
-        def maskbyBits(img):
-            QA = img.select('pixel_qa')
-            QA1 = getQABits(QA, 3, 3, 'QA')
-            QA2 = getQABits(QA, 5, 5, 'QA')
+        landsat = registry.get(sen)
+        LS = ee.ImageCollection(landsat.collection)
+
+        #mask clouds and cloud shadows
+        LSm = LS.map(extractEngine.qaMask(landsat, 'clear'))
+
+        firstImageDate, lastImageDate = collectionCache.indexRange(landsat.collection)
 
-            mask = QA1.eq(0).And(QA2.eq(0))
-            return img.updateMask(mask)
-        
-        LSm = LS.map(maskbyBits)
-            
-        lastImage = ee.Image(ee.ImageCollection(sensor_d[sen])
-                         .sort('system:time_start',False)
-                         .first())
-        lastImageDate = lastImage.get('system:index').getInfo()
-
-        firstImage = ee.Image(ee.ImageCollection(sensor_d[sen])
-                         .sort('system:time_start',True)
-                         .first())
-        firstImageDate = firstImage.get('system:index').getInfo()
-      
         startYear = int(firstImageDate[(len(firstImageDate)-8):(len(firstImageDate)-4)])
         endYear = int(lastImageDate[(len(lastImageDate)-8):(len(lastImageDate)-4)])
         startMonth = int(firstImageDate[(len(firstImageDate)-4):(len(firstImageDate)-2)])
         endMonth = int(lastImageDate[(len(lastImageDate)-4):(len(lastImageDate)-2)])-1
         startYearAll = startYear + 1
         endYearAll = endYear - 1
-                        
+
         years = list(range(startYear, endYearAll + 1))
         monthsEE = ee.List(list(range(startMonth,(12*len(years)+endMonth))))
         yearsEE = ee.List(list(range(startYearAll, endYearAll + 1)))
-              
+
         for met in metric:
-           # metL = [met]
-
-            if (sen == 'L8' and met == "NDVI"):
-                bands = ['B5', 'B4']
-            elif (sen != 'L8' and met == "NDVI"):
-                bands = ['B4', 'B3']
-            elif (sen == 'L8' and met == "NDWI"):
-                bands = ['B5', 'B6']
-            elif (sen != 'L8' and met == "NDWI"):
-                bands = ['B4', 'B5']
-            elif (sen == 'L8' and met == "NBR"):
-                bands = ['B5', 'B7']
-            elif (sen != 'L8' and met == "NBR"):
-                bands = ['B4', 'B7']
-            #else:
-                  #print("wrong metric specified")
-                   
+
+            #bands of the normalized difference
+            bands = landsat.band(met)
+
             def addVI(image):
                 vi = (image.normalizedDifference(bands)
                     .rename('VI'))
@@ -1387,131 +773,21 @@ def GEEviLandsat(ptsFile,metric,timeStep,sensor,buf,poly,username,folderOut, sca
 
             VI_col = withVI.select('VI')
 
-            if timeStep == 'year':
-
-                def map_m(i):
-                    i = ee.Number(i).int()
-                    image2 = (VI_col
-                        .filter(ee.Filter.calendarRange(i, i, 'year'))
-                        .first())
-                    filtered = (VI_col
-                        .filter(ee.Filter.calendarRange(i, i, 'year'))
-                        .mean()
-                        .copyProperties(image2,['system:time_start','system:time_end']))
-                    return filtered
-
-                img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-            elif timeStep == 'month':
-            
-                def map_m(i):
-                    i = ee.Number(i)
-                    y = i.divide(12).add(years[0]).int()
-                    m = i.mod(12).add(1)
-                    image2 = (VI_col
-                        .filter(ee.Filter.calendarRange(m, m, 'month'))
-                        .filter(ee.Filter.calendarRange(y, y, 'year'))
-                        .first())
-                    filtered = (VI_col
-                        .filter(ee.Filter.calendarRange(m, m, 'month'))
-                        .filter(ee.Filter.calendarRange(y, y, 'year'))
-                        .mean()
-                        .copyProperties(image2,['system:time_start','system:time_end']))
-                    return filtered
-
-                img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-            elif timeStep == 'lowest':
-
-                img_col = VI_col
-
-            #else:
-                  #print("incorrect time step specified")
-            
-            if buf > 0:
-                bufL = [buf]
-                def bufferPoly(feature):
-                    return feature.buffer(bufL[0])
-
-                ptsB = pts1.map(bufferPoly)
-                def table_m(image):
-                    table = (image
-                        .select('VI')
-                        .reduceRegions(collection = ptsB.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix))
-                        
-                    def table_add_date(f):
-                        return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                    return table.map(table_add_date)
-
-                triplets = img_col.map(table_m).flatten()
-
-                task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_'+str(sen)+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-                task_tc.start()
-    
-    
-                #print ('buffered pts by:' + str(buf) + ' for Landsat: ' + sen + '_' + met)
-
-            elif poly > 0:
-                
-                def table_m(image):
-                    table = (image
-                        .select('VI')
-                        .reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix))
-                            
-                    def table_add_date(f):
-                        return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                    return table.map(table_add_date)
-
-                triplets = img_col.map(table_m).flatten()
-
-                task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                        .filter(ee.Filter.neq('mean', None))
-                                                        .select(['.*'],None,False),
-                                                        description = str(time_d[timeStep])+'_'+str(sen)+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                        folder = folderOut,
-                                                        fileFormat = 'CSV')
-                task_tc.start()
-        
-        
-                #print ('spatial mean in poly: no buffer for Landsat: ' + sen + '_' + met)
+            #'lowest' keeps every image
+            img_col = extractEngine.aggregateTime(VI_col, timeStep, yearsEE, monthsEE, years[0])
 
-            else:
-                def table_m(image):
-                    table = (image
-                        .select('VI')
-                        .reduceRegions(collection = pts1.select([ID_field]),
-                                        reducer = ee.Reducer.mean(),
-                                        scale = scalePix))
-                            
-                    def table_add_date(f):
-                        return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                    return table.map(table_add_date)
-
-                triplets = img_col.map(table_m).flatten()
-
-                task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                        .filter(ee.Filter.neq('mean', None))
-                                                        .select(['.*'],None,False),
-                                                        description = str(time_d[timeStep])+'_'+str(sen)+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                        folder = folderOut,
-                                                        fileFormat = 'CSV')
-                task_tc.start()
-                    
-                #print('value at point: no buffer for Landsat: ' + sen + '_' + met)
-
-def GEElaiMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix = 500,startYear = None,endYear = None):
+            tasks += extractEngine.extractCollection(img_col, 'VI', pts1, buf, poly,
+                                                     str(time_d[timeStep])+'_'+str(sen)+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                     folderOut, scalePix, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEElaiMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix = 500,startYear = None,endYear = None,
+                timeAsBands = False, deferScale = False, **options):
     """    
     Calculates LAI and fpar at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
     
@@ -1544,53 +820,48 @@ def GEElaiMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 500
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
     
     startYear - The start of the time-series (year)
 
     endYear - The end of the time-series (year)
     
     If you don't specify the startYear and endYear the default is to download the entire time-series
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    deferScale - If True, the bands are reduced in their stored units and the registry scale and offset
+        are applied to the reduced values by consolidate (or directFetch), instead of to every pixel of
+        every image on Earth Engine. The exports get the suffix '_dn'. Default: False
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    import math
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
-    
-    lai_d = {}
-    lai_d['Lai'] = 0.1
-    lai_d['Fpar'] = 0.01
-    
-    #Computes the bits we need to extract.
-    def getQABits(image, start, end, newName):
-        pattern = 0
-        listB = list(range(start, end+1))
-        for one in listB:
-            pattern += math.pow(2, one)
-            pattern = int(pattern)
-    
-        return (image.select([0], [newName])
-                  .bitwiseAnd(pattern)
-                  .rightShift(start))
-
-    lastImage = ee.Image(ee.ImageCollection('MODIS/006/MCD15A3H')
-                         .sort('system:time_start',False)
-                         .first())
-    lastImageDate = lastImage.get('system:index').getInfo()
-
-    firstImage = ee.Image(ee.ImageCollection('MODIS/006/MCD15A3H')
-                         .sort('system:time_start',True)
-                         .first())
-    firstImageDate = firstImage.get('system:index').getInfo()
-      
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
+
+    lai = registry.get('MCD15A3H')
+
+    firstImageDate, lastImageDate = collectionCache.indexRange(lai.collection)
+
     if all([startYear is None,endYear is None]):
         startYear = int(firstImageDate[0:4])
         endYear = int(lastImageDate[0:4])
@@ -1598,17 +869,17 @@ def GEElaiMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
         endMonth = int(lastImageDate[5:7])-1
         startYearAll = startYear + 1
         endYearAll = endYear - 1
-                        
+
         years = list(range(startYear, endYearAll + 1))
         monthsEE = ee.List(list(range(startMonth,(12*len(years)+endMonth))))
         yearsEE = ee.List(list(range(startYearAll, endYearAll + 1)))
-        
+
     elif all([startYear >= 0,endYear >= 0]):
         startYearReal = int(firstImageDate[0:4])
-        endYearReal = int(lastImageDate[0:4]) 
-        
+        endYearReal = int(lastImageDate[0:4])
+
         years = list(range(max(startYearReal,startYear), (min(endYearReal,endYear) + 1)))
-    
+
         if endYear >= endYearReal:
             endMonth = int(lastImageDate[5:7])-1
             endYearReal2 = endYearReal-1
@@ -1617,14 +888,14 @@ def GEElaiMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
             endMonth = 0
             endYearReal2 = endYearReal
             years2 = len(years)
-            
+
         if startYear <= startYearReal:
             startMonth = int(firstImageDate[5:7])
             startYearReal2 = startYearReal+1
         elif startYear > startYearReal:
             startMonth = 0
             startYearReal2 = startYearReal
-        
+
         monthsEE = ee.List(list(range(startMonth,(12*years2+endMonth))))
         yearsEE = ee.List(list(range(max(startYearReal2,startYear), (min(endYearReal2,endYear) + 1))))
 
@@ -1632,187 +903,49 @@ def GEElaiMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
     time_d['lowest'] = 'rl'
     time_d['month'] = 'rm'
     time_d['year'] = 'ry'
-    
+
     for met in metric:
-        modisLAI = ee.ImageCollection('MODIS/006/MCD15A3H')
+        modisLAI = ee.ImageCollection(lai.collection)
         metL = [met]
-##        def maskbyBits(img):
-##            QA = img.select('FparLai_QC')
-##            QA1 = getQABits(QA, 0, 0, 'QA')
-##            QA2 = getQABits(QA, 3, 4, 'QA')
-##            QA3 = getQABits(QA, 5, 7, 'QA')
-##
-##            mask = QA1.eq(0).And(QA2.neq(1)).And(QA3.neq(4))
-##            return img.updateMask(mask)
-        def maskbyBits1(img):
-            QA = img.select('FparLai_QC')
-            QAextra = img.select('FparExtra_QC')
-            QA1 = getQABits(QA, 0, 0, 'QA')
-            QA2 = getQABits(QA, 3, 4, 'QA')
-            QA3 = getQABits(QA, 5, 7, 'QA')
-            QA4 = getQABits(QAextra, 3, 3, 'QA')
-            mask = QA1.eq(0).And(QA2.eq(0)).And(QA3.eq(0)).And(QA4.eq(0))
-            return img.updateMask(mask)
-        
-        def maskbyBits2(img):
-            QA = img.select('FparLai_QC')
-            QA1 = getQABits(QA, 0, 0, 'QA')
-            mask = QA1.eq(0)
-            return img.updateMask(mask)
-        
-        def maskbyBits3(img):
-            QA = img.select('FparLai_QC')
-            QA2 = getQABits(QA, 3, 4, 'QA')
-            QA3 = getQABits(QA, 5, 7, 'QA')
-            mask = QA2.eq(0).And(QA3.lt(2))
-            return img.updateMask(mask)
-        
-        if QC == 'None':
-            modisLAIn = modisLAI.select(met)
-        elif QC == 'Op1':
-            modisLAIn = modisLAI.map(maskbyBits1).select(met)
-        elif QC == 'Op2':
-            modisLAIn = modisLAI.map(maskbyBits2).select(met)
-        elif QC == 'Op3':
-            modisLAIn = modisLAI.map(maskbyBits3).select(met)
 
-        def scale1(img):
-            return (img.select(metL[0])
-                    .float()
-                    .multiply(lai_d[metL[0]])
-                    .copyProperties(img,['system:time_start','system:time_end']))
+        #mask poor-quality pixels with the QA bit rules of QC
+        maskbyBits = extractEngine.qaMask(lai, QC)
+
+        if maskbyBits is None:
+            modisLAIn = modisLAI.select(met)
+        else:
+            modisLAIn = modisLAI.map(maskbyBits).select(met)
 
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (modisLAIn
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (modisLAIn
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col1 = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (modisLAIn
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (modisLAIn
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col1 = ee.ImageCollection(monthsEE.map(map_m).flatten())
-            
-        elif all([timeStep == 'lowest',endYear is None, startYear is None]):
+        if all([timeStep == 'lowest',endYear is None, startYear is None]):
 
             img_col1 = modisLAIn
-            
+
         elif all([timeStep == 'lowest',endYear > 0, startYear > 0]):
 
             img_col1 = modisLAIn.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-        #else:
-            #print("incorrect time step specified")
-        
-        img_col = img_col1.map(scale1)
-        
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MCD15A3H_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for: ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MCD15A3H_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for: ' + met)
-
         else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MCD15A3H_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for: ' + met)
-
-def GEElstMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix = 1000,startYear = None,endYear = None):
+
+            img_col1 = extractEngine.aggregateTime(modisLAIn, timeStep, yearsEE, monthsEE, years[0])
+
+        #scaled on Earth Engine, or after the reduction with deferScale
+        deferred = deferScale and extractEngine.canDeferScale(lai, metL, options['reducers'])
+        img_col = img_col1 if deferred else extractEngine.scaleCollection(img_col1, lai, metL, metL[0])
+
+        tasks += extractEngine.extractCollection(img_col, metL[0], pts1, buf, poly,
+                                                 time_d[timeStep]+'_MCD15A3H_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands,
+                                                 deferScale = deferred, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEElstMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix = 1000,startYear = None,endYear = None,
+                timeAsBands = False, deferScale = False, **options):
     """    
     Calculates land surface temperature at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
     Calculates all available years
@@ -1844,102 +977,68 @@ def GEElstMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 1000
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
     
     startYear - The start of the time-series (year)
 
     endYear - The end of the time-series (year)
     
     If you don't specify the startYear and endYear the default is to download the entire time-series
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    deferScale - If True, the bands are reduced in their stored units and the registry scale and offset
+        are applied to the reduced values by consolidate (or directFetch), instead of to every pixel of
+        every image on Earth Engine. The exports get the suffix '_dn'. Default: False
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    import math
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
-    
-    #define dictionary for raster random names
-    lst_d = {}
-    lst_d['day1030'] = 'LST_Day_1km'
-    lst_d['day1330'] = 'LST_Day_1km'
-    lst_d['night2230'] = 'LST_Night_1km'
-    lst_d['night0130'] = 'LST_Night_1km'
-
-    lst_q = {}
-    lst_q['day1030'] = 'QC_Day'
-    lst_q['day1330'] = 'QC_Day'
-    lst_q['night2230'] = 'QC_Night'
-    lst_q['night0130'] = 'QC_Night'
-
-    lst_s = {}
-    lst_s['day1030'] = 'MODIS/006/MOD11A2'
-    lst_s['day1330'] = 'MODIS/006/MYD11A2'
-    lst_s['night2230'] = 'MODIS/006/MOD11A2'
-    lst_s['night0130'] = 'MODIS/006/MYD11A2'
-
-    lst_n = {}
-    lst_n['day1030'] = 'MOD11A2'
-    lst_n['day1330'] = 'MYD11A2'
-    lst_n['night2230'] = 'MOD11A2'
-    lst_n['night0130'] = 'MYD11A2'
-    
-    #Computes the bits we need to extract.
-    def getQABits(image, start, end, newName):
-        pattern = 0
-        listB = list(range(start, end+1))
-        for one in listB:
-            pattern += math.pow(2, one)
-            pattern = int(pattern)
-    
-        return (image.select([0], [newName])
-                  .bitwiseAnd(pattern)
-                  .rightShift(start))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     time_d = {}
     time_d['lowest'] = 'rl'
     time_d['month'] = 'rm'
     time_d['year'] = 'ry'
-    
-    for met in metric:
-        modisLST = ee.ImageCollection(lst_s[met])
+
+    #Terra (MOD11A2) or Aqua (MYD11A2) dataset of each time of day
+    lstL = [registry.metricDataset(met, ['MOD11A2', 'MYD11A2']) for met in metric]
+
+    #date range of every collection, fetched in one request if not cached
+    collectionCache.prefetch([lst.collection for lst in lstL])
+
+    for met, lst in zip(metric, lstL):
+        modisLST = ee.ImageCollection(lst.collection)
         metL = [met]
-        def maskbyBits1(img):
-            QA = img.select(lst_q[metL[0]])
-            QA1 = getQABits(QA, 0, 1, 'QA')
-            QA2 = getQABits(QA, 2, 3, 'QA')
-            QA3 = getQABits(QA, 4, 5, 'QA')
-            QA4 = getQABits(QA, 6, 7, 'QA')
-            mask = QA1.eq(0).And(QA2.eq(0)).And(QA3.lt(2)).And(QA4.lt(2))
-            return img.updateMask(mask)
-        
-        if QC == 'None':
-            modisLSTn = modisLST.select(lst_d[met])
-        elif QC == 'Op1':
-            modisLSTn = modisLST.map(maskbyBits1).select(lst_d[met])
 
-        def KtoC(img):
-            return (img.select(lst_d[metL[0]])
-                    .float()
-                    .multiply(0.02)
-                    .subtract(273.15)
-                    .copyProperties(img,['system:time_start','system:time_end']))
+        #mask poor-quality pixels with the QA bit rules of QC
+        maskbyBits = extractEngine.qaMask(lst, QC, met)
 
-        lastImage = ee.Image(ee.ImageCollection(lst_s[met])
-                         .sort('system:time_start',False)
-                         .first())
-        lastImageDate = lastImage.get('system:index').getInfo()
+        if maskbyBits is None:
+            modisLSTn = modisLST.select(lst.band(met))
+        else:
+            modisLSTn = modisLST.map(maskbyBits).select(lst.band(met))
 
-        firstImage = ee.Image(ee.ImageCollection(lst_s[met])
-                         .sort('system:time_start',True)
-                         .first())
-        firstImageDate = firstImage.get('system:index').getInfo()
+        firstImageDate, lastImageDate = collectionCache.indexRange(lst.collection)
 
         if all([startYear is None,endYear is None]):
             startYear = int(firstImageDate[0:4])
@@ -1952,13 +1051,13 @@ def GEElstMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
             years = list(range(startYear, endYearAll + 1))
             monthsEE = ee.List(list(range(startMonth,(12*len(years)+endMonth))))
             yearsEE = ee.List(list(range(startYearAll, endYearAll + 1)))
-            
+
         elif all([startYear >= 0,endYear >= 0]):
             startYearReal = int(firstImageDate[0:4])
-            endYearReal = int(lastImageDate[0:4]) 
-            
+            endYearReal = int(lastImageDate[0:4])
+
             years = list(range(max(startYearReal,startYear), (min(endYearReal,endYear) + 1)))
-        
+
             if endYear >= endYearReal:
                 endMonth = int(lastImageDate[5:7])-1
                 endYearReal2 = endYearReal-1
@@ -1967,149 +1066,47 @@ def GEElstMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
                 endMonth = 0
                 endYearReal2 = endYearReal
                 years2 = len(years)
-                
+
             if startYear <= startYearReal:
                 startMonth = int(firstImageDate[5:7])
                 startYearReal2 = startYearReal+1
             elif startYear > startYearReal:
                 startMonth = 0
                 startYearReal2 = startYearReal
-            
+
             monthsEE = ee.List(list(range(startMonth,(12*years2+endMonth))))
             yearsEE = ee.List(list(range(max(startYearReal2,startYear), (min(endYearReal2,endYear) + 1))))
 
-
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (modisLSTn
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (modisLSTn
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col1 = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (modisLSTn
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (modisLSTn
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col1 = ee.ImageCollection(monthsEE.map(map_m).flatten())
-          
-        elif all([timeStep == 'lowest',endYear is None, startYear is None]):
+        if all([timeStep == 'lowest',endYear is None, startYear is None]):
 
             img_col1 = modisLSTn
-            
+
         elif all([timeStep == 'lowest',endYear > 0, startYear > 0]):
 
             img_col1 = modisLSTn.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-        #else:
-            #print("incorrect time step specified")
-        
-        img_col = img_col1.map(KtoC)
-        
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(lst_d[metL[0]])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_'+lst_n[metL[0]]+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for LST: ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(lst_d[metL[0]])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_'+lst_n[metL[0]]+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for LST: ' + met)
-
         else:
-            def table_m(image):
-                table = (image
-                    .select(lst_d[metL[0]])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_'+lst_n[metL[0]]+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for LST: ' + met)
-
-def GEEviMODIS(ptsFile,metric,timeStep,buf,poly,QC, username,folderOut, scalePix = 250,startYear = None,endYear = None):
+
+            img_col1 = extractEngine.aggregateTime(modisLSTn, timeStep, yearsEE, monthsEE, years[0])
+
+        #Kelvin to Celsius, on Earth Engine or after the reduction with deferScale
+        deferred = deferScale and extractEngine.canDeferScale(lst, metL, options['reducers'])
+        img_col = img_col1 if deferred else extractEngine.scaleCollection(img_col1, lst, metL, lst.band(met))
+
+        tasks += extractEngine.extractCollection(img_col, lst.band(met), pts1, buf, poly,
+                                                 time_d[timeStep]+'_'+lst.name+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands,
+                                                 deferScale = deferred, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEviMODIS(ptsFile,metric,timeStep,buf,poly,QC, username,folderOut, scalePix = 250,startYear = None,endYear = None,
+               timeAsBands = False, deferScale = False, **options):
     """    
     Calculates NDVI or EVI at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
     Calculates all available years.
@@ -2140,54 +1137,53 @@ def GEEviMODIS(ptsFile,metric,timeStep,buf,poly,QC, username,folderOut, scalePix
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 250
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
     
     startYear - The start of the time-series (year)
 
     endYear - The end of the time-series (year)
     
     If you don't specify the startYear and endYear the default is to download the entire time-series
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    deferScale - If True, the bands are reduced in their stored units and the registry scale and offset
+        are applied to the reduced values by consolidate (or directFetch), instead of to every pixel of
+        every image on Earth Engine. The exports get the suffix '_dn'. Default: False
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    import math
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
-    
-    #Computes the bits we need to extract.
-    def getQABits(image, start, end, newName):
-        pattern = 0
-        listB = list(range(start, end+1))
-        for one in listB:
-            pattern += math.pow(2, one)
-            pattern = int(pattern)
-    
-        return (image.select([0], [newName])
-                  .bitwiseAnd(pattern)
-                  .rightShift(start))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     time_d = {}
     time_d['lowest'] = 'rl'
     time_d['month'] = 'rm'
     time_d['year'] = 'ry'
 
-    lastImage = ee.Image(ee.ImageCollection('MODIS/006/MOD13Q1')
-                         .sort('system:time_start',False)
-                         .first())
-    lastImageDate = lastImage.get('system:index').getInfo()
+    vi = registry.get('MOD13Q1')
+
+    firstImageDate, lastImageDate = collectionCache.indexRange(vi.collection)
 
-    firstImage = ee.Image(ee.ImageCollection('MODIS/006/MOD13Q1')
-                         .sort('system:time_start',True)
-                         .first())
-    firstImageDate = firstImage.get('system:index').getInfo()
-    
     if all([startYear is None,endYear is None]):
         startYear = int(firstImageDate[0:4])
         endYear = int(lastImageDate[0:4])
@@ -2199,13 +1195,13 @@ def GEEviMODIS(ptsFile,metric,timeStep,buf,poly,QC, username,folderOut, scalePix
         years = list(range(startYear, endYearAll + 1))
         monthsEE = ee.List(list(range(startMonth,(12*len(years)+endMonth))))
         yearsEE = ee.List(list(range(startYearAll, endYearAll + 1)))
-        
+
     elif all([startYear >= 0,endYear >= 0]):
         startYearReal = int(firstImageDate[0:4])
-        endYearReal = int(lastImageDate[0:4]) 
-        
+        endYearReal = int(lastImageDate[0:4])
+
         years = list(range(max(startYearReal,startYear), (min(endYearReal,endYear) + 1)))
-    
+
         if endYear >= endYearReal:
             endMonth = int(lastImageDate[5:7])-1
             endYearReal2 = endYearReal-1
@@ -2214,181 +1210,59 @@ def GEEviMODIS(ptsFile,metric,timeStep,buf,poly,QC, username,folderOut, scalePix
             endMonth = 0
             endYearReal2 = endYearReal
             years2 = len(years)
-            
+
         if startYear <= startYearReal:
             startMonth = int(firstImageDate[5:7])
             startYearReal2 = startYearReal+1
         elif startYear > startYearReal:
             startMonth = 0
             startYearReal2 = startYearReal
-        
+
         monthsEE = ee.List(list(range(startMonth,(12*years2+endMonth))))
         yearsEE = ee.List(list(range(max(startYearReal2,startYear), (min(endYearReal2,endYear) + 1))))
-    
+
     for met in metric:
-        modisVI = ee.ImageCollection('MODIS/006/MOD13Q1')
+        modisVI = ee.ImageCollection(vi.collection)
         metL = [met]
-        def maskbyBits1(img):
-            QA = img.select('DetailedQA')
-            QA1 = getQABits(QA, 0, 1, 'QA')
-            QA2 = getQABits(QA, 2, 5, 'QA')
-            QA3 = getQABits(QA, 6, 7, 'QA')
-            QA4 = getQABits(QA, 8, 8, 'QA')
-            QA5 = getQABits(QA, 10, 10, 'QA')
-            QA6 = getQABits(QA, 15, 15, 'QA')
-            mask = QA1.lt(2).And(QA2.lt(12)).And(QA3.neq(3)).And(QA3.neq(0)).And(QA4.eq(0)).And(QA5.eq(0)).And(QA6.eq(0))
-            return img.updateMask(mask)
-        
-        def maskbyBits2(img):
-            QA = img.select('DetailedQA')
-            QA1 = getQABits(QA, 0, 1, 'QA')
-            mask = QA1.eq(0)
-            return img.updateMask(mask)
-        
-        if QC == 'None':
-            modisVIn = modisVI.select(met)
-        elif QC == 'Op1':
-            modisVIn = modisVI.map(maskbyBits1).select(met)
-        elif QC == 'Op2':            
-            modisVIn = modisVI.map(maskbyBits2).select(met)
 
-        def scale1(img):
-            return (img.select(metL[0])
-                    .float()
-                    .multiply(0.0001)
-                    .copyProperties(img,['system:time_start','system:time_end']))
+        #mask poor-quality pixels with the QA bit rules of QC
+        maskbyBits = extractEngine.qaMask(vi, QC)
 
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (modisVIn
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (modisVIn
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col1 = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (modisVIn
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (modisVIn
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col1 = ee.ImageCollection(monthsEE.map(map_m).flatten())
-        
-        elif all([timeStep == 'lowest',endYear is None, startYear is None]):
+        if maskbyBits is None:
+            modisVIn = modisVI.select(met)
+        else:
+            modisVIn = modisVI.map(maskbyBits).select(met)
+
+        if all([timeStep == 'lowest',endYear is None, startYear is None]):
 
             img_col1 = modisVIn
-            
+
         elif all([timeStep == 'lowest',endYear > 0, startYear > 0]):
 
             img_col1 = modisVIn.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-        #else:
-            #print("incorrect time step specified")
-        
-        img_col = img_col1.map(scale1)
-        
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MOD13Q1_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for: ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MOD13Q1_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for: ' + met)
-
         else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MOD13Q1_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for: ' + met)
-
-def GEEsmos(ptsFile,metric,timeStep,buf,poly,username,folderOut, scalePix = 25000,startYear = None,endYear = None):
+
+            img_col1 = extractEngine.aggregateTime(modisVIn, timeStep, yearsEE, monthsEE, years[0])
+
+        #scaled on Earth Engine, or after the reduction with deferScale
+        deferred = deferScale and extractEngine.canDeferScale(vi, metL, options['reducers'])
+        img_col = img_col1 if deferred else extractEngine.scaleCollection(img_col1, vi, metL, metL[0])
+
+        tasks += extractEngine.extractCollection(img_col, metL[0], pts1, buf, poly,
+                                                 time_d[timeStep]+'_MOD13Q1_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands,
+                                                 deferScale = deferred, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEsmos(ptsFile,metric,timeStep,buf,poly,username,folderOut, scalePix = 25000,startYear = None,endYear = None,
+            singlePass = False, timeAsBands = False, **options):
     """    
     Calculates soil moisture at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
 
@@ -2414,41 +1288,52 @@ def GEEsmos(ptsFile,metric,timeStep,buf,poly,username,folderOut, scalePix = 2500
     Optional parameters    
 
     scalePix - scale/spatial resolution. Default: 25000
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
+
+    singlePass - If True, all metrics are stacked as bands and reduced in a single pass, exporting
+        one table (one Earth Engine task) with one column per metric. Default: False
     
     startYear - The start of the time-series (year)
 
     endYear - The end of the time-series (year)
     
     If you don't specify the startYear and endYear the default is to download the entire time-series
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     time_d = {}
     time_d['lowest'] = 'rl'
     time_d['month'] = 'rm'
     time_d['year'] = 'ry'
 
-    lastImage = ee.Image(ee.ImageCollection('NASA_USDA/HSL/soil_moisture')
-                         .sort('system:time_start',False)
-                         .first())
-    lastImageDate = lastImage.get('system:index').getInfo()
+    smos = registry.get('SMOS')
+
+    firstImageDate, lastImageDate = collectionCache.indexRange(smos.collection)
 
-    firstImage = ee.Image(ee.ImageCollection('NASA_USDA/HSL/soil_moisture')
-                         .sort('system:time_start',True)
-                         .first())
-    firstImageDate = firstImage.get('system:index').getInfo()
-     
     #startMonth - 1, because time-series starts on Jan 1
     #startYearAll: did't add one, for same reason
     if all([startYear is None,endYear is None]):
@@ -2458,17 +1343,17 @@ def GEEsmos(ptsFile,metric,timeStep,buf,poly,username,folderOut, scalePix = 2500
         endMonth = int(lastImageDate[(len(lastImageDate)-4):(len(lastImageDate)-2)])-1
         startYearAll = startYear
         endYearAll = endYear - 1
-        
+
         years = list(range(startYear, endYearAll + 1))
         monthsEE = ee.List(list(range(startMonth,(12*len(years)+endMonth))))
         yearsEE = ee.List(list(range(startYearAll, endYearAll + 1)))
-        
+
     elif all([startYear >= 0,endYear >= 0]):
         startYearReal = int(firstImageDate[(len(firstImageDate)-8):(len(firstImageDate)-4)])
-        endYearReal = int(lastImageDate[(len(lastImageDate)-8):(len(lastImageDate)-4)]) 
-        
+        endYearReal = int(lastImageDate[(len(lastImageDate)-8):(len(lastImageDate)-4)])
+
         years = list(range(max(startYearReal,startYear), (min(endYearReal,endYear) + 1)))
-    
+
         if endYear >= endYearReal:
             endMonth = int(lastImageDate[(len(lastImageDate)-4):(len(lastImageDate)-2)])-1
             endYearReal2 = endYearReal-1
@@ -2477,148 +1362,43 @@ def GEEsmos(ptsFile,metric,timeStep,buf,poly,username,folderOut, scalePix = 2500
             endMonth = 0
             endYearReal2 = endYearReal
             years2 = len(years)
-            
+
         if startYear <= startYearReal:
             startMonth = int(firstImageDate[(len(firstImageDate)-4):(len(firstImageDate)-2)])-1
         elif startYear > startYearReal:
             startMonth = 0
-        
+
         monthsEE = ee.List(list(range(startMonth,(12*years2+endMonth))))
         yearsEE = ee.List(list(range(max(startYearReal,startYear), (min(endYearReal2,endYear) + 1))))
-    
-    for met in metric:
-        SMOS = ee.ImageCollection('NASA_USDA/HSL/soil_moisture').select(met)
-        metL = [met]
-        
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (SMOS
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (SMOS
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (SMOS
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (SMOS
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-        elif all([timeStep == 'lowest',endYear is None, startYear is None]):
+
+    for mets in extractEngine.metricGroups(metric, singlePass):
+        SMOS = ee.ImageCollection(smos.collection).select(mets)
+
+        if all([timeStep == 'lowest',endYear is None, startYear is None]):
 
             img_col = SMOS
-            
+
         elif all([timeStep == 'lowest',endYear > 0, startYear > 0]):
 
             img_col = SMOS.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-        #else:
-            #print("incorrect time step specified")
-       
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_SMOS_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for SMOS: ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_SMOS_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for SMOS: ' + met)
-
         else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = str(time_d[timeStep])+'_SMOS_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for SMOS: ' + met)
-            
-def GEEterraClimatePtsAvgMonth(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, scalePix = 4000):
+
+            img_col = extractEngine.aggregateTime(SMOS, timeStep, yearsEE, monthsEE, years[0])
+
+        tasks += extractEngine.extractCollection(img_col, mets, pts1, buf, poly,
+                                                 str(time_d[timeStep])+'_SMOS_'+'-'.join(mets)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEterraClimatePtsAvgMonth(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, scalePix = 4000,
+                               singlePass = False, deferScale = False, **options):
     """    
     Calculates global climate temporal monthly averages at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -2657,144 +1437,67 @@ def GEEterraClimatePtsAvgMonth(ptsFile,metric,startYear,endYear,buf,poly,usernam
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 4000
+
+    singlePass - If True, all metrics are stacked as bands and reduced in a single pass, exporting
+        one table (one Earth Engine task) with one column per metric. Default: False
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    deferScale - If True, the bands are reduced in their stored units and the registry scale and offset
+        are applied to the reduced values by consolidate (or directFetch), instead of to every pixel of
+        every image on Earth Engine. The exports get the suffix '_dn'. Default: False
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     years = list(range(startYear, endYear + 1))
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
-
-    ID_field = "geeID"
-
-    scale_d = {}
-    scale_d['aet'] = 0.1
-    scale_d['def'] = 0.1
-    scale_d['pdsi'] = 0.01
-    scale_d['pet'] = 0.1
-    scale_d['soil'] = 0.1
-    scale_d['srad'] = 0.1
-    scale_d['tmmn'] = 0.1
-    scale_d['tmmx'] = 0.1
-    scale_d['vap'] = 0.001
-    scale_d['vpd'] = 0.01
-    scale_d['vs'] = 0.01
-    
-    for met in metric:
-        metL = [met]
-        Gridmet_pr = ee.ImageCollection('IDAHO_EPSCOR/TERRACLIMATE').select(met)
-        
-        img_col0 = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
+    pts1 = extractEngine.loadPts(ptsFile, username)
 
-        if any([(met == 'pr'),(met == 'ro'),(met == 'swe')]):
+    tasks = []
 
-            img_col = img_col0
-            
-        else:
+    terraClimate = registry.get('TERRACLIMATE')
 
-            def Scale1(img):
-                return (img.float()
-                        .multiply(scale_d[metL[0]])
-                        .copyProperties(img,['system:time_start','system:time_end']))
+    for mets in extractEngine.metricGroups(metric, singlePass):
+        Gridmet_pr = ee.ImageCollection(terraClimate.collection).select(mets)
 
-            img_col = img_col0.map(Scale1)
-        
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'tcy'+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-            #print ('buffered pts by:' + str(buf) + ' for ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'tcy'+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for ' + met)
+        img_col0 = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-        else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'tcy'+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for ' + met)
+        #pr, ro and swe are not scaled; the others on Earth Engine, or after the reduction with deferScale
+        deferred = deferScale and extractEngine.canDeferScale(terraClimate, mets, options['reducers'])
+        img_col = img_col0 if deferred else extractEngine.scaleCollection(img_col0, terraClimate, mets)
+
+        tasks += extractEngine.extractCollection(img_col, mets, pts1, buf, poly,
+                                                 'tcy'+'_'+'-'.join(mets)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 deferScale = deferred, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
 
 
 def GEEnasaNEXGDDP(ptsFile,metric,timeStep,startYear,endYear,scenarios,buf,poly,username,folderOut,models = ['ACCESS1-0', 'bcc-csm1-1', 'BNU-ESM',
         'CanESM2', 'CCSM4', 'CESM1-BGC', 'CNRM-CM5', 'CSIRO-Mk3-6-0',
         'GFDL-CM3', 'GFDL-ESM2G', 'GFDL-ESM2M', 'inmcm4', 'IPSL-CM5A-LR',
         'IPSL-CM5A-MR', 'MIROC-ESM', 'MIROC-ESM-CHEM', 'MIROC5', 'MPI-ESM-LR',
-        'MPI-ESM-MR', 'MRI-CGCM3', 'NorESM1-M'], scalePix = 25000):
+        'MPI-ESM-MR', 'MRI-CGCM3', 'NorESM1-M'], scalePix = 25000, timeAsBands = False,
+                   ensemble = False, ensembleStats = None, deferScale = False, **options):
 
     """    
     Calculates future climate projections at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
@@ -2804,9 +1507,10 @@ def GEEnasaNEXGDDP(ptsFile,metric,timeStep,startYear,endYear,scenarios,buf,poly,
     ptsfile - file name of uploaded shapefile to GEE.
 
     metric - precipitation and temperature: ['pr', 'tasmin','tasmax']
-        'pr' = sum of precipitation, liquid and solid phases (kg/(m^2*s))
-        'tasmin' = mean daily min near surface air temperature (K)
-        'tasmax' = mean daily max near surface air temperature (K)
+        'pr' = precipitation, liquid and solid phases, summed over the days of each time step: the total
+            in mm with deferScale, otherwise the sum of the daily rates in kg/(m^2*s) (x 86400 for mm)
+        'tasmin' = mean daily min near surface air temperature (K, C with deferScale)
+        'tasmax' = mean daily max near surface air temperature (K, C with deferScale)
 
     timeStep - time step for temporal averaging, either 'day','month', OR 'year'
 
@@ -2833,218 +1537,136 @@ def GEEnasaNEXGDDP(ptsFile,metric,timeStep,startYear,endYear,scenarios,buf,poly,
         'MPI-ESM-MR', 'MRI-CGCM3', 'NorESM1-M']. Default is all models.
 
     scalePix - scale/spatial resolution. Default: 25000
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    ensemble - If True, each metric is filtered once for all models and scenarios and exported as a single
+        table (or one table per chunk) named ..._<scenarios>_ensemble_..., whose rows have 'model' and
+        'scenario' columns, instead of one export per metric, scenario and model. timeAsBands is not used.
+        Default: False
+
+    ensembleStats - list of statistics across models to export instead of the models themselves: 'mean',
+        'median', 'stdDev', 'variance', 'min', 'max' and percentiles 'p<n>', e.g. ['mean', 'stdDev', 'p10', 'p90'].
+        They are computed for each time step and scenario before the reduction over the points/polygons, and
+        exported like ensemble = True in a table named ..._<scenarios>_ensembleStats_..., with one row per
+        point/polygon, time step and scenario and a column 'ens_<statistic>' per statistic. Default: None
+
+    deferScale - If True, the bands are reduced in their stored units and the registry scale and offset
+        are applied to the reduced values by consolidate (or directFetch), instead of to every pixel of
+        every image on Earth Engine. The exports get the suffix '_dn'. Default: False
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
 
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
-
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     time_d = {}
     time_d['day'] = 'projd'
     time_d['month'] = 'projm'
     time_d['year'] = 'projy'
-    
+
+    nex = registry.get('NEX')
+
     for met in metric:
 
+        #precipitation is summed over each time step, temperature is averaged
+        stat = nex.stat(met)
+
+        #units are only converted with deferScale, after the reduction: converting every daily image on
+        #Earth Engine fails when there are too many pts
+        deferred = deferScale and extractEngine.canDeferScale(nex, [met], options['reducers'])
+        serverScale = deferScale and not deferred
+
+        if ensemble or ensembleStats:
+
+            years = list(range(startYear, endYear + 1))
+            monthsEE = ee.List(list(range(0,(12*len(years)))))
+            yearsEE = ee.List(years)
+
+            NEX = ee.ImageCollection(nex.collection).select(met)
+
+            if timeStep == 'day':
+
+                NEX = NEX.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
+
+            def aggregate(member):
+                if serverScale:
+                    member = extractEngine.scaleCollection(member, nex, [met])
+                return extractEngine.aggregateTime(member, timeStep, yearsEE, monthsEE, years[0], stat = stat)
+
+            img_col = extractEngine.ensembleCollection(NEX, models, scenarios, aggregate)
+
+            bands = met
+            members = 'ensemble'
+            properties = ['model', 'scenario']
+
+            if ensembleStats:
+                #only the statistics across models are reduced over the points/polygons
+                img_col = extractEngine.ensembleStats(img_col, ensembleStats)
+                bands = ['ens_' + stat for stat in ensembleStats]
+                members = 'ensembleStats'
+                properties = ['scenario']
+
+            tasks += extractEngine.extractCollection(img_col, bands, pts1, buf, poly,
+                                                     str(time_d[timeStep])+'_NEX_'+str(met)+'_'+'-'.join(scenarios)+'_'+members+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                     folderOut, scalePix,
+                                                     properties = properties,
+                                                     deferScale = deferred, **options)
+
+            continue
+
         for scenario in scenarios:
 
                 for model in models:
 
-                    NEX = (ee.ImageCollection('NASA/NEX-GDDP')
+                    NEX = (ee.ImageCollection(nex.collection)
                         .select(met)
                         .filterMetadata('model', 'equals', model)
                         .filterMetadata('scenario', 'equals', scenario))
 
-                    metL = [met]
-                    
                     years = list(range(startYear, endYear + 1))
                     monthsEE = ee.List(list(range(0,(12*len(years)))))
                     yearsEE = ee.List(years)
 
-######Turned off unit conversion, because it fails when there are too many pts
-##                    if (met == 'pr'):
-##
-##                        def Scale1(img):
-##                            return (img.float()
-##                                    .multiply(86400)
-##                                    .copyProperties(img,['system:time_start','system:time_end']))
-##
-##                        NEX = NEX0.map(Scale1)
-##                        
-##                    elif any([(met == 'tasmin'),(met == 'tasmax')]):
-##
-##                        def KtoC(img):
-##                            return (img.float()
-##                                .subtract(273.15)
-##                                .copyProperties(img,['system:time_start','system:time_end']))
-##
-##                        NEX = NEX0.map(KtoC)
-                    
-                    if all([(timeStep == 'year'),any([(met == 'tasmin'),(met == 'tasmax')])]):
-
-                        def map_m(i):
-                            i = ee.Number(i).int()
-                            image2 = (NEX
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .first())
-                            filtered = (NEX
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .mean()
-                                .copyProperties(image2,['system:time_start','system:time_end']))
-                            return filtered
-
-                        img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-                    elif all([(timeStep == 'month'),any([(met == 'tasmin'),(met == 'tasmax')])]):
-                        
-                        def map_m(i):
-                            i = ee.Number(i)
-                            y = i.divide(12).add(years[0]).int()
-                            m = i.mod(12).add(1)
-                            image2 = (NEX
-                                .filter(ee.Filter.calendarRange(m, m, 'month'))
-                                .filter(ee.Filter.calendarRange(y, y, 'year'))
-                                .first())
-                            filtered = (NEX
-                                .filter(ee.Filter.calendarRange(m, m, 'month'))
-                                .filter(ee.Filter.calendarRange(y, y, 'year'))
-                                .mean()
-                                .copyProperties(image2,['system:time_start','system:time_end']))
-                            return filtered
-
-                        img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-                    elif all([(timeStep == 'year'),(met == 'pr')]):
-
-                        def map_m(i):
-                            i = ee.Number(i).int()
-                            image2 = (NEX
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .first())
-                            filtered = (NEX
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .sum()
-                                .copyProperties(image2,['system:time_start','system:time_end']))
-                            return filtered
-
-                        img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-                    elif all([(timeStep == 'month'),(met == 'pr')]):
-                        
-                        def map_m(i):
-                            i = ee.Number(i)
-                            y = i.divide(12).add(years[0]).int()
-                            m = i.mod(12).add(1)
-                            image2 = (NEX
-                                .filter(ee.Filter.calendarRange(m, m, 'month'))
-                                .filter(ee.Filter.calendarRange(y, y, 'year'))
-                                .first())
-                            filtered = (NEX
-                                .filter(ee.Filter.calendarRange(m, m, 'month'))
-                                .filter(ee.Filter.calendarRange(y, y, 'year'))
-                                .sum()
-                                .copyProperties(image2,['system:time_start','system:time_end']))
-                            return filtered
-
-                        img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-                    elif timeStep == 'day':
-
-                        img_col = NEX.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
-
-                    #else:
-                        #print("incorrect time step specified")
-                   
-                    if buf > 0:
-                        bufL = [buf]
-                        def bufferPoly(feature):
-                            return feature.buffer(bufL[0])
-
-                        ptsB = pts1.map(bufferPoly)
-                        def table_m(image):
-                            table = (image
-                                .select(metL[0])
-                                .reduceRegions(collection = ptsB.select([ID_field]),
-                                                reducer = ee.Reducer.mean(),
-                                                scale = scalePix))
-                                    
-                            def table_add_date(f):
-                                return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                            return table.map(table_add_date)
-
-                        triplets = img_col.map(table_m).flatten()
-
-                        task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                                .filter(ee.Filter.neq('mean', None))
-                                                                .select(['.*'],None,False),
-                                                                description = str(time_d[timeStep])+'_NEX_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                                folder = folderOut,
-                                                                fileFormat = 'CSV')
-                        task_tc.start()
-                
-                
-                        #print ('buffered pts by:' + str(buf) + ' for NEX: ' + met + ' ' + scenario + ' ' + model)
-
-                    elif poly > 0:
-                        
-                        def table_m(image):
-                            table = (image
-                                .select(metL[0])
-                                .reduceRegions(collection = pts1.select([ID_field]),
-                                                reducer = ee.Reducer.mean(),
-                                                scale = scalePix))
-                                    
-                            def table_add_date(f):
-                                return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                            return table.map(table_add_date)
-
-                        triplets = img_col.map(table_m).flatten()
-
-                        task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                                .filter(ee.Filter.neq('mean', None))
-                                                                .select(['.*'],None,False),
-                                                                description = str(time_d[timeStep])+'_NEX_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                                folder = folderOut,
-                                                                fileFormat = 'CSV')
-                        task_tc.start()
-                
-                
-                        #print ('spatial mean in poly: no buffer for NEX: ' + met + ' ' + scenario + ' ' + model)
-
-                    else:
-                        def table_m(image):
-                            table = (image
-                                .select(metL[0])
-                                .reduceRegions(collection = pts1.select([ID_field]),
-                                                reducer = ee.Reducer.mean(),
-                                                scale = scalePix))
-                                    
-                            def table_add_date(f):
-                                return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                            return table.map(table_add_date)
-
-                        triplets = img_col.map(table_m).flatten()
-
-                        task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                                .filter(ee.Filter.neq('mean', None))
-                                                                .select(['.*'],None,False),
-                                                                description = str(time_d[timeStep])+'_NEX_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                                folder = folderOut,
-                                                                fileFormat = 'CSV')
-                        task_tc.start()
-                            
-                        #print('value at point: no buffer for NEX: ' + met + ' ' + scenario + ' ' + model)
+                    if serverScale:
+                        NEX = extractEngine.scaleCollection(NEX, nex, [met])
+
+                    if timeStep == 'day':
+
+                        NEX = NEX.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
+
+                    img_col = extractEngine.aggregateTime(NEX, timeStep, yearsEE, monthsEE, years[0], stat = stat)
+
+                    tasks += extractEngine.extractCollection(img_col, met, pts1, buf, poly,
+                                                             str(time_d[timeStep])+'_NEX_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                             folderOut, scalePix,
+                                                             timeAsBands = timeAsBands,
+                                                             deferScale = deferred, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
 
 ###This almost always fails, maybe turn this option off
 # =============================================================================
@@ -3235,7 +1857,7 @@ def GEEnasaNEXGDDP(ptsFile,metric,timeStep,startYear,endYear,scenarios,buf,poly,
 #                     #print('value at point: no buffer for NEX: ' + met + ' ' + scenario + ' ' + 'Agg21GCM')
 # =============================================================================
 
-def GEEmonthTRMM(ptsFile,startYear,endYear,buf,poly,username,folderOut, scalePix = 25000):
+def GEEmonthTRMM(ptsFile,startYear,endYear,buf,poly,username,folderOut, scalePix = 25000, **options):
     """    
     Calculates global average precipitation rate (mm/hr) per month at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -3258,113 +1880,51 @@ def GEEmonthTRMM(ptsFile,startYear,endYear,buf,poly,username,folderOut, scalePix
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 25000
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
 
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     years = list(range(startYear, endYear + 1))
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
+
+    trmm = registry.get('TRMM')
+
+    TRMM = ee.ImageCollection(trmm.collection).select(trmm.band('pr'))
 
-    ID_field = "geeID"
-              
-    TRMM = ee.ImageCollection('TRMM/3B43V7').select('precipitation')
-        
     img_col = TRMM.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
-        
-    if buf > 0:
-        bufL = [buf]
-        def bufferPoly(feature):
-            return feature.buffer(bufL[0])
-
-        ptsB = pts1.map(bufferPoly)
-        def table_m(image):
-            table = (image
-                .select('precipitation')
-                .reduceRegions(collection = ptsB.select([ID_field]),
-                                reducer = ee.Reducer.mean(),
-                                scale = scalePix))
-                        
-            def table_add_date(f):
-                return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-            return table.map(table_add_date)
-
-        triplets = img_col.map(table_m).flatten()
-
-        task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 'rm_TRMM_pr_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-    
-        #print ('buffered pts by:' + str(buf) + ' for TRMM')
-
-    elif poly > 0:
-            
-        def table_m(image):
-            table = (image
-                .select('precipitation')
-                .reduceRegions(collection = pts1.select([ID_field]),
-                                reducer = ee.Reducer.mean(),
-                                scale = scalePix))
-                        
-            def table_add_date(f):
-                return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-            return table.map(table_add_date)
-
-        triplets = img_col.map(table_m).flatten()
-
-        task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 'rm_TRMM_pr_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-    
-    
-        #print ('spatial mean in poly: no buffer for TRMM')
 
-    else:
-        def table_m(image):
-            table = (image
-                .select('precipitation')
-                .reduceRegions(collection = pts1.select([ID_field]),
-                                reducer = ee.Reducer.mean(),
-                                scale = scalePix))
-                        
-            def table_add_date(f):
-                return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-            return table.map(table_add_date)
-
-        triplets = img_col.map(table_m).flatten()
-
-        task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                .filter(ee.Filter.neq('mean', None))
-                                                .select(['.*'],None,False),
-                                                description = 'rm_TRMM_pr_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                folder = folderOut,
-                                                fileFormat = 'CSV')
-        task_tc.start()
-                
-        #print('value at point: no buffer for TRMM')
-
-
-def GEEprismPtsAvgMonth(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, scalePix = 4000):
+    tasks += extractEngine.extractCollection(img_col, trmm.band('pr'), pts1, buf, poly,
+                                             'rm_TRMM_pr_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                             folderOut, scalePix, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEprismPtsAvgMonth(ptsFile,metric,startYear,endYear,buf,poly,username,folderOut, scalePix = 4000,
+                        singlePass = False, **options):
     """    
     Calculates PRISM climate temporal monthly averages at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
 
@@ -3396,114 +1956,53 @@ def GEEprismPtsAvgMonth(ptsFile,metric,startYear,endYear,buf,poly,username,folde
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 4000
+
+    singlePass - If True, all metrics are stacked as bands and reduced in a single pass, exporting
+        one table (one Earth Engine task) with one column per metric. Default: False
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
 
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
-
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     years = list(range(startYear, endYear + 1))
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
+
+    for mets in extractEngine.metricGroups(metric, singlePass):
+        Gridmet_pr = ee.ImageCollection(registry.get('PRISM').collection).select(mets)
 
-    ID_field = "geeID"
-    
-    for met in metric:
-        metL = [met]
-        Gridmet_pr = ee.ImageCollection('OREGONSTATE/PRISM/AN81m').select(met)
-        
         img_col = Gridmet_pr.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
-        
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'pri'+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-            #print ('buffered pts by:' + str(buf) + ' for ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'pri'+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for ' + met)
 
-        else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = 'pri'+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for ' + met)
+        tasks += extractEngine.extractCollection(img_col, mets, pts1, buf, poly,
+                                                 'pri'+'_'+'-'.join(mets)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
 
 def GEEmacaGCMs(ptsFile,metric,timeStep,startYear,endYear,scenarios,buf,poly,models,
-                username,folderOut, scalePix = 4000):
+                username,folderOut, scalePix = 4000,
+                ensemble = False, ensembleStats = None, **options):
     """    
     Calculates MACA future climate projections at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
 
@@ -3543,164 +2042,123 @@ def GEEmacaGCMs(ptsFile,metric,timeStep,startYear,endYear,scenarios,buf,poly,mod
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 4000
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    ensemble - If True, each metric is filtered once for all models and scenarios and exported as a single
+        table (or one table per chunk) named ..._<scenarios>_ensemble_..., whose rows have 'model' and
+        'scenario' columns, instead of one export per metric, scenario and model. Default: False
+
+    ensembleStats - list of statistics across models to export instead of the models themselves: 'mean',
+        'median', 'stdDev', 'variance', 'min', 'max' and percentiles 'p<n>', e.g. ['mean', 'stdDev', 'p10', 'p90'].
+        They are computed for each time step and scenario before the reduction over the points/polygons, and
+        exported like ensemble = True in a table named ..._<scenarios>_ensembleStats_..., with one row per
+        point/polygon, time step and scenario and a column 'ens_<statistic>' per statistic. Default: None
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-        
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     time_d = {}
     time_d['month'] = 'projm'
     time_d['year'] = 'projy'
-    
+
+    maca = registry.get('MACA')
+
     for met in metric:
 
+        #precipitation is summed over each year, all other metrics are averaged
+        stat = maca.stat(met)
+
+        if ensemble or ensembleStats:
+
+            years = list(range(startYear, endYear + 1))
+            yearsEE = ee.List(years)
+
+            MACA = ee.ImageCollection(maca.collection).select(met)
+
+            if timeStep == 'month':
+
+                #MACA is already monthly
+                MACA = MACA.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
+
+                img_col = extractEngine.ensembleCollection(MACA, models, scenarios)
+
+            else:
+
+                def aggregate(member):
+                    return extractEngine.aggregateTime(member, timeStep, yearsEE, None, years[0], stat = stat)
+
+                img_col = extractEngine.ensembleCollection(MACA, models, scenarios, aggregate)
+
+            bands = met
+            members = 'ensemble'
+            properties = ['model', 'scenario']
+
+            if ensembleStats:
+                #only the statistics across models are reduced over the points/polygons
+                img_col = extractEngine.ensembleStats(img_col, ensembleStats)
+                bands = ['ens_' + stat for stat in ensembleStats]
+                members = 'ensembleStats'
+                properties = ['scenario']
+
+            tasks += extractEngine.extractCollection(img_col, bands, pts1, buf, poly,
+                                                     str(time_d[timeStep])+'_MACA_'+str(met)+'_'+'-'.join(scenarios)+'_'+members+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                     folderOut, scalePix,
+                                                     properties = properties, **options)
+
+            continue
+
         for scenario in scenarios:
 
             for model in models:
 
-                MACA = (ee.ImageCollection('IDAHO_EPSCOR/MACAv2_METDATA_MONTHLY')
+                MACA = (ee.ImageCollection(maca.collection)
                         .select(met)
                         .filterMetadata('model', 'equals', model)
                         .filterMetadata('scenario', 'equals', scenario))
 
-                metL = [met]
-                    
                 years = list(range(startYear, endYear + 1))
                 yearsEE = ee.List(years)
-                    
-                if all([(timeStep == 'year'),any([(met == 'tasmin'),(met == 'tasmax'),
-                                                      (met == 'huss'),(met == 'rsds'),
-                                                      (met == 'was')])]):
-
-                    def map_m(i):
-                        i = ee.Number(i).int()
-                        image2 = (MACA
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .first())
-                        filtered = (MACA
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .mean()
-                                .copyProperties(image2,['system:time_start','system:time_end']))
-                        return filtered
-
-                    img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-                elif (timeStep == 'month'):
-                        
+
+                if timeStep == 'month':
+
+                    #MACA is already monthly
                     img_col = MACA.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-                elif all([(timeStep == 'year'),(met == 'pr')]):
+                else:
 
-                    def map_m(i):
-                        i = ee.Number(i).int()
-                        image2 = (MACA
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .first())
-                        filtered = (MACA
-                                .filter(ee.Filter.calendarRange(i, i, 'year'))
-                                .sum()
-                                .copyProperties(image2,['system:time_start','system:time_end']))
-                        return filtered
+                    img_col = extractEngine.aggregateTime(MACA, timeStep, yearsEE, None, years[0], stat = stat)
 
-                    img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
+                tasks += extractEngine.extractCollection(img_col, met, pts1, buf, poly,
+                                                         str(time_d[timeStep])+'_MACA_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                         folderOut, scalePix, **options)
 
-                #else:
-                    #print("incorrect time step specified")
-                   
-                if buf > 0:
-                    bufL = [buf]
-                    def bufferPoly(feature):
-                        return feature.buffer(bufL[0])
-
-                    ptsB = pts1.map(bufferPoly)
-                    def table_m(image):
-                        table = (image
-                                .select(metL[0])
-                                .reduceRegions(collection = ptsB.select([ID_field]),
-                                                reducer = ee.Reducer.mean(),
-                                                scale = scalePix))
-                                    
-                        def table_add_date(f):
-                            return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                        return table.map(table_add_date)
-
-                    triplets = img_col.map(table_m).flatten()
-
-                    task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                                .filter(ee.Filter.neq('mean', None))
-                                                                .select(['.*'],None,False),
-                                                                description = str(time_d[timeStep])+'_MACA_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                                folder = folderOut,
-                                                                fileFormat = 'CSV')
-                    task_tc.start()
-                
-                
-                    #print ('buffered pts by:' + str(buf) + ' for MACA: ' + met + ' ' + scenario + ' ' + model)
-
-                elif poly > 0:
-                        
-                    def table_m(image):
-                        table = (image
-                                .select(metL[0])
-                                .reduceRegions(collection = pts1.select([ID_field]),
-                                                reducer = ee.Reducer.mean(),
-                                                scale = scalePix))
-                                    
-                        def table_add_date(f):
-                            return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                        return table.map(table_add_date)
-
-                    triplets = img_col.map(table_m).flatten()
-
-                    task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                                .filter(ee.Filter.neq('mean', None))
-                                                                .select(['.*'],None,False),
-                                                                description = str(time_d[timeStep])+'_MACA_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                                folder = folderOut,
-                                                                fileFormat = 'CSV')
-                    task_tc.start()
-                
-                
-                    #print ('spatial mean in poly: no buffer for MACA: ' + met + ' ' + scenario + ' ' + model)
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
 
-                else:
-                    def table_m(image):
-                        table = (image
-                                .select(metL[0])
-                                .reduceRegions(collection = pts1.select([ID_field]),
-                                                reducer = ee.Reducer.mean(),
-                                                scale = scalePix))
-                                    
-                        def table_add_date(f):
-                            return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                        return table.map(table_add_date)
-
-                    triplets = img_col.map(table_m).flatten()
-
-                    task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                                .filter(ee.Filter.neq('mean', None))
-                                                                .select(['.*'],None,False),
-                                                                description = str(time_d[timeStep])+'_MACA_'+str(met)+'_'+scenario+'_'+model+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                                folder = folderOut,
-                                                                fileFormat = 'CSV')
-                    task_tc.start()
-                            
-                    #print('value at point: no buffer for MACA: ' + met + ' ' + scenario + ' ' + model)
-
-             
-def GEEetMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix = 1000, startYear = None, endYear = None):
+    return tasks
+
+
+def GEEetMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix = 1000, startYear = None, endYear = None,
+               timeAsBands = False, **options):
     """    
     Calculates ET/PET at point OR mean within buffer of point if buf > 0 OR mean within polygon if poly = 1
     Calculates all available years.
@@ -3730,86 +2188,75 @@ def GEEetMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
     Optional parameters
 
     scalePix - scale/spatial resolution. Default: 1000
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
     
     startYear - The start of the time-series (year)
 
     endYear - The end of the time-series (year)
     
     If you don't specify the startYear and endYear the default is to download the entire time-series
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
     
     """
-      
+
+    options = extractEngine.extractOptions(options)
+
+
     # load required libraries
     import ee
-    import math
-    
-    # Initialize the Earth Engine object, using the authentication credentials.
-    ee.Initialize()
 
-    ID_field = "geeID"
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
 
     #load pts or poly file
-    pts1 = ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
-    
-    #Computes the bits we need to extract.
-    def getQABits(image, start, end, newName):
-        pattern = 0
-        listB = list(range(start, end+1))
-        for one in listB:
-            pattern += math.pow(2, one)
-            pattern = int(pattern)
-    
-        return (image.select([0], [newName])
-                  .bitwiseAnd(pattern)
-                  .rightShift(start))
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
 
     time_d = {}
     time_d['lowest'] = 'rl'
     time_d['month'] = 'rm'
     time_d['year'] = 'ry'
-    
+
+    et = registry.get('MOD16A2')
+
     for met in metric:
-        modisET = ee.ImageCollection('MODIS/006/MOD16A2')
+        modisET = ee.ImageCollection(et.collection)
         metL = [met]
-        
-        def maskbyBits1(img):
-            QA = img.select('ET_QC')
-            QA1 = getQABits(QA, 0, 0, 'QA')
-            QA2 = getQABits(QA, 2, 2, 'QA')
-            QA3 = getQABits(QA, 3, 4, 'QA')
-            QA4 = getQABits(QA, 5, 7, 'QA')
-            mask = QA1.eq(0).And(QA2.eq(0)).And(QA3.eq(0)).And(QA4.lt(4))
-            return img.updateMask(mask)
-
-        if QC == 'None':
+
+        #mask poor-quality pixels with the QA bit rules of QC
+        maskbyBits = extractEngine.qaMask(et, QC)
+
+        if maskbyBits is None:
             modisETn = modisET
-        elif QC == 'Op1':
-            modisETn = modisET.map(maskbyBits1)
+        else:
+            modisETn = modisET.map(maskbyBits)
         #modify so that divT gets calculated as 8, if date < 12/26
         #and gets a value of either 5 or 6 accordingly if >
         #also update start and end year
         def scale1(img):
-            
+
             daysT = ee.Number(ee.Date(img.date().get('year').format().cat('-12-31')).getRelative('day','year')).add(1)
             divT = daysT.subtract(img.date().getRelative('day','year')).min(8)
-                     
+
             return (img.select(metL[0])
                     .float()
-                    .multiply(0.1)
+                    .multiply(et.scale(metL[0])[0])
                     .divide(divT)
                     .copyProperties(img,['system:time_start','system:time_end']))
-        
+
         modisETm = modisETn.map(scale1)
-        
-        lastImage = ee.Image(ee.ImageCollection('MODIS/006/MOD16A2')
-                         .sort('system:time_start',False)
-                         .first())
-        lastImageDate = lastImage.get('system:index').getInfo()
 
-        firstImage = ee.Image(ee.ImageCollection('MODIS/006/MOD16A2')
-                         .sort('system:time_start',True)
-                         .first())
-        firstImageDate = firstImage.get('system:index').getInfo()
+        firstImageDate, lastImageDate = collectionCache.indexRange(et.collection)
 
         if all([startYear is None,endYear is None]):
             startYear = int(firstImageDate[0:4])
@@ -3822,13 +2269,13 @@ def GEEetMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
             years = list(range(startYear, endYearAll + 1))
             monthsEE = ee.List(list(range(startMonth,(12*len(years)+endMonth))))
             yearsEE = ee.List(list(range(startYearAll, endYearAll + 1)))
-            
+
         elif all([startYear >= 0,endYear >= 0]):
             startYearReal = int(firstImageDate[0:4])
-            endYearReal = int(lastImageDate[0:4]) 
-            
+            endYearReal = int(lastImageDate[0:4])
+
             years = list(range(max(startYearReal,startYear), (min(endYearReal,endYear) + 1)))
-        
+
             if endYear >= endYearReal:
                 endMonth = int(lastImageDate[5:7])-1
                 endYearReal2 = endYearReal-1
@@ -3837,141 +2284,159 @@ def GEEetMODIS(ptsFile,metric,timeStep,buf,poly,QC,username,folderOut, scalePix
                 endMonth = 0
                 endYearReal2 = endYearReal
                 years2 = len(years)
-                
+
             if startYear <= startYearReal:
                 startMonth = int(firstImageDate[5:7])
                 startYearReal2 = startYearReal+1
             elif startYear > startYearReal:
                 startMonth = 0
                 startYearReal2 = startYearReal
-            
+
             monthsEE = ee.List(list(range(startMonth,(12*years2+endMonth))))
             yearsEE = ee.List(list(range(max(startYearReal2,startYear), (min(endYearReal2,endYear) + 1))))
 
-        if timeStep == 'year':
-
-            def map_m(i):
-                i = ee.Number(i).int()
-                image2 = (modisETm
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .first())
-                filtered = (modisETm
-                    .filter(ee.Filter.calendarRange(i, i, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(yearsEE.map(map_m).flatten())
-
-        elif timeStep == 'month':
-            
-            def map_m(i):
-                i = ee.Number(i)
-                y = i.divide(12).add(years[0]).int()
-                m = i.mod(12).add(1)
-                image2 = (modisETm
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .first())
-                filtered = (modisETm
-                    .filter(ee.Filter.calendarRange(m, m, 'month'))
-                    .filter(ee.Filter.calendarRange(y, y, 'year'))
-                    .mean()
-                    .copyProperties(image2,['system:time_start','system:time_end']))
-                return filtered
-
-            img_col = ee.ImageCollection(monthsEE.map(map_m).flatten())
-
-        elif all([timeStep == 'lowest',endYear is None, startYear is None]):
+        if all([timeStep == 'lowest',endYear is None, startYear is None]):
 
             img_col = modisETm
-            
+
         elif all([timeStep == 'lowest',endYear > 0, startYear > 0]):
 
             img_col = modisETm.filter(ee.Filter.calendarRange(startYear, endYear, 'year'))
 
-        #else:
-        #    print("incorrect time step specified")
-        
-        if buf > 0:
-            bufL = [buf]
-            def bufferPoly(feature):
-                return feature.buffer(bufL[0])
-
-            ptsB = pts1.map(bufferPoly)
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = ptsB.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MOD16A2_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_ptsB',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('buffered pts by:' + str(buf) + ' for: ' + met)
-
-        elif poly > 0:
-            
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MOD16A2_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_poly1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-    
-    
-            #print ('spatial mean in poly: no buffer for: ' + met)
+        else:
+
+            img_col = extractEngine.aggregateTime(modisETm, timeStep, yearsEE, monthsEE, years[0])
+
+        tasks += extractEngine.extractCollection(img_col, metL[0], pts1, buf, poly,
+                                                 time_d[timeStep]+'_MOD16A2_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
+
+
+def GEEcollectionPts(ptsFile,dataset,metric,timeStep,startYear,endYear,buf,poly,username,folderOut,
+                     scalePix = None, QC = 'None', timeAsBands = False, deferScale = False, **options):
+    """    
+    Extracts any image collection of the registry (see registry) at point OR mean within buffer of point
+    if buf > 0 OR mean within polygon if poly = 1
+
+    Requires:
+    
+    ptsfile - file name of uploaded shapefile to GEE.
+
+    dataset - name of the dataset in the registry, e.g. 'MOD13Q1' or a dataset added with registry.register
+
+    metric - list of metrics of the dataset (its bands, or the metrics of its band mapping)
+
+    timeStep - time step for temporal aggregation, either 'lowest','month', OR 'year'. Metrics are averaged
+        or summed over each time step as given in the registry.
+
+    startYear - The start of the time-series (year)
+
+    endYear - The end of the time-series (year)
+
+    buf - specifies the radius of the buffer (meters) to add around each point. For no buffer, use buf = 0. 
+
+    poly - If your ptsfile contains polygons, then specify poly = 1; otherwise use poly = 0.
+
+    username - Specify your GEE username as a string.
+    
+    folderOut - Output folder name on google drive.
+    
+    Optional parameters
+
+    scalePix - scale/spatial resolution. Default: None (the scalePix of the dataset)
+
+    QC - QC option of the dataset whose QA bit rules mask poor-quality pixels, or 'None'. Default: 'None'
+
+    timeAsBands - If True, the time-series is stacked into one image per chunk (one band per time step)
+        and reduced once per chunk instead of once per image, exporting one wide row per feature
+        with a column per time step ('YYYYMMdd_metric'). Default: False
+
+    options - keyword options shared by every function and passed on to the extraction engine:
+        scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode
+        (see extractEngine.extractOptions)
+
+    deferScale - If True, the bands are reduced in their stored units and the registry scale and offset
+        are applied to the reduced values by consolidate (or directFetch), instead of to every pixel of
+        every image on Earth Engine. The exports get the suffix '_dn'. Default: False
+
+    Returns the list of export tasks (taskScheduler.TaskHandle objects if scheduler is given, and
+    resultCache.CachedResult objects for the tables found in cache), without the exports skipped by manifest.
+    
+    """
+
+    options = extractEngine.extractOptions(options)
+
+
+    # load required libraries
+    import ee
+
+    # Initialize the Earth Engine object once per process, using the session credentials.
+    eeSession.initialize()
+
+    entry = registry.get(dataset)
+
+    if scalePix is None:
+        scalePix = entry.scalePix
+
+    years = list(range(startYear, endYear + 1))
+    monthsEE = ee.List(list(range(0,(12*len(years)))))
+    yearsEE = ee.List(years)
+
+    #load pts or poly file
+    pts1 = extractEngine.loadPts(ptsFile, username)
+
+    tasks = []
+
+    time_d = {}
+    time_d['lowest'] = 'rl'
+    time_d['month'] = 'rm'
+    time_d['year'] = 'ry'
+
+    for met in metric:
+        imgCol = (ee.ImageCollection(entry.collection)
+                  .filter(ee.Filter.calendarRange(startYear, endYear, 'year')))
+
+        #mask poor-quality pixels with the QA bit rules of QC
+        maskbyBits = extractEngine.qaMask(entry, QC, met)
+        if maskbyBits is not None:
+            imgCol = imgCol.map(maskbyBits)
+
+        band = entry.band(met)
+        if isinstance(band, list):
+
+            #normalized difference of a pair of bands
+            def addND(img):
+                return (img.normalizedDifference(band).rename(met)
+                        .copyProperties(img,['system:time_start','system:time_end']))
+
+            imgCol = imgCol.map(addND)
 
         else:
-            def table_m(image):
-                table = (image
-                    .select(metL[0])
-                    .reduceRegions(collection = pts1.select([ID_field]),
-                                    reducer = ee.Reducer.mean(),
-                                    scale = scalePix))
-                        
-                def table_add_date(f):
-                    return f.set('startDate', ee.Date(image.get('system:time_start')))
-
-                return table.map(table_add_date)
-
-            triplets = img_col.map(table_m).flatten()
-
-            task_tc = ee.batch.Export.table.toDrive(collection = triplets
-                                                    .filter(ee.Filter.neq('mean', None))
-                                                    .select(['.*'],None,False),
-                                                    description = time_d[timeStep]+'_MOD16A2_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1])+'_pts1',
-                                                    folder = folderOut,
-                                                    fileFormat = 'CSV')
-            task_tc.start()
-                
-            #print('value at point: no buffer for: ' + met)
+
+            imgCol = imgCol.select([band], [met])
+
+        img_col = extractEngine.aggregateTime(imgCol, timeStep, yearsEE, monthsEE, years[0],
+                                              stat = entry.stat(met))
+
+        #scale/offset of the metric, if any, applied to the aggregated images or, with deferScale,
+        #to the reduced values
+        deferred = deferScale and extractEngine.canDeferScale(entry, [met], options['reducers'])
+        if not deferred:
+            img_col = extractEngine.scaleCollection(img_col, entry, [met])
+
+        tasks += extractEngine.extractCollection(img_col, met, pts1, buf, poly,
+                                                 time_d[timeStep]+'_'+entry.name+'_'+str(met)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                                 folderOut, scalePix,
+                                                 timeAsBands = timeAsBands,
+                                                 deferScale = deferred, **options)
+
+    if options['mode'] == 'direct':
+        return directFetch.concatFrames(tasks)
+
+    return tasks
@@ -0,0 +1,102 @@
+#####Earth Engine session shared by the GEE* functions
+
+"""
+Initializes Earth Engine once per process
+
+ee.Initialize() loads the credentials and contacts the Earth Engine servers. The
+GEE* functions used to call it every time they were run, so a notebook extracting
+15 products, or a worker pool running one extraction per task, paid that handshake
+again and again. The GEE* functions now call eeSession.initialize(), which runs
+ee.Initialize() the first time only. It is thread-safe: concurrent callers wait for
+the first initialization instead of starting their own.
+
+The project and credentials can be given explicitly before the first extraction,
+e.g. with a service account in a worker pool:
+
+    import ee
+    from geedataextract import eeSession
+
+    credentials = ee.ServiceAccountCredentials('me@project.iam.gserviceaccount.com', 'key.json')
+    eeSession.setSession(eeSession.EESession(project = 'my-project', credentials = credentials))
+
+Without setSession, ee.Initialize() is called with the default credentials
+(earthengine authenticate).
+"""
+
+import threading
+
+class EESession(object):
+    """
+    Earth Engine initialization, run once
+
+    Optional parameters
+
+    project - Google Cloud project used for the requests. Default: None (the default project of
+        the credentials)
+
+    credentials - credentials passed to ee.Initialize, e.g. ee.ServiceAccountCredentials.
+        Default: None (the stored credentials of earthengine authenticate)
+
+    Other keyword arguments (e.g. opt_url) are passed to ee.Initialize.
+    """
+
+    def __init__(self, project = None, credentials = None, **kwargs):
+        self.project = project
+        self.credentials = credentials
+        self.kwargs = kwargs
+        self.initialized = False
+        self.lock = threading.Lock()
+
+    def initialize(self):
+        """
+        Initializes Earth Engine if this session was not initialized yet
+        """
+        if self.initialized:
+            return
+
+        with self.lock:
+            if self.initialized:
+                return
+
+            import ee
+
+            kwargs = dict(self.kwargs)
+            if self.project is not None:
+                kwargs['project'] = self.project
+            if self.credentials is not None:
+                kwargs['credentials'] = self.credentials
+
+            ee.Initialize(**kwargs)
+            self.initialized = True
+
+    def reset(self):
+        """
+        Makes the next initialize() call ee.Initialize() again, e.g. after the credentials expired
+        """
+        with self.lock:
+            self.initialized = False
+
+sharedSession = [None]
+sessionLock = threading.Lock()
+
+def getSession():
+    """
+    Returns the session used by the GEE* functions, created with the default credentials on first use
+    """
+    with sessionLock:
+        if sharedSession[0] is None:
+            sharedSession[0] = EESession()
+        return sharedSession[0]
+
+def setSession(session):
+    """
+    Replaces the session used by the GEE* functions, e.g. to give a project or credentials
+    """
+    with sessionLock:
+        sharedSession[0] = session
+
+def initialize():
+    """
+    Initializes Earth Engine with the shared session, once per process
+    """
+    getSession().initialize()
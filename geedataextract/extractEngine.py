@@ -0,0 +1,964 @@
+#####Shared extraction engine for the GEE* functions in downloadData
+
+"""
+Shared extraction engine used by every function in downloadData
+
+Each extraction follows the same four steps:
+
+    geometry preparation -> temporal aggregation -> reduction -> export
+
+so an improvement made to one of these steps applies to every dataset.
+"""
+
+import threading
+
+ID_field = "geeID"
+
+#maximum number of bands stacked into one image when timeAsBands = True
+maxBands = 1000
+
+#maximum number of values (features x time steps) exported by one task when chunkSize = 'auto'
+maxValues = 1000000
+
+#output column written by each reducer, used to filter out null values
+reducer_d = {}
+reducer_d['mean'] = 'mean'
+reducer_d['sum'] = 'sum'
+reducer_d['mode'] = 'mode'
+reducer_d['frequencyHistogram'] = 'histogram'
+
+def loadPts(ptsFile, username):
+    """
+    Loads the uploaded shapefile of points or polygons from the GEE assets folder
+
+    Requires:
+
+    ptsFile - file name of uploaded shapefile to GEE.
+
+    username - Specify your GEE username as a string.
+
+    """
+    import ee
+
+    return ee.FeatureCollection('users/' + username + '/' + str(ptsFile))
+
+def geomSuffix(buf, poly):
+    """
+    Returns the suffix added to the export description: '_ptsB' for buffered
+    points, '_poly1' for polygons and '_pts1' for points
+    """
+    if buf > 0:
+        return '_ptsB'
+    elif poly > 0:
+        return '_poly1'
+    else:
+        return '_pts1'
+
+def preparePts(pts1, buf):
+    """
+    Geometry preparation: buffers each feature by buf meters if buf > 0 and
+    keeps only the ID field, so that no other properties are exported
+    """
+    if buf > 0:
+        bufL = [buf]
+        def bufferPoly(feature):
+            return feature.buffer(bufL[0])
+
+        pts1 = pts1.map(bufferPoly)
+
+    return pts1.select([ID_field])
+
+def planChunks(nFeatures, chunkSize, nSteps = 1):
+    """
+    Plans how nFeatures features are split into chunks, each exported by its own task.
+    Returns a list of (offset, count) tuples, one per chunk.
+
+    Requires:
+
+    nFeatures - number of features in the collection
+
+    chunkSize - maximum number of features per chunk. If None, all features are in one chunk.
+        If 'auto', the chunk size is chosen so that features x nSteps stays below maxValues.
+
+    Optional parameters
+
+    nSteps - number of time steps extracted for each feature. Default: 1
+
+    """
+    if chunkSize is None:
+        return [(0, nFeatures)]
+
+    if chunkSize == 'auto':
+        chunkSize = max(1, maxValues // max(1, nSteps))
+
+    chunkSize = int(chunkSize)
+    if chunkSize < 1:
+        raise ValueError('chunkSize must be at least 1')
+
+    if nFeatures == 0:
+        return [(0, 0)]
+
+    return [(offset, min(chunkSize, nFeatures - offset)) for offset in range(0, nFeatures, chunkSize)]
+
+#number of collections whose metadata (sorted IDs, centroids) is kept in memory, reused by the next
+#extraction from the same collection (e.g. the next metric of a function)
+maxMemo = 16
+
+memoLock = threading.Lock()
+
+def memoized(memo, pts1, fetch):
+    """
+    Returns memo[key] for the serialized graph of pts1, computed with fetch() if missing. Collections
+    built by separate loadPts calls from the same asset share an entry. At most maxMemo are kept.
+    """
+    key = pts1.serialize()
+
+    with memoLock:
+        if key in memo:
+            return memo[key]
+
+    #fetched outside the lock, so that threads extracting other collections do not wait
+    value = fetch()
+
+    with memoLock:
+        if key not in memo and len(memo) >= maxMemo:
+            del memo[next(iter(memo))]
+        memo[key] = value
+
+    return value
+
+#serialized collection -> sorted ID values
+idsMemo = {}
+
+def sortedIds(pts1):
+    """
+    Returns the sorted list of ID_field values of pts1 (one getInfo request per collection)
+    """
+    return memoized(idsMemo, pts1, lambda: pts1.aggregate_array(ID_field).sort().getInfo())
+
+def chunkPts(pts1, chunkSize, nSteps = 1, order = 'geeID'):
+    """
+    Geometry preparation: partitions pts1 into ranges of ID_field values following planChunks.
+    Returns a list of (tag, collection) tuples, where tag is '_c0', '_c1', ... or '' if
+    pts1 is not split. If order is 'hilbert' or 'geohash', features are instead grouped
+    along that space-filling curve (see spatialOrder).
+    """
+    import ee
+
+    if chunkSize is None:
+        return [('', pts1)]
+
+    if order != 'geeID':
+        from geedataextract import spatialOrder
+        return spatialOrder.spatialChunks(pts1, chunkSize, nSteps, order)
+
+    ids = sortedIds(pts1)
+    plan = planChunks(len(ids), chunkSize, nSteps)
+
+    if len(plan) == 1:
+        return [('', pts1)]
+
+    #each chunk holds IDs from its first ID up to the first ID of the next chunk, so that
+    #duplicated IDs are never split between two chunks
+    bounds = [ids[offset] for offset, count in plan]
+
+    chunks = []
+    for n in range(len(bounds)):
+        if n > 0 and bounds[n] == bounds[n-1]:
+            continue
+
+        idFilter = ee.Filter.gte(ID_field, bounds[n])
+        if n < len(bounds) - 1:
+            idFilter = ee.Filter.And(idFilter, ee.Filter.lt(ID_field, bounds[n+1]))
+
+        chunks.append(('_c' + str(len(chunks)), pts1.filter(idFilter)))
+
+    return chunks
+
+def aggregateTime(imgCol, timeStep, yearsEE, monthsEE, firstYear, stat = 'mean'):
+    """
+    Temporal aggregation: combines the images of imgCol into yearly or monthly composites
+
+    Requires:
+
+    imgCol - ee.ImageCollection to aggregate
+
+    timeStep - 'year' or 'month'. Any other time step returns imgCol unchanged.
+
+    yearsEE - ee.List of years to aggregate when timeStep = 'year'
+
+    monthsEE - ee.List of month offsets (from January of firstYear) when timeStep = 'month'
+
+    firstYear - first year of the time-series, used to convert month offsets to dates
+
+    Optional parameters
+
+    stat - how the images are combined within each time step, 'mean' or 'sum'. Default: 'mean'
+
+    """
+    import ee
+
+    #each time step is selected with a single filterDate window, which uses the time index of the
+    #collection, and the composite takes the time properties of the first image of that window
+    def composite(start, end):
+        window = imgCol.filterDate(start, end)
+        return (getattr(window, stat)()
+                .copyProperties(window.first(),['system:time_start','system:time_end']))
+
+    if timeStep == 'year':
+
+        def map_m(i):
+            start = ee.Date.fromYMD(ee.Number(i).int(), 1, 1)
+            return composite(start, start.advance(1, 'year'))
+
+        return ee.ImageCollection(yearsEE.map(map_m).flatten())
+
+    elif timeStep == 'month':
+
+        firstDate = ee.Date.fromYMD(firstYear, 1, 1)
+
+        def map_m(i):
+            start = firstDate.advance(ee.Number(i), 'month')
+            return composite(start, start.advance(1, 'month'))
+
+        return ee.ImageCollection(monthsEE.map(map_m).flatten())
+
+    return imgCol
+
+def getQABits(image, start, end, newName):
+    """
+    Returns bits start to end of the first band of image, as a band named newName
+    """
+    pattern = 0
+    for one in range(start, end+1):
+        pattern += 2**one
+
+    return (image.select([0], [newName])
+              .bitwiseAnd(pattern)
+              .rightShift(start))
+
+def qaMask(dataset, QC, metric = None):
+    """
+    Returns the function masking the poor-quality pixels of an image of dataset (a registry.Dataset)
+    according to the QA bit rules of the QC option, or None for QC = 'None'
+    """
+    rules = dataset.qaRules(QC, metric)
+    if len(rules) == 0:
+        return None
+
+    def maskbyBits(img):
+        mask = None
+        for band, start, end, comparison, value in rules:
+            keep = getattr(getQABits(img.select(band), start, end, 'QA'), comparison)(value)
+            mask = keep if mask is None else mask.And(keep)
+        return img.updateMask(mask)
+
+    return maskbyBits
+
+def scaleImage(image, dataset, metrics):
+    """
+    Converts the bands of image (one per metric) to physical units with the scale and offset of the
+    metrics in dataset (a registry.Dataset). Returns image unchanged if no metric is converted.
+    """
+    import ee
+
+    scaleL = [dataset.scale(met) for met in metrics]
+    if all([(scale is None) for scale in scaleL]):
+        return image
+
+    scales = [scale[0] if scale is not None else 1 for scale in scaleL]
+    offsets = [scale[1] if scale is not None else 0 for scale in scaleL]
+
+    image = image.float()
+    if any([(scale != 1) for scale in scales]):
+        image = image.multiply(scales[0] if len(scales) == 1 else ee.Image.constant(scales))
+    if any([(offset != 0) for offset in offsets]):
+        image = image.add(offsets[0] if len(offsets) == 1 else ee.Image.constant(offsets))
+
+    return image
+
+def scaleCollection(imgCol, dataset, metrics, bands = None):
+    """
+    Converts the images of imgCol to physical units (see scaleImage), keeping their time properties.
+    bands - band(s) selected from each image before scaling. Default: None (all bands)
+    Returns imgCol unchanged, without mapping over it, if no metric is converted.
+    """
+    if all([(dataset.scale(met) is None) for met in metrics]):
+        return imgCol
+
+    def scale1(img):
+        image = img.select(bands) if bands is not None else img
+        return (scaleImage(image, dataset, metrics)
+                .copyProperties(img,['system:time_start','system:time_end']))
+
+    return imgCol.map(scale1)
+
+def canDeferScale(dataset, metrics, reducers = None):
+    """
+    Returns True if the scale and offset of metrics in dataset (a registry.Dataset) can be applied to
+    the reduced table instead of every pixel (see deferSuffix): at least one metric is converted, and
+    no offset is summed, over a time step (stat 'sum') or over the pixels (reducers with 'sum').
+    """
+    scaleL = [(met, dataset.scale(met)) for met in metrics]
+    if all([(scale is None) for met, scale in scaleL]):
+        return False
+
+    summed = reducers is not None and 'sum' in reducers
+    for met, scale in scaleL:
+        if scale is not None and scale[1] != 0 and (summed or dataset.stat(met) == 'sum'):
+            return False
+
+    return True
+
+def deferSuffix(deferScale):
+    """
+    Returns the suffix of the exports holding bands in their stored units, '_dn', whose values are
+    converted to physical units by consolidate with the registry scale and offset, or ''
+    """
+    if deferScale:
+        return '_dn'
+    return ''
+
+def ensembleCollection(imgCol, models, scenarios, aggregate = None):
+    """
+    Ensemble: splits imgCol into the time-series of every model and scenario, aggregates each one
+    with aggregate (a function of an ee.ImageCollection, e.g. calling aggregateTime) and merges them
+    into a single collection. Every image keeps its 'model' and 'scenario' properties.
+    Members are split by Earth Engine, so the expression does not grow with the number of models.
+    """
+    import ee
+
+    imgCol = imgCol.filter(ee.Filter.inList('model', models)).filter(ee.Filter.inList('scenario', scenarios))
+
+    members = ee.List([[model, scenario] for scenario in scenarios for model in models])
+
+    def member_m(member):
+        model = ee.List(member).get(0)
+        scenario = ee.List(member).get(1)
+
+        memberCol = imgCol.filter(ee.Filter.eq('model', model)).filter(ee.Filter.eq('scenario', scenario))
+        if aggregate is not None:
+            memberCol = aggregate(memberCol)
+
+        def set_m(image):
+            return image.set('model', model, 'scenario', scenario)
+
+        return memberCol.map(set_m)
+
+    return ee.ImageCollection(ee.FeatureCollection(members.map(member_m)).flatten())
+
+#statistics that can be combined by statsReducer, besides the percentiles 'p<n>'
+statNames = ['mean', 'sum', 'mode', 'median', 'stdDev', 'variance', 'min', 'max', 'count',
+             'frequencyHistogram']
+
+def statsReducer(stats):
+    """
+    Returns the ee.Reducer computing every statistic of stats on the same inputs, in a single pass:
+    'mean', 'sum', 'mode', 'median', 'stdDev', 'variance', 'min', 'max', 'count', 'frequencyHistogram'
+    or a percentile 'p<n>' (e.g. 'p10'). Each statistic is output under its own name ('histogram' for
+    'frequencyHistogram').
+    """
+    import ee
+
+    reducers = []
+    for stat in stats:
+        if stat[0:1] == 'p' and stat[1:].isdigit():
+            reducers.append(ee.Reducer.percentile([int(stat[1:])]))
+        elif stat in statNames:
+            reducers.append(getattr(ee.Reducer, stat)())
+        else:
+            raise ValueError('Unsupported statistic: ' + str(stat))
+
+    reducer = reducers[0]
+    for r in reducers[1:]:
+        reducer = reducer.combine(reducer2 = r, sharedInputs = True)
+
+    return reducer
+
+def ensembleStats(imgCol, stats):
+    """
+    Ensemble: reduces the members of a collection made by ensembleCollection to one image per time
+    step and scenario, with a band 'ens_<stat>' per statistic of stats (see statsReducer), computed
+    across models before any reduction over the features. Images keep their 'scenario' property.
+    """
+    import ee
+
+    #members of each time step: joined on their start time and scenario
+    steps = imgCol.distinct(['scenario', 'system:time_start'])
+    sameTime = ee.Filter.equals(leftField = 'system:time_start', rightField = 'system:time_start')
+    sameScenario = ee.Filter.equals(leftField = 'scenario', rightField = 'scenario')
+    joined = ee.Join.saveAll('members').apply(steps, imgCol, ee.Filter.And(sameTime, sameScenario))
+
+    reducer = statsReducer(stats)
+    bands = ['ens_' + stat for stat in stats]
+
+    def stats_m(image):
+        members = ee.ImageCollection.fromImages(image.get('members'))
+        return (members.reduce(reducer)
+                .select(list(range(len(bands))), bands)
+                .copyProperties(image, ['system:time_start', 'system:time_end', 'scenario']))
+
+    return ee.ImageCollection(joined.map(stats_m))
+
+def makeReducer(reducer):
+    """
+    Returns the ee.Reducer of a reducer name, or the combined reducer of a list of statistics
+    (see statsReducer)
+    """
+    import ee
+
+    if isinstance(reducer, list):
+        return statsReducer(reducer)
+
+    return getattr(ee.Reducer, reducer)()
+
+def reduceImage(image, pts, scalePix, reducer = 'mean', outputs = None):
+    """
+    Reduction: reduces a single image over every feature of pts. outputs renames the columns
+    written by the reducer (see keepsBandNames).
+    """
+    eeReducer = makeReducer(reducer)
+    if outputs is not None:
+        eeReducer = eeReducer.setOutputs(outputs)
+
+    return image.reduceRegions(collection = pts,
+                               reducer = eeReducer,
+                               scale = scalePix)
+
+def reduceCollection(imgCol, band, pts, scalePix, reducer = 'mean', properties = None):
+    """
+    Reduction: reduces every image of imgCol over every feature of pts and
+    adds the image date to each row as 'startDate', and the image properties
+    listed in properties (e.g. ['model', 'scenario']), if any
+    """
+    import ee
+
+    #a single band is written to a column named after the reducer, unless its name must be kept
+    outputs = None
+    if keepsBandNames(band) and len(band) == 1 and not isinstance(reducer, list):
+        outputs = list(band)
+
+    def table_m(image):
+        table = reduceImage(image.select(band), pts, scalePix, reducer, outputs)
+
+        def table_add_date(f):
+            if properties:
+                f = f.set(image.toDictionary(properties))
+            return f.set('startDate', ee.Date(image.get('system:time_start')))
+
+        return table.map(table_add_date)
+
+    return imgCol.map(table_m).flatten()
+
+def reduceAsBands(imgCol, band, pts, scalePix, reducer = 'mean'):
+    """
+    Reduction: stacks imgCol into a single image with one band per time step,
+    named 'YYYYMMdd_band', and reduces it once over every feature of pts.
+    Each feature gets one wide row with a column per time step.
+    """
+    import ee
+
+    def dateBands(image):
+        return (image.select(band)
+                .set('system:index', ee.Date(image.get('system:time_start')).format('YYYYMMdd')))
+
+    stack = imgCol.map(dateBands).toBands()
+
+    return stack.reduceRegions(collection = pts,
+                               reducer = makeReducer(reducer).forEachBand(stack),
+                               scale = scalePix)
+
+def graphSize(eeObject):
+    """
+    Returns the number of nodes in the serialized expression graph of eeObject.
+    Used to compare the size of the graphs sent to Earth Engine, e.g. for
+    timeAsBands = True versus the default per-image reduction.
+    """
+    import json
+
+    graph = json.loads(eeObject.serialize())
+
+    if 'values' in graph:
+        return len(graph['values'])
+
+    def countNodes(node):
+        if isinstance(node, dict):
+            return 1 + sum([countNodes(v) for v in node.values()])
+        elif isinstance(node, list):
+            return sum([countNodes(v) for v in node])
+        else:
+            return 0
+
+    return countNodes(graph)
+
+def metricGroups(metric, singlePass = False):
+    """
+    Groups the requested metrics into the lists that are reduced together.
+    By default every metric is reduced and exported separately; if singlePass
+    is True all metrics are stacked as bands and reduced in a single pass.
+    """
+    if singlePass:
+        return [list(metric)]
+    else:
+        return [[met] for met in metric]
+
+def keepsBandNames(bands):
+    """
+    Returns True if bands are written to columns named after them even when there is a single
+    band: the 'ens_<statistic>' bands of ensembleStats, which consolidate reads by name
+    """
+    return isinstance(bands, list) and len(bands) > 0 and all([b.startswith('ens_') for b in bands])
+
+def outColumns(bands, reducer = 'mean'):
+    """
+    Returns the columns written by reduceRegions. A single band is written to a
+    column named after the reducer (unless keepsBandNames); several bands are written to
+    one column per band. With a list of statistics, each one gets its own column, named
+    '<band>_<statistic>' for several bands.
+    """
+    if isinstance(reducer, list):
+        stats = [reducer_d.get(stat, stat) for stat in reducer]
+        if isinstance(bands, list) and len(bands) > 1:
+            return [band + '_' + stat for band in bands for stat in stats]
+        return stats
+
+    if isinstance(bands, list) and (len(bands) > 1 or keepsBandNames(bands)):
+        return list(bands)
+    else:
+        return [reducer_d[reducer]]
+
+def reducerSuffix(reducer):
+    """
+    Returns the suffix of the exports reduced with a list of statistics, '_r<stat>-<stat>...',
+    or '' for a single reducer
+    """
+    if isinstance(reducer, list):
+        return '_r' + '-'.join(reducer)
+    return ''
+
+def nullFilter(columns):
+    """
+    Returns a filter that keeps rows where at least one of columns is not null
+    """
+    import ee
+
+    if len(columns) == 1:
+        return ee.Filter.neq(columns[0], None)
+    else:
+        return ee.Filter.Or(*[ee.Filter.neq(col, None) for col in columns])
+
+def exportTable(table, description, folderOut, columns = ['mean'], scheduler = None, manifest = None,
+                cache = None, lastDate = None):
+    """
+    Export: filters out null values, removes geometry and exports table as a CSV to google drive.
+    If columns is None, rows are not filtered.
+
+    The task is started immediately and returned, unless a taskScheduler.TaskScheduler is given:
+    then the task is submitted to the scheduler and its TaskHandle is returned.
+
+    If a jobManifest.JobManifest is given, the export is recorded in it, and None is returned
+    without exporting if the manifest shows description as completed or still running. lastDate is
+    a function returning the last startDate 'YYYY-MM-DD' of the table, recorded with the export so
+    that the manifest can be given as since (see incremental).
+
+    If a resultCache.ResultCache is given and holds the same table, nothing is exported and its
+    resultCache.CachedResult is returned. Otherwise the export is remembered as pending in the cache,
+    with the id of its task.
+    """
+    import ee
+
+    if manifest is not None and not manifest.needsExport(description):
+        return None
+
+    if columns is not None:
+        table = table.filter(nullFilter(columns))
+
+    if cache is not None:
+        from geedataextract import resultCache
+
+        key = resultCache.tableKey(table, columns)
+        cached = cache.get(key, description)
+        if cached is not None:
+            return cached
+        cache.expect(key, description)
+
+    def makeTask():
+        return ee.batch.Export.table.toDrive(collection = table
+                                             .select(['.*'],None,False),
+                                             description = description,
+                                             folder = folderOut,
+                                             fileFormat = 'CSV')
+
+    params = {'folder': folderOut, 'fileFormat': 'CSV', 'columns': columns}
+    if manifest is not None and lastDate is not None:
+        params['lastDate'] = lastDate()
+
+    if scheduler is not None:
+        callback = None
+        if manifest is not None or cache is not None:
+            def callback(handle):
+                if manifest is not None:
+                    manifest.record(description, handle.state, handle.id, params)
+                if cache is not None and handle.id is not None:
+                    cache.started(key, handle.id)
+
+        return scheduler.submit(description, makeTask, callback)
+
+    task_tc = makeTask()
+    task_tc.start()
+
+    if manifest is not None:
+        manifest.record(description, 'READY', task_tc.id, params)
+    if cache is not None:
+        cache.started(key, task_tc.id)
+
+    return task_tc
+
+def fetchTable(table, description, columns, nRows):
+    """
+    Direct retrieval: filters out null values like exportTable and returns the rows of table (at most
+    nRows) as a pandas DataFrame in the long format of consolidate (see directFetch)
+    """
+    from geedataextract import directFetch
+
+    if columns is not None:
+        table = table.filter(nullFilter(columns))
+
+    return directFetch.fetchFrame(table.select(['.*'],None,False), description, nRows)
+
+def checkMode(mode):
+    """
+    Raises a ValueError if mode is not 'export' or 'direct'
+    """
+    if mode not in ['export', 'direct']:
+        raise ValueError("mode must be 'export' or 'direct'")
+
+#keyword options shared by every GEE* function and their defaults, in the order of extractCollection
+sharedOptions = [('scheduler', None), ('manifest', None), ('chunkSize', None), ('chunkOrder', 'geeID'),
+                 ('dedupe', False), ('since', None), ('cache', None), ('reducers', None), ('mode', 'export')]
+
+def extractOptions(options, timeSeries = True):
+    """
+    Checks the keyword options given to a GEE* function of downloadData and adds the defaults of the
+    others. The function passes them on to extractImage or extractCollection with **options.
+
+    Requires:
+
+    options - dict of the keyword options given to the GEE* function
+
+    Optional parameters
+
+    timeSeries - False for the functions that extract a single image, which have no since option.
+        Default: True
+
+    Options
+
+
+    scheduler - taskScheduler.TaskScheduler that the export tasks are submitted to, which limits the number
+        of running tasks and retries transient failures. Tasks beyond its maxRunning are queued and only
+        started by scheduler.poll() or scheduler.wait(). Default: None (tasks are started immediately)
+
+    manifest - jobManifest.JobManifest that records every export, so that a rerun skips exports that
+        already completed or are still running. Default: None
+
+    chunkSize - maximum number of points/polygons per export, for large shapefiles that fail with
+        'computation timed out' or 'user memory limit exceeded'. The shapefile is split into ranges of
+        geeID and each range is exported separately with the suffix '_c0', '_c1', ... Use 'auto' to choose
+        the chunk size from the number of points/polygons and time steps. Default: None (no chunks)
+
+    chunkOrder - how points/polygons are grouped into chunks: 'geeID' (ranges of geeID), or 'hilbert' or
+        'geohash' to group neighbouring points/polygons so that each export covers a compact area.
+        Default: 'geeID'
+
+    dedupe - If True, points that fall in the same pixel (buf = 0), or features with the same geometry
+        (buffered points at the same location, identical polygons), are only extracted once and their rows
+        are copied to the others. Default: False
+
+    since - only export the time steps after the last date already extracted, with the suffix '_uYYYYMMDD':
+        a date 'YYYY-MM-DD', or the consolidated table, Parquet dataset, folder of exports or
+        jobManifest.JobManifest holding the extracted data (see incremental). Only for the time-series
+        functions. Default: None (all time steps)
+
+    cache - resultCache.ResultCache of the tables already exported. A table found in the cache is not exported
+        again and its resultCache.CachedResult (the path of the cached CSV file) is returned in place of its
+        task. Default: None (no cache)
+
+    reducers - list of statistics computed together in a single pass over the pixels of each buffer/polygon,
+        e.g. ['mean', 'stdDev', 'min', 'max', 'count'] or percentiles 'p<n>', instead of the default
+        statistic. Each statistic is exported to its own column ('<metric>_<statistic>' with several
+        metrics) and the suffix '_r<statistics>' is added after '_ptsB'/'_poly1'/'_pts1'. Default: None
+
+    mode - 'export' to export the tables to Drive, or 'direct' for small jobs (at most directFetch.directLimit
+        rows): the tables are fetched with getInfo, in pages requested in parallel, and returned at once as a
+        single pandas DataFrame in the long format of consolidate. scheduler, manifest, cache and chunkSize
+        are not used by direct jobs. Default: 'export'
+
+    Returns a new dict with every option. Raises a TypeError for an unknown option, as for an unexpected
+    keyword argument.
+
+    """
+    names = [name for name, default in sharedOptions if timeSeries or name != 'since']
+
+    for name in options:
+        if name not in names:
+            raise TypeError("unexpected keyword argument '" + name + "'")
+
+    return dict([(name, options.get(name, default)) for name, default in sharedOptions if name in names])
+
+def copyRows(table, pairs):
+    """
+    Adds to table a copy of the rows of each representative feature for every feature of pairs,
+    an ee.FeatureCollection with ID_field and 'rep' (the ID_field of its representative)
+    """
+    import ee
+
+    joined = ee.Join.inner('pair', 'row').apply(pairs, table,
+                                                 ee.Filter.equals(leftField = 'rep', rightField = ID_field))
+
+    def copy_m(feature):
+        return ee.Feature(feature.get('row')).set(ID_field, ee.Feature(feature.get('pair')).get(ID_field))
+
+    return table.merge(joined.map(copy_m))
+
+def dedupeFootprints(pts1):
+    """
+    Geometry preparation: keeps one feature of pts1 per distinct geometry (the same point, buffered
+    later, or identical polygons). Returns the remaining features and the function that copies the
+    rows of a reduced table to the other features. Everything is computed by Earth Engine.
+    """
+    import ee
+
+    def key_m(feature):
+        return feature.set('pixKey', ee.String.encodeJSON(feature.geometry().coordinates()))
+
+    keyed = pts1.map(key_m)
+    pts = keyed.distinct(['pixKey'])
+
+    #representative of every feature: the feature kept by distinct with the same key
+    joined = ee.Join.saveFirst('first').apply(keyed, pts,
+                                              ee.Filter.equals(leftField = 'pixKey', rightField = 'pixKey'))
+
+    def pair_m(feature):
+        rep = ee.Feature(feature.get('first')).get(ID_field)
+        return ee.Feature(None, {ID_field: feature.get(ID_field), 'rep': rep,
+                                 'isRep': ee.Algorithms.IsEqual(feature.get(ID_field), rep)})
+
+    pairs = joined.map(pair_m).filter(ee.Filter.eq('isRep', False))
+
+    def fanOut(table):
+        return copyRows(table, pairs)
+
+    return pts, fanOut
+
+def dedupePts(pts1, image, buf, poly, scalePix, dedupe):
+    """
+    Geometry preparation: if dedupe, returns pts1 without the features whose rows are the same as
+    those of another feature, and the function that copies the rows of a reduced table to them:
+    points without buffer are grouped by pixel of image (see pixelCache.dedupePts), buffered points
+    and polygons by identical geometry (see dedupeFootprints). Otherwise returns pts1 and None.
+    """
+    if not dedupe:
+        return pts1, None
+
+    if buf > 0 or poly > 0:
+        return dedupeFootprints(pts1)
+
+    from geedataextract import pixelCache
+
+    return pixelCache.dedupePts(pts1, image, scalePix)
+
+def extractImage(image, pts1, buf, poly, description, folderOut, scalePix, reducer = 'mean', bands = None,
+                 scheduler = None, manifest = None, chunkSize = None, chunkOrder = 'geeID', dedupe = False,
+                 cache = None, reducers = None, mode = 'export'):
+    """
+    Extracts a single image at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
+
+    Requires:
+
+    image - ee.Image to reduce
+
+    pts1 - ee.FeatureCollection of the uploaded points or polygons
+
+    buf - radius of the buffer (meters) to add around each point.
+
+    poly - 1 if pts1 contains polygons; otherwise 0.
+
+    description - name of the export, without the '_ptsB', '_poly1' or '_pts1' suffix
+
+    folderOut - Output folder name on google drive.
+
+    scalePix - scale/spatial resolution
+
+    Optional parameters
+
+    reducer - name of the ee.Reducer: 'mean', 'sum', 'mode' or 'frequencyHistogram'. Default: 'mean'
+
+    bands - list of band names when image has several bands, each reduced to its own column. Default: None
+
+    scheduler, manifest, chunkSize, chunkOrder, dedupe, cache, reducers and mode - options shared
+        by the GEE* functions (see extractOptions). reducers replaces reducer.
+
+    Returns the list of started tasks (or cached results), which is empty if the export was skipped,
+    or the list of DataFrames with mode = 'direct'.
+
+    """
+    if reducers:
+        reducer = list(reducers)
+
+    description = description + geomSuffix(buf, poly) + reducerSuffix(reducer)
+
+    checkMode(mode)
+    if mode == 'direct':
+        from geedataextract import directFetch
+
+        #every feature is fetched in a single table
+        nRows = directFetch.checkSize(pts1)
+        chunkSize = None
+
+    pts1, fanOut = dedupePts(pts1, image, buf, poly, scalePix, dedupe)
+
+    tasks = []
+    for tag, ptsChunk in chunkPts(pts1, chunkSize, 1, chunkOrder):
+        pts = preparePts(ptsChunk, buf)
+        table = reduceImage(image, pts, scalePix, reducer)
+        if fanOut is not None:
+            table = fanOut(table)
+
+        if mode == 'direct':
+            tasks.append(fetchTable(table, description + tag, outColumns(bands, reducer), nRows))
+        else:
+            tasks.append(exportTable(table, description + tag, folderOut, outColumns(bands, reducer),
+                                     scheduler, manifest, cache))
+
+    return [t for t in tasks if t is not None]
+
+def extractCollection(imgCol, band, pts1, buf, poly, description, folderOut, scalePix, reducer = 'mean',
+                      timeAsBands = False, scheduler = None, manifest = None, chunkSize = None,
+                      chunkOrder = 'geeID', dedupe = False, since = None, cache = None, properties = None,
+                      reducers = None, mode = 'export', deferScale = False):
+    """
+    Extracts a time-series at point OR within buffer of point if buf > 0 OR within polygon if poly = 1
+
+    Requires:
+
+    imgCol - ee.ImageCollection to reduce, already aggregated to the requested time step
+
+    band - name of the band to reduce, or a list of band names to reduce in a single pass
+
+    pts1 - ee.FeatureCollection of the uploaded points or polygons
+
+    buf - radius of the buffer (meters) to add around each point.
+
+    poly - 1 if pts1 contains polygons; otherwise 0.
+
+    description - name of the export, without the '_ptsB', '_poly1' or '_pts1' suffix
+
+    folderOut - Output folder name on google drive.
+
+    scalePix - scale/spatial resolution
+
+    Optional parameters
+
+    reducer - name of the ee.Reducer: 'mean', 'sum' or 'mode'. Default: 'mean'
+
+    timeAsBands - If True, imgCol is stacked into images of at most maxBands bands (one band per
+        time step) and each stack is reduced once, exporting one wide row per feature with a column
+        per time step. Each stack is exported separately with the suffix '_tb0', '_tb1', ...
+        Rows are not filtered for null values. Default: False
+
+    scheduler, manifest, chunkSize, chunkOrder, dedupe, since, cache, reducers and mode - options shared
+        by the GEE* functions (see extractOptions). reducers replaces reducer.
+
+    properties - list of image properties added as columns to every row, e.g. ['model', 'scenario'] for
+        a collection made by ensembleCollection. Not available with timeAsBands. Default: None
+
+    deferScale - True if the bands of imgCol were not converted to physical units (see canDeferScale):
+        the exports get the suffix '_dn' after the reducers suffix, and consolidate (or directFetch)
+        applies the registry scale and offset to the reduced values. Default: False
+
+    Returns the list of started tasks (or cached results), without the exports that were skipped,
+    or the list of DataFrames with mode = 'direct'.
+
+    """
+    import ee
+
+    if properties and timeAsBands:
+        raise ValueError('Image properties cannot be kept with timeAsBands')
+
+    checkMode(mode)
+
+    if reducers:
+        reducer = list(reducers)
+
+    description = description + geomSuffix(buf, poly) + reducerSuffix(reducer) + deferSuffix(deferScale)
+
+    if since is not None:
+        from geedataextract import incremental
+
+        lastDate = incremental.sinceDate(since, description)
+        if lastDate is not None:
+            #time steps start at or after the day following the last extracted startDate
+            start = ee.Date(lastDate).advance(1, 'day').millis()
+            imgCol = imgCol.filter(ee.Filter.gte('system:time_start', start))
+            description = description + '_u' + lastDate.replace('-', '')
+
+    if isinstance(band, list):
+        nBands = len(band)
+    else:
+        nBands = 1
+
+    nImages = None
+    if timeAsBands or chunkSize == 'auto' or mode == 'direct':
+        nImages = imgCol.size().getInfo()
+
+    if mode == 'direct':
+        from geedataextract import directFetch
+
+        #every feature is fetched in a single table: one row per time step, or one wide row with timeAsBands
+        nFeatures = directFetch.checkSize(pts1, nImages)
+        nRows = nFeatures if timeAsBands else nFeatures * nImages
+        chunkSize = None
+
+    #the pixels of a collection are those of its first image
+    pts1, fanOut = dedupePts(pts1, ee.Image(imgCol.first()), buf, poly, scalePix, dedupe)
+
+    #last startDate of the time steps, requested once for all chunks and recorded in the manifest
+    lastDates = []
+
+    def lastDate():
+        if len(lastDates) == 0:
+            last = ee.Date(imgCol.aggregate_max('system:time_start')).format('YYYY-MM-dd')
+            lastDates.append(last.getInfo())
+        return lastDates[0]
+
+    tasks = []
+    for tag, ptsChunk in chunkPts(pts1, chunkSize, nImages or 1, chunkOrder):
+        pts = preparePts(ptsChunk, buf)
+
+        if not timeAsBands:
+            table = reduceCollection(imgCol, band, pts, scalePix, reducer, properties)
+            if fanOut is not None:
+                table = fanOut(table)
+            if mode == 'direct':
+                tasks.append(fetchTable(table, description + tag, outColumns(band, reducer), nRows))
+            else:
+                tasks.append(exportTable(table, description + tag, folderOut, outColumns(band, reducer),
+                                         scheduler, manifest, cache, lastDate))
+            continue
+
+        #number of time steps per stack, so that each stacked image stays below maxBands
+        nSteps = max(1, maxBands // nBands)
+
+        for chunk, offset in enumerate(range(0, nImages, nSteps)):
+            stepCol = ee.ImageCollection(imgCol.toList(nSteps, offset))
+            table = reduceAsBands(stepCol, band, pts, scalePix, reducer)
+            if fanOut is not None:
+                table = fanOut(table)
+            if mode == 'direct':
+                tasks.append(fetchTable(table, description + tag + '_tb' + str(chunk), None, nRows))
+            else:
+                tasks.append(exportTable(table, description + tag + '_tb' + str(chunk), folderOut,
+                                         columns = None, scheduler = scheduler, manifest = manifest,
+                                         cache = cache, lastDate = lastDate))
+
+    return [t for t in tasks if t is not None]
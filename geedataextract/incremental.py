@@ -0,0 +1,187 @@
+#####Incremental updates of time-series extractions
+
+"""
+Restricts time-series exports to the time steps that are not extracted yet
+
+Rerunning a GEE* function to add the latest images exports the whole history
+again. With since, each export only keeps the images that start after the last
+startDate already extracted for its dataset, metric, time step, geometry ('pts1', 'ptsB' or
+'poly1'), and model and scenario:
+
+    since - a date 'YYYY-MM-DD', or where the extracted data is found:
+        a consolidated CSV table (see consolidate), a Parquet dataset (see parquetStore),
+        a folder of exported CSV tables, or a jobManifest.JobManifest (the last startDate of
+        its completed exports)
+
+The dataset, metric and geometry of each export are parsed from its description, so the
+same source can be given to every function. Consolidated tables and Parquet datasets
+written without the geom column cannot tell the geometries apart and are refused.
+
+Incremental exports get the suffix '_uYYYYMMDD' (the last date already extracted) after
+the '_pts1'/'_ptsB'/'_poly1' suffix, and can be appended to the consolidated table once
+downloaded:
+
+    consolidate.consolidate(folder, 'all_data.csv', pattern = '*_u*.csv', append = True)
+
+Example:
+
+    downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 1979, 2030, 'month', 0, 0, 'me', 'gridmet',
+                                  since = 'all_data.csv')
+"""
+
+import csv
+import datetime
+import os
+import re
+
+from geedataextract import consolidate
+
+datePattern = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+#last dates of the sources already read: key -> (modification time, last dates)
+source_d = {}
+
+def maxDates(rows):
+    """
+    Returns {(dataset, metric, timeStep, model, scenario, geom): last startDate} over rows
+    (dictionaries with the consolidate.columns). Raises ValueError for rows without geom.
+    """
+    last_d = {}
+    for row in rows:
+        date = str(row['startDate'])[0:10]
+        if date == '' or date == 'None':
+            continue
+        if not row.get('geom'):
+            raise ValueError('The extracted data has no geom column and cannot tell the pts1, ptsB and '
+                             'poly1 exports apart: consolidate it again')
+        key = (row['dataset'], row['metric'], row['timeStep'] or '', row['model'] or '',
+               row['scenario'] or '', row['geom'])
+        if key not in last_d or date > last_d[key]:
+            last_d[key] = date
+
+    return last_d
+
+def manifestDates(manifest):
+    """
+    Returns {(dataset, metric, timeStep, model, scenario, geom): last startDate} for the completed exports
+    of a jobManifest.JobManifest. The last startDate of each export is recorded in the manifest
+    when it is started; exports recorded without it are taken to end on 'endYear-12-31'.
+    """
+    last_d = {}
+    for description, state in manifest.states().items():
+        desc = consolidate.parseDescription(description)
+        if state != 'COMPLETED' or desc is None or desc['endYear'] is None:
+            continue
+
+        date = (manifest.params(description) or {}).get('lastDate') or str(desc['endYear']) + '-12-31'
+        for metric in desc['metrics']:
+            key = (desc['dataset'], metric, desc['timeStep'] or '', desc['model'] or '',
+                   desc['scenario'] or '', desc['geom'])
+            if key not in last_d or date > last_d[key]:
+                last_d[key] = date
+
+    return last_d
+
+def isParquet(path):
+    """
+    Returns True if path is a Parquet file or a folder containing Parquet files
+    """
+    if os.path.isfile(path):
+        return path.lower().endswith('.parquet')
+
+    for root, dirs, files in os.walk(path):
+        if any([name.endswith('.parquet') for name in files]):
+            return True
+
+    return False
+
+def sourceTime(path):
+    """
+    Returns the latest modification time of path and, for a folder, of every file and folder below it
+    """
+    mtime = os.path.getmtime(path)
+
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            mtime = max(mtime, os.path.getmtime(os.path.join(root, name)))
+
+    return mtime
+
+def lastDates(source):
+    """
+    Returns {(dataset, metric, timeStep, model, scenario, geom): last startDate 'YYYY-MM-DD'} of the data
+    in source: a consolidated CSV table, a Parquet dataset, a folder of exported CSV tables or a
+    jobManifest.JobManifest. Raises ValueError for tables and datasets without the geom column.
+    """
+    if hasattr(source, 'states'):
+        return manifestDates(source)
+
+    path = os.path.expanduser(str(source))
+    if not os.path.exists(path):
+        raise IOError('No extracted data found at ' + path)
+
+    #each source is only read again when it changes, including files added to nested partitions
+    mtime = sourceTime(path)
+    if path in source_d and source_d[path][0] == mtime:
+        return source_d[path][1]
+
+    if isParquet(path):
+        from geedataextract import parquetStore
+
+        columns = ['dataset', 'metric', 'timeStep', 'model', 'scenario', 'geom', 'startDate']
+        try:
+            table = parquetStore.readParquet(path, columns = columns, asPandas = False)
+        except ValueError:
+            raise ValueError('The Parquet dataset ' + path + ' has no geom column and cannot tell the pts1, '
+                             'ptsB and poly1 exports apart: write it again')
+        last_d = maxDates(table.to_pylist())
+    elif os.path.isdir(path):
+        last_d = maxDates(consolidate.iterFolder(path))
+    else:
+        with open(path) as f:
+            last_d = maxDates(csv.DictReader(f))
+
+    source_d[path] = (mtime, last_d)
+    return last_d
+
+def sinceDate(since, description):
+    """
+    Returns the last date 'YYYY-MM-DD' already extracted for the export description (with its
+    '_pts1'/'_ptsB'/'_poly1' suffix), or None if since is None or nothing was extracted yet.
+    For exports of several metrics, the earliest of their last dates is used.
+    """
+    if since is None:
+        return None
+
+    if isinstance(since, (datetime.date, datetime.datetime)):
+        return since.strftime('%Y-%m-%d')
+
+    if isinstance(since, str) and datePattern.match(since):
+        return since
+
+    desc = consolidate.parseDescription(description)
+    if desc is None:
+        return None
+
+    last_d = lastDates(since)
+
+    if desc['model'] in ['ensemble', 'ensembleStats']:
+        #ensemble exports: the earliest last date of the members (or statistics) already extracted
+        scenarios = desc['scenario'].split('-')
+        isStats = desc['model'] == 'ensembleStats'
+        dates = []
+        for metric in desc['metrics']:
+            members = [date for key, date in last_d.items()
+                       if key[0:3] == (desc['dataset'], metric, desc['timeStep'] or '')
+                       and key[4] in scenarios and key[3].startswith('ensemble_') == isStats
+                       and key[5] == desc['geom']]
+            dates.append(min(members) if len(members) > 0 else None)
+    else:
+        dates = [last_d.get((desc['dataset'], metric, desc['timeStep'] or '', desc['model'] or '',
+                             desc['scenario'] or '', desc['geom'])) for metric in desc['metrics']]
+
+    if None in dates:
+        #a metric that was never extracted: export its whole history
+        return None
+
+    return min(dates)
@@ -0,0 +1,152 @@
+#####Resumable job manifest for the GEE* functions
+
+"""
+On-disk manifest of the exports started by the GEE* functions
+
+Every export is recorded in a JSON lines file, keyed by its description
+(e.g. projm_NEX_pr_rcp85_CCSM4_2006_2010_pts1), with the task id, the export
+parameters and the last known state. When a function is rerun with the same
+manifest, exports that are COMPLETED or still READY/RUNNING are skipped, so only
+missing, failed or cancelled exports are submitted again.
+
+Example:
+
+    from geedataextract import downloadData, jobManifest
+
+    manifest = jobManifest.JobManifest('nex_jobs.jsonl')
+    downloadData.GEEnasaNEXGDDP(..., manifest = manifest)
+"""
+
+import json
+import os
+import threading
+import time
+
+from geedataextract import taskScheduler
+
+class JobManifest(object):
+    """
+    Manifest of export tasks stored as JSON lines in path. Each line is one state change:
+
+        {"description": ..., "state": ..., "taskId": ..., "params": {...}, "time": ...}
+
+    The last line of each description gives its current state.
+
+    Requires:
+
+    path - file name of the manifest. It is created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """
+        Reads the manifest file, keeping the last record of each description
+        """
+        self.records = {}
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    #partially written line, e.g. after the kernel was killed
+                    continue
+                self.records[rec['description']] = rec
+
+    def record(self, description, state, taskId = None, params = None):
+        """
+        Appends the state of an export to the manifest. taskId and params are kept
+        from the previous record of description if not given.
+        """
+        with self.lock:
+            prev = self.records.get(description, {})
+
+            rec = {}
+            rec['description'] = description
+            rec['state'] = state
+            rec['taskId'] = taskId if taskId is not None else prev.get('taskId')
+            rec['params'] = params if params is not None else prev.get('params')
+            rec['time'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(rec) + '\n')
+
+            self.records[description] = rec
+
+    def state(self, description):
+        """
+        Returns the last recorded state of description, or None if it was never exported
+        """
+        with self.lock:
+            rec = self.records.get(description)
+            if rec is None:
+                return None
+            return rec['state']
+
+    def refresh(self, descriptions = None):
+        """
+        Updates the state of exports that were READY or RUNNING when last recorded,
+        using ee.data.getTaskStatus. By default all such exports are updated.
+        """
+        import ee
+
+        with self.lock:
+            if descriptions is None:
+                descriptions = list(self.records.keys())
+
+            active = [d for d in descriptions
+                      if self.state(d) in taskScheduler.activeStates and self.records[d].get('taskId')]
+
+            if len(active) == 0:
+                return
+
+            statusL = ee.data.getTaskStatus([self.records[d]['taskId'] for d in active])
+
+            for d, status in zip(active, statusL):
+                state = status.get('state')
+                if state == 'UNKNOWN':
+                    #task id no longer known to GEE, export again
+                    state = 'FAILED'
+                if state is not None and state != self.state(d):
+                    self.record(d, state)
+
+    def needsExport(self, description):
+        """
+        Returns True if description was never exported, or if its last export
+        FAILED or was CANCELLED. Exports that were still running are refreshed first.
+        """
+        state = self.state(description)
+
+        if state in taskScheduler.activeStates:
+            self.refresh([description])
+            state = self.state(description)
+
+        return state not in ['COMPLETED'] + taskScheduler.activeStates
+
+    def params(self, description):
+        """
+        Returns the export parameters recorded for description, or None if it was never exported
+        """
+        with self.lock:
+            rec = self.records.get(description)
+            if rec is None:
+                return None
+            return rec['params']
+
+    def states(self):
+        """
+        Returns a dictionary of export description -> last recorded state
+        """
+        with self.lock:
+            return dict([(d, rec['state']) for d, rec in self.records.items()])
@@ -0,0 +1,637 @@
+#####Local raster backend for the GEE* functions
+
+"""
+Runs extractions against local rasters instead of Google Earth Engine
+
+This module mirrors extractEngine (loadPts, aggregateTime, extractImage,
+extractCollection) for rasters stored on disk as NumPy arrays, and provides
+local versions of GEEgridmetPtsAvg, GEEtopoPts and GEEsoilPts with the same
+parameters, where username is replaced by the local data folder. The downloadData
+functions call them with backend = 'local' (see useLocal). The CSV tables
+are written to folderOut with the same names and columns as the Earth Engine
+exports, so consolidate and parquetStore read them unchanged.
+
+Data folder layout:
+
+    dataDir/pts.csv                 points: columns geeID, x, y
+    dataDir/plots.geojson           polygons (or points): features with a geeID property
+    dataDir/GRIDMET/tmmn.npy        raster stack (time, rows, cols) or image (rows, cols)
+    dataDir/GRIDMET/tmmn.json       {"transform": [x0, dx, y0, dy], "dates": ["1979-01-01", ...],
+                                     "nodata": -9999, "geographic": true}
+
+x0, y0 are the coordinates of the upper left corner and dy is negative for north-up
+rasters. If geographic is true, coordinates are longitude/latitude and buffers (meters)
+are converted to degrees. Arrays are memory-mapped, so stacks larger than memory can be used.
+
+Differences with Earth Engine: rasters are read at their native resolution (scalePix is
+ignored), and a pixel belongs to a buffer or polygon if its centre is inside it (see
+zonalStats.defaultSubsamples for fractional pixel weights).
+
+Requires numpy.
+
+Example:
+
+    from geedataextract import localBackend
+
+    localBackend.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2010, 'month', 0, 0, '/data/archive', 'out')
+
+or, with the same result:
+
+    from geedataextract import downloadData
+
+    downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2010, 'month', 0, 0, '/data/archive', 'out',
+                                  backend = 'local')
+"""
+
+import csv
+import json
+import math
+import os
+
+from geedataextract import extractEngine
+from geedataextract import pixelCache
+from geedataextract import registry
+from geedataextract import zonalStats
+
+ID_field = extractEngine.ID_field
+
+#meters per degree of latitude
+degreeMeters = 111320.0
+
+class Raster(object):
+    """
+    Raster image or stack of images on a regular grid
+
+    Requires:
+
+    data - numpy array (rows, cols) or (time, rows, cols), possibly memory-mapped
+
+    transform - [x0, dx, y0, dy]: coordinates of the upper left corner and pixel size
+
+    Optional parameters
+
+    dates - list of 'YYYY-MM-DD' strings, one per image of a stack. Default: None
+
+    nodata - value of missing pixels. Default: None
+
+    geographic - True if coordinates are longitude/latitude. Default: True
+
+    """
+
+    def __init__(self, data, transform, dates = None, nodata = None, geographic = True):
+        self.data = data
+        self.transform = [float(t) for t in transform]
+        self.dates = list(dates) if dates is not None else None
+        self.nodata = nodata
+        self.geographic = geographic
+
+    @classmethod
+    def load(cls, folder, name):
+        """
+        Loads folder/name.npy (memory-mapped) with the metadata in folder/name.json
+        """
+        import numpy as np
+
+        with open(os.path.join(folder, name + '.json')) as f:
+            meta = json.load(f)
+
+        data = np.load(os.path.join(folder, name + '.npy'), mmap_mode = 'r')
+
+        return cls(data, meta['transform'], meta.get('dates'), meta.get('nodata'), meta.get('geographic', True))
+
+    @property
+    def shape(self):
+        return self.data.shape[-2:]
+
+    @property
+    def nTimes(self):
+        if self.data.ndim == 3:
+            return self.data.shape[0]
+        return None
+
+    def cellSize(self, y):
+        """
+        Returns the pixel width and height in meters at coordinate y (number or numpy array)
+        """
+        import numpy as np
+
+        x0, dx, y0, dy = self.transform
+        if self.geographic:
+            return abs(dx) * degreeMeters * np.cos(np.radians(y)), abs(dy) * degreeMeters
+        return abs(dx), abs(dy)
+
+    def centres(self, rows, cols):
+        """
+        Returns the coordinates of the centres of pixels (rows, cols)
+        """
+        x0, dx, y0, dy = self.transform
+        return x0 + (cols + 0.5) * dx, y0 + (rows + 0.5) * dy
+
+    def index(self, x, y):
+        """
+        Returns the (row, col) of the pixel containing (x, y), or None if it is outside the raster
+        """
+        x0, dx, y0, dy = self.transform
+        col = int(math.floor((x - x0) / dx))
+        row = int(math.floor((y - y0) / dy))
+
+        if 0 <= row < self.shape[0] and 0 <= col < self.shape[1]:
+            return row, col
+        return None
+
+    def window(self, xmin, ymin, xmax, ymax):
+        """
+        Returns the rows and cols (numpy arrays) of all pixels whose centre is inside the bounding box
+        """
+        import numpy as np
+
+        x0, dx, y0, dy = self.transform
+        c0 = int(math.floor((xmin - x0) / dx - 0.5))
+        c1 = int(math.ceil((xmax - x0) / dx - 0.5))
+        r0 = int(math.floor((min((ymin - y0) / dy, (ymax - y0) / dy)) - 0.5))
+        r1 = int(math.ceil((max((ymin - y0) / dy, (ymax - y0) / dy)) - 0.5))
+
+        c0, r0 = max(c0, 0), max(r0, 0)
+        c1, r1 = min(c1, self.shape[1] - 1), min(r1, self.shape[0] - 1)
+        if c1 < c0 or r1 < r0:
+            return np.zeros(0, int), np.zeros(0, int)
+
+        rows, cols = np.meshgrid(np.arange(r0, r1 + 1), np.arange(c0, c1 + 1), indexing = 'ij')
+        return rows.ravel(), cols.ravel()
+
+    def values(self, rows, cols, times = None, maxImages = None):
+        """
+        Returns the pixel values at (rows, cols) as floats with nodata replaced by NaN:
+        an array (n,) for an image or (time, n) for a stack, for the images in times
+        (slice, default: all). Composites (see CompositeStack) are computed from at most
+        maxImages source images at a time (default: all the images of a composite).
+        """
+        import numpy as np
+
+        if isinstance(self.data, CompositeStack):
+            vals = self.data.read(times if times is not None else slice(None), rows, cols, maxImages)
+        elif self.data.ndim == 3:
+            vals = np.asarray(self.data[times if times is not None else slice(None), rows, cols], dtype = float)
+        else:
+            vals = np.asarray(self.data[rows, cols], dtype = float)
+
+        if self.nodata is not None:
+            vals[vals == self.nodata] = np.nan
+
+        return vals
+
+    def select(self, indices):
+        """
+        Returns a Raster with the images of the stack at indices
+        """
+        #consecutive images are sliced, so memory-mapped stacks are not copied
+        if len(indices) > 0 and list(indices) == list(range(indices[0], indices[-1] + 1)):
+            data = self.data[indices[0]:indices[-1] + 1]
+        else:
+            data = self.data[indices]
+
+        return Raster(data, self.transform, [self.dates[i] for i in indices], self.nodata, self.geographic)
+
+def loadPts(ptsFile, dataDir):
+    """
+    Loads the points or polygons of dataDir/ptsFile (.csv with columns geeID, x, y, or .geojson).
+    Returns a list of features: dictionaries with geeID, type and coordinates.
+    """
+    path = os.path.join(dataDir, str(ptsFile))
+    for ext in ['', '.csv', '.geojson', '.json']:
+        if os.path.isfile(path + ext):
+            path = path + ext
+            break
+    else:
+        raise IOError('No points or polygons file found for ' + path)
+
+    features = []
+
+    if path.lower().endswith('.csv'):
+        with open(path) as f:
+            for row in csv.DictReader(f):
+                features.append({'geeID': row[ID_field], 'type': 'Point',
+                                 'coordinates': [float(row['x']), float(row['y'])]})
+    else:
+        with open(path) as f:
+            gj = json.load(f)
+        for feat in gj['features']:
+            features.append({'geeID': feat['properties'][ID_field], 'type': feat['geometry']['type'],
+                             'coordinates': feat['geometry']['coordinates']})
+
+    return features
+
+def dateKeys(dates, timeStep):
+    """
+    Returns the year ('YYYY') or month ('YYYY-MM') of each date
+    """
+    if timeStep == 'year':
+        return [d[0:4] for d in dates]
+    return [d[0:7] for d in dates]
+
+def aggregateTime(raster, timeStep, years, stat = 'mean', months = None):
+    """
+    Temporal aggregation: combines the images of raster into yearly or monthly composites
+    with stat ('mean' or 'sum'), dated by the first image of each year or month, for years.
+    Any other time step keeps the daily images of years.
+
+    months - month offsets (from January of years[0]) to aggregate when timeStep = 'month', as
+        in extractEngine.aggregateTime. Default: None (every month of years)
+    """
+    if timeStep == 'month' and months is not None:
+        monthsS = set(months)
+        keep = [i for i, d in enumerate(raster.dates)
+                if 12 * (int(d[0:4]) - years[0]) + int(d[5:7]) - 1 in monthsS]
+    else:
+        yearsS = set([str(y) for y in years])
+        keep = [i for i, d in enumerate(raster.dates) if d[0:4] in yearsS]
+
+    if timeStep not in ['year', 'month']:
+        return raster.select(keep)
+
+    keys = dateKeys([raster.dates[i] for i in keep], timeStep)
+
+    groups = []
+    for i, key in zip(keep, keys):
+        if len(groups) == 0 or groups[-1][0] != key:
+            groups.append((key, []))
+        groups[-1][1].append(i)
+
+    stack = CompositeStack(raster, [g[1] for g in groups], stat)
+
+    return Raster(stack, raster.transform, [raster.dates[g[1][0]] for g in groups],
+                  None, raster.geographic)
+
+class CompositeStack(object):
+    """
+    Lazy (time, rows, cols) stack of composites of raster: only the pixels that are
+    read are aggregated
+    """
+
+    def __init__(self, raster, groups, stat):
+        self.raster = raster
+        self.groups = groups
+        self.stat = stat
+        self.ndim = 3
+        self.shape = (len(groups),) + tuple(raster.shape)
+
+    def __getitem__(self, key):
+        t, rows, cols = key
+        return self.read(t, rows, cols)
+
+    def read(self, t, rows, cols, maxImages = None):
+        """
+        Returns the composites t (index or slice) at (rows, cols). Each composite is accumulated
+        from reads of at most maxImages of its source images (default: all at once), so the memory
+        used does not depend on the number of images per composite.
+        """
+        import numpy as np
+
+        groups = self.groups[t] if isinstance(t, slice) else [self.groups[t]]
+
+        out = np.full((len(groups), len(rows)), np.nan)
+        for n, g in enumerate(groups):
+            step = max(1, int(maxImages)) if maxImages else len(g)
+            total = np.zeros(len(rows))
+            count = np.zeros(len(rows))
+
+            #only the images of the requested composites are read
+            for i in range(0, len(g), step):
+                part = g[i:i + step]
+                v = self.raster.values(rows, cols, slice(part[0], part[-1] + 1))[[j - part[0] for j in part]]
+                valid = ~np.isnan(v)
+                total += np.where(valid, v, 0).sum(axis = 0)
+                count += valid.sum(axis = 0)
+
+            if self.stat == 'sum':
+                out[n] = np.where(count > 0, total, np.nan)
+            else:
+                out[n] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+        if isinstance(t, slice):
+            return out
+        return out[0]
+
+def formatValue(value):
+    """
+    Formats a value for the CSV table like Earth Engine: integers without decimals,
+    histograms as {11=2, 21=1}
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return '{' + ', '.join([formatValue(k) + '=' + formatValue(value[k]) for k in sorted(value)]) + '}'
+    value = float(value)
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def isMissing(value):
+    """
+    Returns True for None and NaN
+    """
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def writeTable(rows, columns, description, folderOut):
+    """
+    Export: writes rows (iterable of lists of values) to folderOut/description.csv, skipping rows
+    where all columns after the first two (system:index, geeID) and before startDate are missing
+    """
+    if not os.path.exists(folderOut):
+        os.makedirs(folderOut)
+
+    path = os.path.join(folderOut, description + '.csv')
+    valueIdx = [i for i, c in enumerate(columns) if c not in ['system:index', ID_field, 'startDate']]
+
+    with open(path, 'w', newline = '') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+
+        for row in rows:
+            if all([isMissing(row[i]) for i in valueIdx]):
+                continue
+            writer.writerow([('' if v is None else formatValue(v)) if i in valueIdx else v
+                             for i, v in enumerate(row)])
+
+    return path
+
+def gridTables(rasters, pts1, buf, poly):
+    """
+    Geometry preparation: returns the zonalStats.PixelTable of pts1 for each raster. The features
+    are rasterized once per grid, and the tables are reused across calls (see pixelCache).
+    """
+    ptsKey = pixelCache.featuresKey(pts1)
+
+    return [pixelCache.localTable(raster, pts1, buf, poly, ptsKey = ptsKey) for raster in rasters]
+
+def extractImage(rasters, pts1, buf, poly, description, folderOut, scalePix = None, reducer = 'mean',
+                 bands = None):
+    """
+    Extracts an image at point OR within buffer of point if buf > 0 OR within polygon if poly = 1,
+    like extractEngine.extractImage, and writes folderOut/description<suffix>.csv
+
+    Requires:
+
+    rasters - Raster (one image), or list of Rasters when bands is given (one per band)
+
+    pts1 - list of features from loadPts
+
+    Returns the list of written files.
+    """
+    if not isinstance(rasters, list):
+        rasters = [rasters]
+
+    columns = ['system:index', ID_field] + extractEngine.outColumns(bands, reducer)
+
+    tables = gridTables(rasters, pts1, buf, poly)
+    values = [zonalStats.reduceImage(raster, table, reducer) for raster, table in zip(rasters, tables)]
+
+    rows = ([str(n), feature['geeID']] + [vals[n] for vals in values] for n, feature in enumerate(pts1))
+
+    return [writeTable(rows, columns, description + extractEngine.geomSuffix(buf, poly), folderOut)]
+
+def extractCollection(rasters, band, pts1, buf, poly, description, folderOut, scalePix = None,
+                      reducer = 'mean'):
+    """
+    Extracts a time-series at point OR within buffer of point if buf > 0 OR within polygon if poly = 1,
+    like extractEngine.extractCollection, and writes folderOut/description<suffix>.csv
+
+    Requires:
+
+    rasters - Raster stack, or list of stacks on the same dates when band is a list (one per band)
+
+    band - name of the band, or list of band names
+
+    pts1 - list of features from loadPts
+
+    Returns the list of written files.
+    """
+    if not isinstance(rasters, list):
+        rasters = [rasters]
+
+    columns = ['system:index', ID_field] + extractEngine.outColumns(band, reducer) + ['startDate']
+
+    dates = rasters[0].dates
+    tables = gridTables(rasters, pts1, buf, poly)
+
+    #the bands are reduced in blocks of time steps, and the rows of each block written before the next
+    timeBlock = min([zonalStats.blockSize(table) for table in tables])
+    blocksL = [zonalStats.iterBlocks(raster, table, reducer, timeBlock) for raster, table in zip(rasters, tables)]
+
+    def iterRows():
+        for blocks in zip(*blocksL):
+            t0 = blocks[0][0]
+            for dt in range(len(blocks[0][1])):
+                t = t0 + dt
+                startDate = dates[t] + 'T00:00:00'
+                for n, feature in enumerate(pts1):
+                    yield ([str(t) + '_' + str(n), feature['geeID']] +
+                           [block[dt][n] for tb, block in blocks] + [startDate])
+
+    return [writeTable(iterRows(), columns, description + extractEngine.geomSuffix(buf, poly), folderOut)]
+
+def useLocal(backend, options, **params):
+    """
+    Returns True if a downloadData function called with backend runs with this module
+
+    Requires:
+
+    backend - 'ee' (Earth Engine) or 'local'
+
+    options - options of the function, completed by extractEngine.extractOptions
+
+    params - other parameters of the function that the local version does not have, e.g. timeAsBands
+
+    Raises a ValueError for another backend, or with backend = 'local' if an option is not at its
+    default value or a parameter of params is set, since the local version would ignore them.
+    """
+    if backend not in ['ee', 'local']:
+        raise ValueError("backend must be 'ee' or 'local'")
+
+    if backend == 'ee':
+        return False
+
+    defaults = extractEngine.extractOptions({}, 'since' in options)
+    unsupported = ([name for name, value in sorted(options.items()) if value != defaults[name]] +
+                   [name for name, value in sorted(params.items()) if value])
+    if len(unsupported) > 0:
+        raise ValueError('Not supported by the local backend: ' + ', '.join(unsupported))
+
+    return True
+
+def GEEgridmetPtsAvg(ptsFile,metric,startYear,endYear,timeStep,buf,poly,dataDir,folderOut, scalePix = 4000,
+                     singlePass = False):
+    """
+    Local version of downloadData.GEEgridmetPtsAvg
+
+    Reads dataDir/GRIDMET/<band>.npy (bands tmmn, tmmx, vpd) and writes the tables to folderOut.
+    Other parameters are the same as for downloadData.GEEgridmetPtsAvg.
+
+    Returns the list of written files.
+    """
+    gridmet = registry.get('GRIDMET')
+
+    time_d = {}
+    time_d['month'] = 'cm'
+    time_d['year'] = 'cy'
+    time_d['day'] = 'cd'
+
+    pts1 = loadPts(ptsFile, dataDir)
+
+    files = []
+    for mets in extractEngine.metricGroups(metric, singlePass):
+        rasters = [Raster.load(os.path.join(dataDir, 'GRIDMET'), gridmet.band(met)) for met in mets]
+
+        #as on Earth Engine: complete years up to the year before the last image, plus the months of
+        #the last year before the month of the last image, or every day up to endYear
+        lastImageDate = rasters[0].dates[-1]
+
+        endYearReal = min(int(lastImageDate[0:4]) - 1, endYear)
+
+        years = list(range(startYear, endYearReal + 1))
+
+        if endYear > endYearReal:
+            months = list(range(0, 12 * len(years) + int(lastImageDate[5:7]) - 1))
+        else:
+            months = list(range(0, 12 * len(years)))
+
+        if timeStep == 'day':
+            days = list(range(startYear, endYear + 1))
+            img_cols = [aggregateTime(raster, timeStep, days) for raster in rasters]
+        else:
+            img_cols = [aggregateTime(raster, timeStep, years, months = months) for raster in rasters]
+
+        files += extractCollection(img_cols, mets, pts1, buf, poly,
+                                   str(time_d[timeStep])+'_'+'-'.join(mets)+'_'+str(years[0])+'_'+str(years[len(years)-1]),
+                                   folderOut, scalePix)
+
+    return files
+
+def terrainValues(dem, rows, cols, product):
+    """
+    Returns the slope or aspect (radians) of dem at (rows, cols), from the 3x3 neighbourhood
+    of each pixel, like ee.Terrain.slope and ee.Terrain.aspect (converted to radians)
+    """
+    import numpy as np
+
+    nRows, nCols = dem.shape
+    up = np.clip(rows - 1, 0, nRows - 1)
+    down = np.clip(rows + 1, 0, nRows - 1)
+    left = np.clip(cols - 1, 0, nCols - 1)
+    right = np.clip(cols + 1, 0, nCols - 1)
+
+    cx, cy = dem.centres(rows, cols)
+    wx, wy = dem.cellSize(cy)
+
+    dzdx = (dem.values(rows, right) - dem.values(rows, left)) / ((right - left) * wx)
+    #rows increase to the south
+    dzdy = (dem.values(up, cols) - dem.values(down, cols)) / ((down - up) * wy)
+
+    if product == 'slope':
+        return np.arctan(np.hypot(dzdx, dzdy))
+
+    #direction the slope faces, clockwise from north
+    return np.mod(np.arctan2(-dzdx, -dzdy), 2 * math.pi)
+
+class TerrainRaster(Raster):
+    """
+    Slope or aspect (radians), or their sin/cos, computed on the fly from a DEM
+    """
+
+    def __init__(self, dem, product, transform = None):
+        Raster.__init__(self, dem.data, dem.transform, None, None, dem.geographic)
+        self.dem = dem
+        self.product = product
+        self.transform_f = transform
+
+    def values(self, rows, cols, times = None, maxImages = None):
+        vals = terrainValues(self.dem, rows, cols, self.product)
+        if self.transform_f is not None:
+            vals = self.transform_f(vals)
+        return vals
+
+def GEEtopoPts(ptsFile,metric,buf,poly,dataDir,folderOut, scalePix = 30):
+    """
+    Local version of downloadData.GEEtopoPts
+
+    Reads the DEM in dataDir/SRTM/elevation.npy and writes the tables to folderOut.
+    Other parameters are the same as for downloadData.GEEtopoPts.
+
+    Returns the list of written files.
+    """
+    import numpy as np
+
+    pts1 = loadPts(ptsFile, dataDir)
+
+    srtm = Raster.load(os.path.join(dataDir, 'SRTM'), 'elevation')
+
+    files = []
+    if 'elev' in metric:
+        files += extractImage(srtm, pts1, buf, poly, 's_elev_topo', folderOut, scalePix)
+
+    if 'slope' in metric:
+        files += extractImage(TerrainRaster(srtm, 'slope'), pts1, buf, poly, 's_slope_topo', folderOut, scalePix)
+
+    if 'aspect' in metric:
+        if any([(buf > 0),(poly > 0)]):
+            #sums of sin and cos, for a circular average of aspect
+            files += extractImage([TerrainRaster(srtm, 'aspect', np.sin), TerrainRaster(srtm, 'aspect', np.cos)],
+                                  pts1, buf, poly, 's_aspect_sin-aspect_cos_topo', folderOut, scalePix,
+                                  reducer = 'sum', bands = ['aspect_sin', 'aspect_cos'])
+        else:
+            files += extractImage(TerrainRaster(srtm, 'aspect'), pts1, buf, poly, 's_aspect_topo',
+                                  folderOut, scalePix)
+
+    return files
+
+class ScaledRaster(Raster):
+    """
+    Raster whose values are divided by divisor when read
+    """
+
+    def __init__(self, raster, divisor):
+        Raster.__init__(self, raster.data, raster.transform, raster.dates, raster.nodata, raster.geographic)
+        self.divisor = divisor
+
+    def values(self, rows, cols, times = None, maxImages = None):
+        return Raster.values(self, rows, cols, times, maxImages) / self.divisor
+
+def GEEsoilPts(ptsFile,metric,buf,poly,dataDir,folderOut, scalePix = 250, singlePass = False):
+    """
+    Local version of downloadData.GEEsoilPts
+
+    Reads dataDir/soil/<name>.npy, named like the Earth Engine assets (e.g. ORCDRC_I,
+    TAXOUSDA_250m), and writes the tables to folderOut. Other parameters are the same
+    as for downloadData.GEEsoilPts.
+
+    Returns the list of written files.
+    """
+    soil = registry.get('soil')
+
+    pts1 = loadPts(ptsFile, dataDir)
+
+    #class maps and soilDepth are not scaled
+    def soilRaster(met):
+        raster = Raster.load(os.path.join(dataDir, 'soil'), soil.band(met))
+        scale = soil.scale(met)
+        if scale is None or scale[0] == 1:
+            return raster
+        return ScaledRaster(raster, 1.0 / scale[0])
+
+    #class maps are reduced with the mode, continuous maps with the mean
+    modeL = [met for met in metric if met in ['subgroupsWorld', 'subordersUS']]
+    meanL = [met for met in metric if met not in modeL]
+
+    if singlePass:
+        metricL = [mets for mets in [modeL, meanL] if len(mets) > 0]
+    else:
+        metricL = extractEngine.metricGroups(metric)
+
+    files = []
+    for mets in metricL:
+        reducer = 'mode' if mets[0] in modeL else 'mean'
+
+        files += extractImage([soilRaster(met) for met in mets], pts1, buf, poly, 's_'+'-'.join(mets)+'_soil',
+                              folderOut, scalePix, reducer = reducer, bands = mets)
+
+    return files
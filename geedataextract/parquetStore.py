@@ -0,0 +1,260 @@
+#####Parquet output for consolidated extractions
+
+"""
+Writes the exported CSV tables as a partitioned Parquet dataset and reads it back
+
+writeParquet() streams the long rows of consolidate.iterFolder() into a Parquet
+dataset partitioned by dataset/metric/year, with typed columns:
+
+    geeID - int64 (or string if the IDs are not integers)
+    startDate - date
+    timeStep, model, scenario - string
+    geom - string, the geometry of the export ('pts1', 'ptsB' or 'poly1')
+    value - float64
+    text - string, for values that are not numbers (e.g. the land cover histograms)
+
+readParquet() only reads the requested columns, datasets, metrics and dates.
+Partitions outside the requested years are not opened.
+
+Requires pyarrow (pip install pyarrow), which is not needed by the rest of the package.
+
+Example:
+
+    from geedataextract import parquetStore
+
+    parquetStore.writeParquet('~/Google Drive/geeOut', 'geeData')
+    df = parquetStore.readParquet('geeData', dataset = 'NEX', metric = 'pr',
+                                  startDate = '2030-01-01', endDate = '2039-12-31')
+"""
+
+import datetime
+import os
+import time
+
+from geedataextract import consolidate
+
+partitionCols = ['dataset', 'metric', 'year']
+
+def importArrow():
+    """
+    Returns the pyarrow and pyarrow.parquet modules, with a helpful error if pyarrow is missing
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('pyarrow is required for Parquet output: pip install pyarrow')
+
+    return pyarrow, pyarrow.parquet
+
+def toDate(value):
+    """
+    Converts 'YYYY-MM-DD' to a datetime.date, or None for empty values
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value)[0:10], '%Y-%m-%d').date()
+
+def toFloat(value):
+    """
+    Returns value as a float, or None if it is not a number
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def schema(geeIDType = 'int64'):
+    """
+    Returns the pyarrow schema of the Parquet dataset
+    """
+    pa, pq = importArrow()
+
+    return pa.schema([('geeID', pa.int64() if geeIDType == 'int64' else pa.string()),
+                      ('startDate', pa.date32()),
+                      ('timeStep', pa.string()),
+                      ('model', pa.string()),
+                      ('scenario', pa.string()),
+                      ('geom', pa.string()),
+                      ('value', pa.float64()),
+                      ('text', pa.string()),
+                      ('dataset', pa.string()),
+                      ('metric', pa.string()),
+                      ('year', pa.int32())])
+
+def writeParquet(folder, outDir, pattern = '*.csv', geeIDType = None, batchSize = 1000000):
+    """
+    Streams every export in folder into a Parquet dataset partitioned by dataset/metric/year
+
+    Requires:
+
+    folder - local folder with the exported CSV files
+
+    outDir - folder of the Parquet dataset. New files are added to existing partitions.
+
+    Optional parameters
+
+    pattern - glob pattern of the files to convert. Default: '*.csv'
+
+    geeIDType - 'int64' or 'string'. Default: None ('int64' if the geeIDs of the first batch are integers)
+
+    batchSize - number of rows held in memory before they are written. Default: 1000000
+
+    Returns the number of rows written and the list of files that were skipped (see consolidate).
+    """
+    pa, pq = importArrow()
+
+    exports, skipped = consolidate.findExports(folder, pattern)
+    outDir = os.path.expanduser(outDir)
+
+    names = ['geeID', 'startDate', 'timeStep', 'model', 'scenario', 'geom', 'value', 'text', 'dataset',
+             'metric', 'year']
+    batch = dict([(name, []) for name in names])
+    state = {'nRows': 0, 'geeIDType': geeIDType}
+
+    #each date string is repeated for every feature, so it is only parsed once
+    date_d = {}
+
+    def flush():
+        if len(batch['geeID']) == 0:
+            return
+
+        if state['geeIDType'] is None:
+            try:
+                [int(i) for i in batch['geeID']]
+                state['geeIDType'] = 'int64'
+            except ValueError:
+                state['geeIDType'] = 'string'
+
+        if state['geeIDType'] == 'int64':
+            try:
+                batch['geeID'] = [int(i) for i in batch['geeID']]
+            except ValueError:
+                raise ValueError("geeID values are not all integers, use geeIDType = 'string'")
+
+        table = pa.Table.from_pydict(batch, schema = schema(state['geeIDType']))
+        pq.write_to_dataset(table, outDir, partition_cols = partitionCols)
+
+        state['nRows'] += len(batch['geeID'])
+        for name in names:
+            batch[name] = []
+
+    for path, desc in exports:
+        for row in consolidate.iterRows(path, desc):
+            if row['startDate'] not in date_d:
+                date_d[row['startDate']] = toDate(row['startDate'])
+            date = date_d[row['startDate']]
+            value = toFloat(row['value'])
+
+            batch['geeID'].append(row['geeID'])
+            batch['startDate'].append(date)
+            batch['timeStep'].append(row['timeStep'] or None)
+            batch['model'].append(row['model'] or None)
+            batch['scenario'].append(row['scenario'] or None)
+            batch['geom'].append(row['geom'])
+            batch['value'].append(value)
+            batch['text'].append(row['value'] if value is None else None)
+            batch['dataset'].append(row['dataset'])
+            batch['metric'].append(row['metric'])
+            batch['year'].append(date.year if date is not None else None)
+
+            if len(batch['geeID']) >= batchSize:
+                flush()
+
+    flush()
+
+    return state['nRows'], skipped
+
+def readParquet(path, columns = None, dataset = None, metric = None, startDate = None, endDate = None,
+                asPandas = True):
+    """
+    Reads a Parquet dataset written by writeParquet
+
+    Requires:
+
+    path - folder of the Parquet dataset
+
+    Optional parameters
+
+    columns - list of columns to read, e.g. ['geeID', 'startDate', 'value']. Default: None (all columns)
+
+    dataset - dataset name or list of names to read (e.g. 'NEX'). Default: None (all)
+
+    metric - metric name or list of names to read (e.g. 'pr'). Default: None (all)
+
+    startDate, endDate - first and last dates to read, as 'YYYY-MM-DD'. Default: None (no limit)
+
+    asPandas - If True, returns a pandas DataFrame; otherwise a pyarrow Table. Default: True
+
+    """
+    pa, pq = importArrow()
+
+    filters = []
+
+    if dataset is not None:
+        filters.append(('dataset', 'in', [dataset] if isinstance(dataset, str) else list(dataset)))
+    if metric is not None:
+        filters.append(('metric', 'in', [metric] if isinstance(metric, str) else list(metric)))
+
+    #the year partitions prune whole folders before the dates are compared
+    if startDate is not None:
+        startDate = toDate(startDate)
+        filters.append(('year', '>=', startDate.year))
+        filters.append(('startDate', '>=', startDate))
+    if endDate is not None:
+        endDate = toDate(endDate)
+        filters.append(('year', '<=', endDate.year))
+        filters.append(('startDate', '<=', endDate))
+
+    #partition columns typed explicitly: otherwise they are read as dictionaries, and the null year
+    #partition of the static exports (__HIVE_DEFAULT_PARTITION__) cannot be unified with the others
+    import pyarrow.dataset as ds
+
+    partitionSchema = pa.schema([schema().field(name) for name in partitionCols])
+    partitioning = ds.partitioning(partitionSchema, flavor = 'hive')
+
+    table = pq.read_table(os.path.expanduser(path), columns = columns, partitioning = partitioning,
+                          filters = filters if len(filters) > 0 else None)
+
+    if asPandas:
+        return table.to_pandas()
+
+    return table
+
+def folderSize(path):
+    """
+    Returns the total size (bytes) of the files in path and its subfolders
+    """
+    size = 0
+    for root, dirs, files in os.walk(os.path.expanduser(path)):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+def benchmark(folder, outDir, pattern = '*.csv', **readArgs):
+    """
+    Local benchmark: compares the size of the CSV exports in folder with the Parquet dataset in
+    outDir, and the time to load them with pandas.read_csv versus readParquet(outDir, **readArgs).
+
+    Returns a dictionary with 'csvBytes', 'parquetBytes', 'csvSeconds' and 'parquetSeconds'.
+    """
+    import pandas as pd
+
+    paths = [path for path, desc in consolidate.findExports(folder, pattern)[0]]
+
+    out = {}
+    out['csvBytes'] = sum([os.path.getsize(path) for path in paths])
+    out['parquetBytes'] = folderSize(outDir)
+
+    t0 = time.time()
+    for path in paths:
+        pd.read_csv(path)
+    out['csvSeconds'] = time.time() - t0
+
+    t0 = time.time()
+    readParquet(outDir, **readArgs)
+    out['parquetSeconds'] = time.time() - t0
+
+    return out
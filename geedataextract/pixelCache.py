@@ -0,0 +1,287 @@
+#####Pixel index cache for repeated extractions
+
+"""
+Persistent cache of the pixels each point/polygon falls in, per grid
+
+The same points are usually extracted for many products, and for every call the
+pixels of each feature are computed again. The cache stores, for each (points hash,
+grid definition), the per-feature pixel indices so that they are only computed once:
+
+    local backend - the zonalStats.PixelTable of the features (pixel rows, cols and
+        buffer weights) on a raster grid, saved as a .npz file. Points without buffer
+        are then sampled with a single array gather.
+
+    Earth Engine - the pixel of each point on the projection of an image at scalePix,
+        saved as a .json file. dedupePts() uses it to extract only one point per pixel
+        and copy its rows to the other points of the same pixel (dedupe = True).
+
+Entries are files named after the SHA-1 of their key in folder. The points hash of the
+local backend is computed from the features themselves; Earth Engine entries are keyed
+by the expression of the collection and expire after ttl, like collectionCache.
+
+Example:
+
+    from geedataextract import pixelCache
+
+    #forget every entry, e.g. after a shapefile was uploaded again
+    pixelCache.getCache().clear()
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from geedataextract import extractEngine
+
+#default folder of the cache files and time (seconds) after which an Earth Engine entry is fetched again
+cacheFolder = os.path.join(os.path.expanduser('~'), '.geedataextract', 'pixels')
+ttl = 7 * 86400
+
+def hashKey(key):
+    """
+    Returns the SHA-1 (hex) of a JSON-serializable key
+    """
+    return hashlib.sha1(json.dumps(key, sort_keys = True).encode('utf-8')).hexdigest()
+
+class PixelCache(object):
+    """
+    Cache of key -> pixel indices, in memory and in folder
+
+    Optional parameters
+
+    folder - folder the entries are stored in. If None, the cache is only kept in memory. Default: cacheFolder
+
+    ttl - number of seconds an Earth Engine entry is used before it is fetched again. Default: ttl (one week)
+    """
+
+    def __init__(self, folder = cacheFolder, ttl = ttl):
+        self.folder = folder
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.RLock()
+
+    def path(self, name, ext):
+        """
+        Returns the file of entry name, creating the folder if needed
+        """
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        return os.path.join(self.folder, name + ext)
+
+    def clear(self):
+        """
+        Removes every entry from the cache
+        """
+        with self.lock:
+            self.entries = {}
+
+            if self.folder is None or not os.path.exists(self.folder):
+                return
+
+            for name in os.listdir(self.folder):
+                if name.endswith('.npz') or name.endswith('.json'):
+                    os.remove(os.path.join(self.folder, name))
+
+    def getTable(self, key, build):
+        """
+        Returns the zonalStats.PixelTable of key, calling build() to compute it if it is not cached
+        """
+        import numpy as np
+
+        from geedataextract import zonalStats
+
+        name = hashKey(key)
+
+        with self.lock:
+            if name in self.entries:
+                return self.entries[name]
+
+            table = None
+            if self.folder is not None and os.path.exists(os.path.join(self.folder, name + '.npz')):
+                try:
+                    with np.load(os.path.join(self.folder, name + '.npz')) as data:
+                        table = zonalStats.PixelTable(data['indptr'], data['rows'], data['cols'],
+                                                      data['weights'], data['shape'])
+                except (IOError, ValueError, KeyError):
+                    #corrupt entry: build it again
+                    table = None
+
+            if table is None:
+                table = build()
+
+                if self.folder is not None:
+                    tmp = self.path(name, '.tmp.npz')
+                    np.savez(tmp, indptr = table.indptr, rows = table.rows, cols = table.cols,
+                             weights = table.weights, shape = np.array(table.shape))
+                    os.replace(tmp, self.path(name, '.npz'))
+
+            self.entries[name] = table
+            return table
+
+    def getKeys(self, key, fetch):
+        """
+        Returns the Earth Engine pixel keys of key ({'ids': [...], 'pixels': [...]}), calling
+        fetch() to request them if they are not cached or older than ttl
+        """
+        name = hashKey(key)
+
+        with self.lock:
+            entry = self.entries.get(name)
+
+            fileName = None if self.folder is None else os.path.join(self.folder, name + '.json')
+            if entry is None and fileName is not None and os.path.exists(fileName):
+                try:
+                    with open(fileName) as f:
+                        entry = json.load(f)
+                except ValueError:
+                    entry = None
+
+            if entry is None or time.time() - entry['time'] >= self.ttl:
+                entry = fetch()
+                entry['time'] = time.time()
+
+                if self.folder is not None:
+                    tmp = self.path(name, '.tmp')
+                    with open(tmp, 'w') as f:
+                        json.dump(entry, f)
+                    os.replace(tmp, self.path(name, '.json'))
+
+            self.entries[name] = entry
+            return entry
+
+#cache shared by all functions, created on first use
+sharedCache = [None]
+cacheLock = threading.Lock()
+
+def getCache():
+    """
+    Returns the cache shared by all functions
+    """
+    with cacheLock:
+        if sharedCache[0] is None:
+            sharedCache[0] = PixelCache()
+        return sharedCache[0]
+
+def setCache(cache):
+    """
+    Replaces the cache shared by all functions, e.g. to change its folder or ttl
+    """
+    with cacheLock:
+        sharedCache[0] = cache
+
+def featuresKey(pts1):
+    """
+    Returns the SHA-1 of a list of local features (see localBackend.loadPts)
+    """
+    return hashKey([[f['geeID'], f['type'], f['coordinates']] for f in pts1])
+
+def localTable(raster, pts1, buf, poly, subsamples = None, ptsKey = None):
+    """
+    Returns the zonalStats.PixelTable of the local features pts1 on the grid of raster, from the cache.
+    ptsKey is featuresKey(pts1), given by callers that look up several rasters for the same features.
+    """
+    from geedataextract import zonalStats
+
+    if subsamples is None:
+        subsamples = zonalStats.defaultSubsamples
+
+    key = {}
+    key['pts'] = ptsKey if ptsKey is not None else featuresKey(pts1)
+    key['grid'] = [list(raster.transform), list(raster.shape), bool(raster.geographic)]
+    key['buf'] = buf
+    key['poly'] = poly
+    key['subsamples'] = subsamples
+
+    return getCache().getTable(key, lambda: zonalStats.buildTable(raster, pts1, buf, poly, subsamples))
+
+#projections already requested in this session: expression -> projection info
+projection_d = {}
+
+def pixelKeys(pts1, image, scalePix):
+    """
+    Returns the geeIDs of the points of pts1 and their pixel ([x, y] coordinates of the pixel, or None
+    outside the image) on the projection of image at scalePix, from the cache. The projection
+    is requested once per session, the pixels once per ttl or when the shapefile asset is updated.
+    """
+    import ee
+
+    from geedataextract import resultCache
+
+    proj = image.projection().atScale(scalePix)
+
+    projKey = proj.serialize()
+    if projKey not in projection_d:
+        projection_d[projKey] = proj.getInfo()
+
+    graph = pts1.serialize()
+
+    key = {}
+    key['pts'] = hashKey(graph)
+    key['grid'] = projection_d[projKey]
+    #the expression of pts1 is only the asset path: a shapefile uploaded again with moved points
+    #has another version
+    assetIds = resultCache.tableIds(graph)
+    key['assets'] = dict([(assetId, resultCache.assetVersion(assetId)) for assetId in assetIds])
+
+    def fetch():
+        #the coordinates of a pixel are the same for every point inside it
+        coords = ee.Image.pixelCoordinates(proj)
+        sampled = coords.reduceRegions(collection = pts1, reducer = ee.Reducer.first(), crs = proj)
+
+        def pixel_m(feature):
+            return ee.Feature(None, {'p': ee.List([feature.get(extractEngine.ID_field),
+                                                   feature.get('x'), feature.get('y')])})
+
+        info = sampled.map(pixel_m).aggregate_array('p').getInfo()
+
+        entry = {}
+        entry['ids'] = [i[0] for i in info]
+        entry['pixels'] = [None if i[1] is None or i[2] is None else [i[1], i[2]] for i in info]
+        return entry
+
+    entry = getCache().getKeys(key, fetch)
+
+    return entry['ids'], entry['pixels']
+
+def sharedPixels(ids, pixels):
+    """
+    Returns the (geeID, representative geeID) of every point that shares its pixel with an earlier
+    point of ids. Points outside the image are not grouped.
+    """
+    first_d = {}
+    pairs = []
+    for i, pixel in zip(ids, pixels):
+        if pixel is None:
+            continue
+        pixel = tuple(pixel)
+        if pixel in first_d:
+            pairs.append((i, first_d[pixel]))
+        else:
+            first_d[pixel] = i
+
+    return pairs
+
+def dedupePts(pts1, image, scalePix):
+    """
+    Geometry preparation: removes from pts1 the points that fall in the same pixel of image at scalePix
+    as an earlier point. Returns the remaining points and a function that copies the rows of a table
+    reduced over them to the removed points (None if no point was removed).
+    """
+    import ee
+
+    ids, pixels = pixelKeys(pts1, image, scalePix)
+    pairs = sharedPixels(ids, pixels)
+
+    if len(pairs) == 0:
+        return pts1, None
+
+    ID_field = extractEngine.ID_field
+    pts = pts1.filter(ee.Filter.inList(ID_field, [i for i, rep in pairs]).Not())
+    pairFC = ee.FeatureCollection([ee.Feature(None, {ID_field: i, 'rep': rep}) for i, rep in pairs])
+
+    def fanOut(table):
+        return extractEngine.copyRows(table, pairFC)
+
+    return pts, fanOut
@@ -0,0 +1,246 @@
+#####Dataset registry of the GEE* functions
+
+"""
+What the GEE* functions know about each dataset, in one place
+
+Every dataset has one Dataset entry in dataset_d, built once when the module is
+imported: the Earth Engine collection, the band of each metric, the scale and offset
+converting a band to physical units, the default scalePix, the time between images,
+the QA band and bit rules of each QC option, and whether a metric is averaged or
+summed over each time step. The GEE* functions and extractEngine (qaMask,
+scaleCollection) build their graphs from these entries, so metrics without a scale
+(integer-native bands such as class maps, or bands already in physical units) are
+not converted at all.
+
+A new product only needs an entry; downloadData.GEEcollectionPts extracts any
+registered collection:
+
+    from geedataextract import registry, downloadData
+
+    registry.register(registry.Dataset('MODIS/006/MOD10A1', 'MOD10A1', 500, cadence = 'day',
+                                       scales = {'NDSI': (0.0001, 0)}))
+    downloadData.GEEcollectionPts('pts', 'MOD10A1', ['NDSI'], 'month', 2010, 2015, 0, 0, 'me', 'snow')
+"""
+
+class Dataset(object):
+    """
+    Registry entry of a dataset
+
+    Requires:
+
+    collection - Earth Engine id of the image collection (or the id of the image, or the prefix of the
+        ids of the images, for static datasets)
+
+    name - name of the dataset in export descriptions and in consolidate, without '_', e.g. 'MOD13Q1'
+
+    scalePix - default scale/spatial resolution (meters)
+
+    Optional parameters
+
+    cadence - time between images: 'day', '3-day', '4-day', '8-day', '16-day', 'month', 'year',
+        or None for static datasets. Default: None
+
+    bands - dictionary metric -> band (or pair of bands of a normalized difference). Metrics that are
+        not listed are bands of the same name. Default: None
+
+    scales - dictionary metric -> (scale, offset), the physical value being band * scale + offset.
+        Metrics that are not listed are not converted. Default: None
+
+    stats - dictionary metric -> 'sum' for metrics summed over each time step (e.g. precipitation);
+        other metrics are averaged. Default: None
+
+    qaBands - dictionary metric -> QA band, for QA rules without a band. Default: None
+
+    qa - dictionary QC option -> list of bit rules (band, startBit, endBit, comparison, value): a pixel is
+        kept if bits startBit to endBit of band (None: the QA band of the metric) compare with value
+        ('eq', 'neq', 'lt', 'gt'). Default: None
+    """
+
+    def __init__(self, collection, name, scalePix, cadence = None, bands = None, scales = None, stats = None,
+                 qaBands = None, qa = None):
+        self.collection = collection
+        self.name = name
+        self.scalePix = scalePix
+        self.cadence = cadence
+        self.bands = bands or {}
+        self.scales = scales or {}
+        self.stats = stats or {}
+        self.qaBands = qaBands or {}
+        self.qa = qa or {}
+
+    def band(self, metric):
+        """
+        Returns the band (or pair of bands) of metric
+        """
+        return self.bands.get(metric, metric)
+
+    def scale(self, metric):
+        """
+        Returns the (scale, offset) of metric, or None if its band is not converted
+        """
+        return self.scales.get(metric)
+
+    def stat(self, metric):
+        """
+        Returns how metric is combined within a time step: 'mean' or 'sum'
+        """
+        return self.stats.get(metric, 'mean')
+
+    def qaBand(self, metric):
+        """
+        Returns the QA band of metric, or None
+        """
+        return self.qaBands.get(metric)
+
+    def qaRules(self, QC, metric = None):
+        """
+        Returns the bit rules (band, startBit, endBit, comparison, value) of the QC option, with the
+        QA band of metric filled in, or [] for QC = 'None'
+        """
+        if QC == 'None' or QC is None:
+            return []
+        if QC not in self.qa:
+            raise ValueError('Unsupported QC option for ' + self.name + ': ' + str(QC))
+
+        return [(band or self.qaBand(metric), start, end, comparison, value)
+                for band, start, end, comparison, value in self.qa[QC]]
+
+    def __repr__(self):
+        return 'Dataset(' + repr(self.collection) + ', ' + repr(self.name) + ')'
+
+#registered datasets: name -> Dataset
+dataset_d = {}
+
+def register(dataset):
+    """
+    Adds (or replaces) a dataset in the registry
+    """
+    dataset_d[dataset.name] = dataset
+
+def get(name):
+    """
+    Returns the Dataset registered as name
+    """
+    if name not in dataset_d:
+        raise ValueError('Unknown dataset: ' + str(name))
+    return dataset_d[name]
+
+def metricDataset(metric, names):
+    """
+    Returns the first of the datasets names that has a band for metric
+    """
+    for name in names:
+        if metric in get(name).bands:
+            return get(name)
+    raise ValueError('Unknown metric: ' + str(metric))
+
+#NLCD images are USGS/NLCD/NLCD<year>
+register(Dataset('USGS/NLCD/NLCD', 'NLCD', 30, cadence = 'year',
+                 bands = {'tc': 'percent_tree_cover', 'ic': 'impervious', 'lc': 'landcover'}))
+
+#soil images are users/aschwantes/<band>, class maps (subordersUS, subgroupsWorld) are not converted
+soil_d = {}
+soil_d['soilDepth'] = 'BDTICM_M_250m'
+soil_d['bulkDensity'] = 'BLDFIE_I'
+soil_d['cec'] = 'CECSOL_I'
+soil_d['clay'] = 'CLYPPT_I'
+soil_d['cfrag'] = 'CRFVOL_I'
+soil_d['ph'] = 'PHIHOX_I'
+soil_d['silt'] = 'SLTPPT_I'
+soil_d['sand'] = 'SNDPPT_I'
+soil_d['oc'] = 'ORCDRC_I'
+soil_d['subordersUS'] = 'TAXOUSDA_250m'
+soil_d['subgroupsWorld'] = 'TAXNWRB_250m'
+
+soilScale_d = {}
+soilScale_d['soilDepth'] = (1, 0)
+soilScale_d['bulkDensity'] = (0.01, 0)
+soilScale_d['cec'] = (0.01, 0)
+soilScale_d['clay'] = (0.01, 0)
+soilScale_d['cfrag'] = (0.01, 0)
+soilScale_d['ph'] = (0.01, 0)
+soilScale_d['silt'] = (0.01, 0)
+soilScale_d['sand'] = (0.01, 0)
+soilScale_d['oc'] = (0.01, 0)
+
+register(Dataset('users/aschwantes/', 'soil', 250, bands = soil_d, scales = soilScale_d))
+
+register(Dataset('USGS/SRTMGL1_003', 'SRTM', 30))
+
+register(Dataset('IDAHO_EPSCOR/GRIDMET', 'GRIDMET', 4000, cadence = 'day',
+                 bands = {'tmax': 'tmmx', 'tmin': 'tmmn'},
+                 stats = {'pr': 'sum', 'eto': 'sum', 'etr': 'sum'}))
+
+register(Dataset('MODIS/MCD12Q2', 'MCD12Q2', 500, cadence = 'year',
+                 bands = {'GreenInc': 'Onset_Greenness_Increase1', 'GreenMax': 'Onset_Greenness_Maximum1',
+                          'GreenDec': 'Onset_Greenness_Decrease1', 'GreenMin': 'Onset_Greenness_Minimum1'}))
+
+#Landsat surface reflectance: normalized difference bands of each index, cloud (bit 3) and shadow (bit 5) mask
+landsatQA = {'clear': [('pixel_qa', 3, 3, 'eq', 0), ('pixel_qa', 5, 5, 'eq', 0)]}
+
+register(Dataset('LANDSAT/LT04/C01/T1_SR', 'L4', 30, cadence = '16-day', qa = landsatQA,
+                 bands = {'NDVI': ['B4', 'B3'], 'NDWI': ['B4', 'B5'], 'NBR': ['B4', 'B7']}))
+
+register(Dataset('LANDSAT/LT05/C01/T1_SR', 'L5', 30, cadence = '16-day', qa = landsatQA,
+                 bands = {'NDVI': ['B4', 'B3'], 'NDWI': ['B4', 'B5'], 'NBR': ['B4', 'B7']}))
+
+register(Dataset('LANDSAT/LE07/C01/T1_SR', 'L7', 30, cadence = '16-day', qa = landsatQA,
+                 bands = {'NDVI': ['B4', 'B3'], 'NDWI': ['B4', 'B5'], 'NBR': ['B4', 'B7']}))
+
+register(Dataset('LANDSAT/LC08/C01/T1_SR', 'L8', 30, cadence = '16-day', qa = landsatQA,
+                 bands = {'NDVI': ['B5', 'B4'], 'NDWI': ['B5', 'B6'], 'NBR': ['B5', 'B7']}))
+
+register(Dataset('MODIS/006/MCD15A3H', 'MCD15A3H', 500, cadence = '4-day',
+                 scales = {'Lai': (0.1, 0), 'Fpar': (0.01, 0)},
+                 qa = {'Op1': [('FparLai_QC', 0, 0, 'eq', 0), ('FparLai_QC', 3, 4, 'eq', 0),
+                               ('FparLai_QC', 5, 7, 'eq', 0), ('FparExtra_QC', 3, 3, 'eq', 0)],
+                       'Op2': [('FparLai_QC', 0, 0, 'eq', 0)],
+                       'Op3': [('FparLai_QC', 3, 4, 'eq', 0), ('FparLai_QC', 5, 7, 'lt', 2)]}))
+
+#land surface temperature (0.02 K -> Celsius) of the Terra (10:30, 22:30) and Aqua (13:30, 01:30) overpasses
+lstQA = {'Op1': [(None, 0, 1, 'eq', 0), (None, 2, 3, 'eq', 0), (None, 4, 5, 'lt', 2), (None, 6, 7, 'lt', 2)]}
+
+register(Dataset('MODIS/006/MOD11A2', 'MOD11A2', 1000, cadence = '8-day', qa = lstQA,
+                 bands = {'day1030': 'LST_Day_1km', 'night2230': 'LST_Night_1km'},
+                 scales = {'day1030': (0.02, -273.15), 'night2230': (0.02, -273.15)},
+                 qaBands = {'day1030': 'QC_Day', 'night2230': 'QC_Night'}))
+
+register(Dataset('MODIS/006/MYD11A2', 'MYD11A2', 1000, cadence = '8-day', qa = lstQA,
+                 bands = {'day1330': 'LST_Day_1km', 'night0130': 'LST_Night_1km'},
+                 scales = {'day1330': (0.02, -273.15), 'night0130': (0.02, -273.15)},
+                 qaBands = {'day1330': 'QC_Day', 'night0130': 'QC_Night'}))
+
+register(Dataset('MODIS/006/MOD13Q1', 'MOD13Q1', 250, cadence = '16-day',
+                 scales = {'NDVI': (0.0001, 0), 'EVI': (0.0001, 0)},
+                 qa = {'Op1': [('DetailedQA', 0, 1, 'lt', 2), ('DetailedQA', 2, 5, 'lt', 12),
+                               ('DetailedQA', 6, 7, 'neq', 3), ('DetailedQA', 6, 7, 'neq', 0),
+                               ('DetailedQA', 8, 8, 'eq', 0), ('DetailedQA', 10, 10, 'eq', 0),
+                               ('DetailedQA', 15, 15, 'eq', 0)],
+                       'Op2': [('DetailedQA', 0, 1, 'eq', 0)]}))
+
+register(Dataset('NASA_USDA/HSL/soil_moisture', 'SMOS', 25000, cadence = '3-day'))
+
+#pr, ro and swe are not scaled
+register(Dataset('IDAHO_EPSCOR/TERRACLIMATE', 'TERRACLIMATE', 4000, cadence = 'month',
+                 scales = {'aet': (0.1, 0), 'def': (0.1, 0), 'pdsi': (0.01, 0), 'pet': (0.1, 0),
+                           'soil': (0.1, 0), 'srad': (0.1, 0), 'tmmn': (0.1, 0), 'tmmx': (0.1, 0),
+                           'vap': (0.001, 0), 'vpd': (0.01, 0), 'vs': (0.01, 0)},
+                 stats = {'aet': 'sum', 'def': 'sum', 'pet': 'sum', 'pr': 'sum', 'ro': 'sum'}))
+
+#pr from kg/m^2/s to mm/day, tasmin and tasmax from Kelvin to Celsius
+register(Dataset('NASA/NEX-GDDP', 'NEX', 25000, cadence = 'day',
+                 scales = {'pr': (86400, 0), 'tasmin': (1, -273.15), 'tasmax': (1, -273.15)},
+                 stats = {'pr': 'sum'}))
+
+register(Dataset('TRMM/3B43V7', 'TRMM', 25000, cadence = 'month', bands = {'pr': 'precipitation'}))
+
+register(Dataset('OREGONSTATE/PRISM/AN81m', 'PRISM', 4000, cadence = 'month', stats = {'ppt': 'sum'}))
+
+register(Dataset('IDAHO_EPSCOR/MACAv2_METDATA_MONTHLY', 'MACA', 4000, cadence = 'month',
+                 stats = {'pr': 'sum'}))
+
+#ET and PET are 8-day sums (0.1 kg/m^2), divided by the number of days of each composite
+register(Dataset('MODIS/006/MOD16A2', 'MOD16A2', 1000, cadence = '8-day',
+                 scales = {'ET': (0.1, 0), 'PET': (0.1, 0)},
+                 qa = {'Op1': [('ET_QC', 0, 0, 'eq', 0), ('ET_QC', 2, 2, 'eq', 0), ('ET_QC', 3, 4, 'eq', 0),
+                               ('ET_QC', 5, 7, 'lt', 4)]}))
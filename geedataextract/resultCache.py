@@ -0,0 +1,370 @@
+#####Content-addressed cache of extraction results
+
+"""
+Local cache of exported tables, keyed by what was extracted rather than by the export name
+
+The same dataset, metric, time step, buffer, scale and shapefile are often requested
+again, by the same or by another analyst, and every request runs a full Earth Engine
+export. With a cache, each export is keyed by the SHA-1 of the expression of its table
+(which holds the dataset, metrics, time steps, buf, poly, scalePix and shapefile asset),
+its columns and the version of every shapefile asset it reads. The description and
+the Drive folder are not part of the key.
+
+An export that is not cached is started as usual and remembered as pending, with its
+task id. Once its task has completed and its CSV file is downloaded from Drive, collect()
+copies it into the cache. When the same
+table is requested again, no task is started: the GEE* function returns a CachedResult,
+which behaves like a completed task and gives the path of the cached CSV file.
+
+The cache holds at most maxBytes of tables; the least recently used tables are removed
+first.
+
+Example:
+
+    from geedataextract import downloadData, resultCache
+
+    cache = resultCache.ResultCache()
+    tasks = downloadData.GEEgridmetPtsAvg(..., cache = cache)
+
+    #after downloading the exports from Drive
+    cache.collect('gridmet')
+
+    #the same request now returns CachedResults, copied next to the downloaded exports
+    tasks = downloadData.GEEgridmetPtsAvg(..., cache = cache)
+    [t.copy('gridmet') for t in tasks]
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+#default folder of the cached tables and maximum size (bytes) of the cache
+cacheFolder = os.path.join(os.path.expanduser('~'), '.geedataextract', 'results')
+maxBytes = 2 * 2**30
+
+def hashKey(key):
+    """
+    Returns the SHA-1 (hex) of a JSON-serializable key
+    """
+    return hashlib.sha1(json.dumps(key, sort_keys = True).encode('utf-8')).hexdigest()
+
+def tableIds(graph):
+    """
+    Returns the sorted ids of the table assets loaded by a serialized Earth Engine expression
+    """
+    ids = set()
+
+    def walk(node):
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if k == 'tableId':
+                    if isinstance(v, dict):
+                        v = v.get('constantValue')
+                    if isinstance(v, str):
+                        ids.add(v)
+                        continue
+                walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                walk(v)
+
+    try:
+        walk(json.loads(graph))
+    except ValueError:
+        pass
+
+    return sorted(ids)
+
+#versions of the assets already requested in this session: asset id -> version
+asset_d = {}
+
+def assetVersion(assetId):
+    """
+    Returns the version of an asset (its update time), requested once per session
+    """
+    import ee
+
+    if assetId not in asset_d:
+        info = ee.data.getInfo(assetId) or {}
+        version = {}
+        for k in ['updateTime', 'version', 'sizeBytes']:
+            if k in info:
+                version[k] = info[k]
+        asset_d[assetId] = version
+
+    return asset_d[assetId]
+
+def tableKey(table, columns):
+    """
+    Returns the key of an exported table: the SHA-1 of its expression, its columns and the
+    version of the shapefile assets it reads
+    """
+    graph = table.serialize()
+
+    key = {}
+    key['table'] = graph
+    key['columns'] = columns
+    key['assets'] = dict([(assetId, assetVersion(assetId)) for assetId in tableIds(graph)])
+
+    return hashKey(key)
+
+class CachedResult(object):
+    """
+    Completed export read from the cache, returned by the GEE* functions in place of its task
+
+    description - export description of the request
+
+    path - the cached CSV file
+
+    state - always 'COMPLETED'
+    """
+
+    def __init__(self, description, path):
+        self.description = description
+        self.path = path
+        self.state = 'COMPLETED'
+        self.task = None
+        self.id = None
+
+    def done(self):
+        return True
+
+    def status(self):
+        """
+        Returns the status of the export, like ee.batch.Task.status()
+        """
+        status = {}
+        status['state'] = self.state
+        status['description'] = self.description
+        return status
+
+    def copy(self, folder):
+        """
+        Copies the cached table to folder as description.csv, e.g. next to the tables downloaded
+        from Drive before consolidating them. Returns the path of the copy.
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        path = os.path.join(folder, self.description + '.csv')
+        shutil.copyfile(self.path, path)
+        return path
+
+    def __repr__(self):
+        return 'CachedResult(' + repr(self.description) + ', path=' + repr(self.path) + ')'
+
+class ResultCache(object):
+    """
+    Cache of table key -> exported CSV file, stored in folder with an index.json
+
+    Optional parameters
+
+    folder - folder the tables are stored in. Default: cacheFolder
+
+    maxBytes - maximum total size of the cached tables. The least recently used tables are removed
+        when it is exceeded. Default: maxBytes (2 GB)
+    """
+
+    def __init__(self, folder = cacheFolder, maxBytes = maxBytes):
+        self.folder = folder
+        self.maxBytes = maxBytes
+        self.entries = {}
+        self.pending = {}
+        self.lock = threading.RLock()
+        self.load()
+
+    def indexFile(self):
+        return os.path.join(self.folder, 'index.json')
+
+    def path(self, key):
+        """
+        Returns the file of the table key
+        """
+        return os.path.join(self.folder, key + '.csv')
+
+    def load(self):
+        """
+        Reads the index of the cache, if it exists
+        """
+        self.entries = {}
+        self.pending = {}
+
+        if not os.path.exists(self.indexFile()):
+            return
+
+        try:
+            with open(self.indexFile()) as f:
+                index = json.load(f)
+        except ValueError:
+            #corrupt index: start again
+            return
+
+        #tables removed by hand are forgotten
+        self.entries = dict([(k, e) for k, e in index.get('entries', {}).items()
+                             if os.path.exists(self.path(k))])
+
+        #pending exports of older indexes (key -> description) have no task and are never collected
+        self.pending = dict([(k, p if isinstance(p, dict) else {'description': p, 'time': 0, 'taskId': None})
+                             for k, p in index.get('pending', {}).items()])
+
+    def save(self):
+        """
+        Writes the index of the cache
+        """
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        index = {}
+        index['entries'] = self.entries
+        index['pending'] = self.pending
+
+        tmp = self.indexFile() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent = 1, sort_keys = True)
+        os.replace(tmp, self.indexFile())
+
+    def clear(self):
+        """
+        Removes every table and pending export from the cache
+        """
+        with self.lock:
+            for key in list(self.entries.keys()):
+                self.remove(key)
+            self.pending = {}
+            self.save()
+
+    def remove(self, key):
+        """
+        Removes the table key from the cache
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+            if os.path.exists(self.path(key)):
+                os.remove(self.path(key))
+
+    def size(self):
+        """
+        Returns the total size (bytes) of the cached tables
+        """
+        with self.lock:
+            return sum([e['size'] for e in self.entries.values()])
+
+    def evict(self, keep = None):
+        """
+        Removes the least recently used tables, except keep, until the cache holds at most maxBytes
+        """
+        with self.lock:
+            total = self.size()
+            for key in sorted(self.entries, key = lambda k: self.entries[k]['used']):
+                if total <= self.maxBytes:
+                    break
+                if key == keep:
+                    continue
+                total -= self.entries[key]['size']
+                self.remove(key)
+
+    def get(self, key, description):
+        """
+        Returns a CachedResult for the table key, or None if it is not cached
+        """
+        with self.lock:
+            if key not in self.entries:
+                return None
+
+            self.entries[key]['used'] = time.time()
+            self.save()
+
+            return CachedResult(description, self.path(key))
+
+    def put(self, key, fileName, description = None):
+        """
+        Copies the CSV file fileName into the cache as the table key. Returns its path in the cache.
+        """
+        with self.lock:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+
+            tmp = self.path(key) + '.tmp'
+            shutil.copyfile(fileName, tmp)
+            os.replace(tmp, self.path(key))
+
+            entry = {}
+            entry['description'] = description
+            entry['size'] = os.path.getsize(self.path(key))
+            entry['used'] = time.time()
+            self.entries[key] = entry
+            self.pending.pop(key, None)
+
+            self.evict(keep = key)
+            self.save()
+
+            return self.path(key)
+
+    def expect(self, key, description):
+        """
+        Remembers that the table key is being exported as description, until collect() finds it
+        """
+        with self.lock:
+            pending = {}
+            pending['description'] = description
+            pending['time'] = time.time()
+            pending['taskId'] = None
+            self.pending[key] = pending
+            self.save()
+
+    def started(self, key, taskId):
+        """
+        Records the id of the task exporting the pending table key
+        """
+        with self.lock:
+            if key in self.pending and self.pending[key]['taskId'] != taskId:
+                self.pending[key]['taskId'] = taskId
+                self.save()
+
+    def downloads(self, folder, description, since):
+        """
+        Returns the files of folder named description.csv, or 'description (1).csv', ... as Drive
+        names duplicates, modified after since, the newest first
+        """
+        if not os.path.isdir(folder):
+            return []
+
+        pattern = re.compile('^' + re.escape(description) + r'( \(\d+\))?\.csv$')
+        paths = [os.path.join(folder, name) for name in os.listdir(folder) if pattern.match(name)]
+        paths = [path for path in paths if os.path.getmtime(path) > since]
+
+        return sorted(paths, key = os.path.getmtime, reverse = True)
+
+    def collect(self, folder):
+        """
+        Copies into the cache the pending exports downloaded to folder, once their task has
+        COMPLETED. Only files modified after the export was started are taken (description.csv or a
+        Drive duplicate such as 'description (1).csv', the newest one if there are several), so that
+        the table of an earlier export with the same name is never cached under this key.
+        Returns the number of tables added.
+        """
+        import ee
+
+        with self.lock:
+            found = []
+            for key, pending in list(self.pending.items()):
+                paths = self.downloads(folder, pending['description'], pending['time'])
+                if pending['taskId'] is not None and len(paths) > 0:
+                    found.append((key, pending, paths[0]))
+
+            if len(found) == 0:
+                return 0
+
+            statusL = ee.data.getTaskStatus([pending['taskId'] for key, pending, path in found])
+
+            added = 0
+            for (key, pending, path), status in zip(found, statusL):
+                if status.get('state') == 'COMPLETED':
+                    self.put(key, path, pending['description'])
+                    added += 1
+
+            return added
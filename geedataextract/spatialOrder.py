@@ -0,0 +1,197 @@
+#####Spatially coherent ordering of points/polygons for chunked exports
+
+"""
+Orders the features of a shapefile along a space-filling curve so that each
+export chunk (see chunkSize in the GEE* functions) covers a compact area
+
+Chunks made of consecutive geeID values are usually spread over the whole
+study area, so every task reads image tiles everywhere. Ordering features by
+the Hilbert curve or geohash of their centroid keeps neighbouring features in
+the same chunk, and each task touches far fewer tiles.
+
+Example:
+
+    downloadData.GEEgridmetPtsAvg(..., chunkSize = 5000, chunkOrder = 'hilbert')
+
+benchmarkTiles() compares the number of tiles touched per chunk for a synthetic
+set of points.
+"""
+
+import math
+import random
+
+from geedataextract import extractEngine
+
+#number of bits per axis of the Hilbert curve (a 2^16 x 2^16 grid, ~600 m cells at the equator)
+hilbertOrder = 16
+
+#number of characters of the geohash (~150 m cells)
+geohashPrecision = 7
+
+geohashChars = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def hilbertKey(lon, lat, order = hilbertOrder):
+    """
+    Returns the position of (lon, lat) along a Hilbert curve over a 2^order x 2^order grid
+    """
+    n = 2 ** order
+    x = min(n - 1, int((lon + 180.0) / 360.0 * n))
+    y = min(n - 1, int((lat + 90.0) / 180.0 * n))
+
+    d = 0
+    s = n // 2
+    while s > 0:
+        rx = 1 if (x & s) > 0 else 0
+        ry = 1 if (y & s) > 0 else 0
+        d += s * s * ((3 * rx) ^ ry)
+
+        #rotate the quadrant
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+
+        s //= 2
+
+    return d
+
+def geohashKey(lon, lat, precision = geohashPrecision):
+    """
+    Returns the geohash of (lon, lat) with precision characters
+    """
+    lonR = [-180.0, 180.0]
+    latR = [-90.0, 90.0]
+
+    code = ''
+    bits = 0
+    nBits = 0
+    even = True
+    while len(code) < precision:
+        rangeL = lonR if even else latR
+        value = lon if even else lat
+
+        mid = (rangeL[0] + rangeL[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            rangeL[0] = mid
+        else:
+            bits = bits * 2
+            rangeL[1] = mid
+
+        even = not even
+        nBits += 1
+        if nBits == 5:
+            code += geohashChars[bits]
+            bits = 0
+            nBits = 0
+
+    return code
+
+key_d = {}
+key_d['hilbert'] = hilbertKey
+key_d['geohash'] = geohashKey
+
+def orderIds(ids, coords, order = 'hilbert'):
+    """
+    Returns ids sorted along the space-filling curve order ('hilbert' or 'geohash'),
+    given the [lon, lat] centroid of each feature in coords
+    """
+    if order not in key_d:
+        raise ValueError("chunkOrder must be 'geeID', 'hilbert' or 'geohash'")
+
+    keyF = key_d[order]
+    keys = [keyF(c[0], c[1]) for c in coords]
+
+    return [i for k, i in sorted(zip(keys, ids), key = lambda kv: kv[0])]
+
+def splitIds(orderedIds, chunkSize, nSteps = 1):
+    """
+    Splits orderedIds into lists of at most chunkSize IDs, following extractEngine.planChunks
+    """
+    plan = extractEngine.planChunks(len(orderedIds), chunkSize, nSteps)
+
+    return [orderedIds[offset:offset + count] for offset, count in plan]
+
+#serialized collection -> (ID values, centroids), see extractEngine.memoized
+centroidsMemo = {}
+
+def centroids(pts1):
+    """
+    Returns the lists of ID_field values and [lon, lat] centroids of pts1 (one getInfo request)
+    """
+    import ee
+
+    def fetch():
+        def centroid_m(feature):
+            return ee.Feature(None, {'c': feature.geometry().centroid(1).coordinates()})
+
+        info = ee.List([pts1.aggregate_array(extractEngine.ID_field),
+                        pts1.map(centroid_m).aggregate_array('c')]).getInfo()
+
+        return (info[0], info[1])
+
+    return extractEngine.memoized(centroidsMemo, pts1, fetch)
+
+def spatialChunks(pts1, chunkSize, nSteps = 1, order = 'hilbert'):
+    """
+    Geometry preparation: partitions pts1 into chunks of neighbouring features along the
+    space-filling curve order. Returns a list of (tag, collection) tuples like extractEngine.chunkPts.
+    """
+    import ee
+
+    ids, coords = centroids(pts1)
+    idL = splitIds(orderIds(ids, coords, order), chunkSize, nSteps)
+
+    if len(idL) == 1:
+        return [('', pts1)]
+
+    return [('_c' + str(n), pts1.filter(ee.Filter.inList(extractEngine.ID_field, idsC)))
+            for n, idsC in enumerate(idL)]
+
+def tileXY(lon, lat, zoom):
+    """
+    Returns the web mercator tile (x, y) containing (lon, lat) at zoom level zoom
+    """
+    n = 2 ** zoom
+    lat = max(-85.0511, min(85.0511, lat))
+    latR = math.radians(lat)
+
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.log(math.tan(latR) + 1.0 / math.cos(latR)) / math.pi) / 2.0 * n)
+
+    return min(n - 1, x), min(n - 1, y)
+
+def tileTouches(coordsL, zoom = 8):
+    """
+    Returns the number of distinct tiles at zoom level zoom touched by each list of [lon, lat] in coordsL
+    """
+    return [len(set([tileXY(c[0], c[1], zoom) for c in coords])) for coords in coordsL]
+
+def benchmarkTiles(nPoints = 20000, chunkSize = 1000, zoom = 8, seed = 0,
+                   bbox = [-125.0, 25.0, -67.0, 49.0]):
+    """
+    Local benchmark: mean number of tiles touched per chunk for nPoints random points in
+    bbox [west, south, east, north] with geeID assigned in random order, for chunks made
+    of consecutive geeID values and for chunks ordered by 'hilbert' and 'geohash'.
+
+    Returns a dictionary of chunk order -> mean tiles per chunk.
+    """
+    rng = random.Random(seed)
+
+    coords = [[rng.uniform(bbox[0], bbox[2]), rng.uniform(bbox[1], bbox[3])] for i in range(nPoints)]
+    coord_d = dict(zip(range(nPoints), coords))
+
+    ids = list(range(nPoints))
+    order_d = {}
+    order_d['geeID'] = ids
+    order_d['hilbert'] = orderIds(ids, coords, 'hilbert')
+    order_d['geohash'] = orderIds(ids, coords, 'geohash')
+
+    out = {}
+    for order in order_d:
+        touches = tileTouches([[coord_d[i] for i in idsC]
+                               for idsC in splitIds(order_d[order], chunkSize)], zoom)
+        out[order] = float(sum(touches)) / len(touches)
+
+    return out
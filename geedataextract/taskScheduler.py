@@ -0,0 +1,258 @@
+#####Batch export task scheduler for the GEE* functions
+
+"""
+Scheduler that throttles, polls and retries Earth Engine export tasks
+
+Without a scheduler every GEE* function starts its export tasks immediately.
+A call that creates hundreds of tasks (e.g. GEEnasaNEXGDDP with many models
+and scenarios) then hits the limit of concurrent tasks per user. With a
+scheduler, tasks are queued and started once fewer than maxRunning are running.
+The scheduler has no thread of its own: queued tasks are only started, and
+failed ones restarted, when poll() or wait() is called (aio.waitTasks polls it
+from an event loop).
+
+Example:
+
+    from geedataextract import downloadData, taskScheduler
+
+    scheduler = taskScheduler.TaskScheduler(maxRunning = 10)
+    downloadData.GEEnasaNEXGDDP(..., scheduler = scheduler)
+    scheduler.wait()
+    print(scheduler.states())
+"""
+
+import threading
+import time
+
+#task states reported by ee.batch.Task.status()
+activeStates = ['READY', 'RUNNING', 'CANCEL_REQUESTED']
+doneStates = ['COMPLETED', 'FAILED', 'CANCELLED']
+
+#error messages of failed tasks that are worth retrying
+transientErrors = ['internal error', 'backend error', 'service unavailable', 'deadline exceeded',
+                   'try again', 'too many', 'quota']
+
+def isTransient(message):
+    """
+    Returns True if the error message of a failed task describes a transient failure
+    """
+    if message is None:
+        return False
+
+    message = str(message).lower()
+
+    return any([(err in message) for err in transientErrors])
+
+class TaskHandle(object):
+    """
+    Handle to one export task submitted to a TaskScheduler
+
+    description - export description of the task
+
+    state - 'QUEUED' until the task is started, then the state reported by Earth Engine
+        ('READY', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED')
+
+    task - the started ee.batch.Task, None while queued
+
+    attempts - number of times the task was started
+
+    startErrors - number of start() calls that raised an exception
+
+    error - last error message, if any
+
+    callback - function called with the handle every time its state changes, or None
+    """
+
+    def __init__(self, description, makeTask, callback = None):
+        self.description = description
+        self.makeTask = makeTask
+        self.callback = callback
+        self.task = None
+        self.state = 'QUEUED'
+        self.attempts = 0
+        self.startErrors = 0
+        self.error = None
+
+    def setState(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        if self.callback is not None:
+            self.callback(self)
+
+    @property
+    def id(self):
+        if self.task is None:
+            return None
+        return self.task.id
+
+    def done(self):
+        return self.state in doneStates
+
+    def __repr__(self):
+        return 'TaskHandle(' + repr(self.description) + ', state=' + repr(self.state) + ')'
+
+class TaskScheduler(object):
+    """
+    Queues export tasks and starts them so that at most maxRunning are running at once
+
+    Optional parameters
+
+    maxRunning - maximum number of tasks in the READY or RUNNING state. Default: 10
+
+    pollInterval - initial number of seconds between status polls. Default: 10
+
+    maxInterval - maximum number of seconds between status polls. Default: 300
+
+    backoff - factor applied to the poll interval when no task changed state. Default: 2
+
+    retries - number of times a task that failed with a transient error is restarted, and number of
+        times a start() that raised a transient error is tried again. Default: 2
+
+    Tasks beyond maxRunning are started by poll() and wait(), not in the background.
+    """
+
+    def __init__(self, maxRunning = 10, pollInterval = 10, maxInterval = 300, backoff = 2, retries = 2):
+        self.maxRunning = maxRunning
+        self.pollInterval = pollInterval
+        self.maxInterval = maxInterval
+        self.backoff = backoff
+        self.retries = retries
+        self.handles = []
+        self.lock = threading.RLock()
+
+    def submit(self, description, makeTask, callback = None):
+        """
+        Queues a task and starts it if fewer than maxRunning tasks are running.
+
+        makeTask - function without arguments that returns a new (unstarted) ee.batch.Task.
+            It is called again to restart a task after a transient failure.
+
+        callback - function called with the TaskHandle every time its state changes. Default: None
+
+        Returns the TaskHandle of the task.
+        """
+        handle = TaskHandle(description, makeTask, callback)
+
+        with self.lock:
+            self.handles.append(handle)
+            self.startQueued()
+
+        return handle
+
+    def running(self):
+        """
+        Returns the handles of tasks that are started but not done
+        """
+        with self.lock:
+            return [h for h in self.handles if h.state in activeStates]
+
+    def startQueued(self):
+        """
+        Starts queued tasks until maxRunning tasks are running. A task whose start() raises is
+        left queued and tried again at the next poll, up to retries times for transient errors;
+        then, or at once for other errors, it is marked FAILED.
+        """
+        with self.lock:
+            nRunning = len(self.running())
+
+            for handle in self.handles:
+                if nRunning >= self.maxRunning:
+                    break
+                if handle.state != 'QUEUED':
+                    continue
+
+                try:
+                    task = handle.makeTask()
+                    task.start()
+                except Exception as e:
+                    #too many tasks or a network error: leave queued and try again at the next poll
+                    handle.error = str(e)
+                    handle.startErrors += 1
+                    if not isTransient(e) or handle.startErrors > self.retries:
+                        handle.setState('FAILED')
+                    continue
+
+                handle.task = task
+                handle.attempts += 1
+                handle.setState('READY')
+                nRunning += 1
+
+    def poll(self):
+        """
+        Updates the state of every running task, restarts transient failures and
+        starts queued tasks. Returns True if any task changed state.
+        """
+        changed = False
+
+        with self.lock:
+            for handle in self.running():
+                try:
+                    status = handle.task.status()
+                except Exception as e:
+                    handle.error = str(e)
+                    continue
+
+                state = status.get('state', handle.state)
+                if state == handle.state:
+                    continue
+
+                changed = True
+
+                if state == 'FAILED':
+                    handle.error = status.get('error_message')
+                    if isTransient(handle.error) and handle.attempts <= self.retries:
+                        state = 'QUEUED'
+
+                handle.setState(state)
+
+            nQueued = len([h for h in self.handles if h.state == 'QUEUED'])
+            self.startQueued()
+
+            if nQueued != len([h for h in self.handles if h.state == 'QUEUED']):
+                changed = True
+
+        return changed
+
+    def done(self):
+        """
+        Returns True when every submitted task is COMPLETED, FAILED or CANCELLED
+        """
+        with self.lock:
+            return all([h.done() for h in self.handles])
+
+    def wait(self, timeout = None):
+        """
+        Polls until every task is done, waiting pollInterval seconds between polls and
+        multiplying the interval by backoff (up to maxInterval) while nothing changes.
+
+        Optional parameters
+
+        timeout - maximum number of seconds to wait. Default: None (no limit)
+
+        Returns the dictionary of task states (see states()).
+        """
+        start = time.time()
+        interval = self.pollInterval
+
+        while not self.done():
+            if self.poll():
+                interval = self.pollInterval
+            else:
+                interval = min(interval * self.backoff, self.maxInterval)
+
+            if self.done():
+                break
+            if timeout is not None and time.time() - start + interval > timeout:
+                break
+
+            time.sleep(interval)
+
+        return self.states()
+
+    def states(self):
+        """
+        Returns a dictionary of export description -> state
+        """
+        with self.lock:
+            return dict([(h.description, h.state) for h in self.handles])
@@ -0,0 +1,481 @@
+#####Vectorized zonal statistics for the local backend
+
+"""
+Reduces raster stacks over points, buffers and polygons with NumPy array operations
+
+Each geometry is rasterized once into a sparse pixel table (CSR layout: for feature n,
+the entries indptr[n]:indptr[n+1] hold the rows, cols and weights of its pixels). The
+values of all pixels used by any feature are then read once per block of time steps,
+gathered into a (time, entries) matrix and reduced per feature with np.add.reduceat,
+so every time step and every feature is reduced in the same operation.
+
+Reducers follow the ee.Reducer semantics used by the package, with pixel weights:
+
+    mean - sum(weight * value) / sum(weight) over the pixels with data
+    sum - sum(weight * value)
+    mode - value with the largest total weight (the smallest value for ties)
+    frequencyHistogram - dictionary of value -> total weight
+
+Missing pixels (NaN) are ignored, and features without any valid pixel give NaN (None
+for frequencyHistogram). Time steps are streamed in blocks sized so the matrices fit in
+memoryBudget bytes, so the memory use does not depend on the length of the time-series
+(defaultMemoryBudget, 256 MB, unless memoryBudget is given). The composites of aggregated
+stacks (localBackend.aggregateTime) are computed from at most as many source images at a
+time as there are time steps in a block, whatever the number of images per composite.
+
+Rasters are the localBackend.Raster objects (or anything with the same shape, transform,
+nTimes, window, centres, cellSize, index and values(rows, cols, times, maxImages) methods).
+"""
+
+#bytes of working memory used per block of time steps
+defaultMemoryBudget = 256 * 2 ** 20
+
+#largest number of classes counted one at a time by the mode and frequencyHistogram reducers
+#(more distinct values are counted by sorting)
+maxClasses = 256
+
+#each pixel is split into subsamples x subsamples points to compute the fraction covered by
+#a buffer or polygon. 1: a pixel belongs to the geometry if its centre is inside it (weight 1)
+defaultSubsamples = 1
+
+def insideRing(x, y, ring):
+    """
+    Returns a boolean array: True where (x, y) is inside the ring (even-odd rule)
+    """
+    import numpy as np
+
+    inside = np.zeros(x.shape, dtype = bool)
+    n = len(ring)
+    for i in range(n):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[i-1][0], ring[i-1][1]
+        if yi == yj:
+            continue
+        crosses = (yi > y) != (yj > y)
+        xCross = (xj - xi) * (y - yi) / (yj - yi) + xi
+        inside ^= crosses & (x < xCross)
+
+    return inside
+
+def polygonsOf(feature):
+    """
+    Returns the list of polygons (lists of rings) of a Polygon or MultiPolygon feature
+    """
+    if feature['type'] == 'Polygon':
+        return [feature['coordinates']]
+    if feature['type'] == 'MultiPolygon':
+        return feature['coordinates']
+    raise ValueError('Unsupported geometry type: ' + str(feature['type']))
+
+def bufferRadius(raster, feature, buf):
+    """
+    Returns the radii of the buffer of a point in raster coordinates (x, y)
+    """
+    y = feature['coordinates'][1]
+    wx, wy = raster.cellSize(y)
+    return buf * abs(raster.transform[1]) / wx, buf * abs(raster.transform[3]) / wy
+
+def featureBounds(raster, feature, buf):
+    """
+    Returns the bounding box (xmin, ymin, xmax, ymax) of a buffered point or polygon
+    """
+    if feature['type'] == 'Point':
+        x, y = feature['coordinates'][0], feature['coordinates'][1]
+        rx, ry = bufferRadius(raster, feature, buf)
+        return x - rx, y - ry, x + rx, y + ry
+
+    xs = [p[0] for polygon in polygonsOf(feature) for p in polygon[0]]
+    ys = [p[1] for polygon in polygonsOf(feature) for p in polygon[0]]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def insideFeature(raster, feature, buf, x, y):
+    """
+    Returns a boolean array: True where (x, y) is inside the buffered point or polygon
+    """
+    if feature['type'] == 'Point':
+        px, py = feature['coordinates'][0], feature['coordinates'][1]
+        rx, ry = bufferRadius(raster, feature, buf)
+        return ((x - px) / rx) ** 2 + ((y - py) / ry) ** 2 <= 1.0
+
+    inside = None
+    for polygon in polygonsOf(feature):
+        keep = insideRing(x, y, polygon[0])
+        for hole in polygon[1:]:
+            keep &= ~insideRing(x, y, hole)
+        inside = keep if inside is None else (inside | keep)
+
+    return inside
+
+def featurePixels(raster, feature, buf, poly, subsamples = None):
+    """
+    Geometry preparation: returns the rows, cols and weights (numpy arrays) of the pixels of
+    feature. A point without buffer gives the pixel that contains it; a buffered point or a
+    polygon gives every pixel covered by it, weighted by the fraction of its subsamples inside.
+    A buffer smaller than a pixel gives the pixel that contains the point.
+    """
+    import numpy as np
+
+    if subsamples is None:
+        subsamples = defaultSubsamples
+
+    if feature['type'] == 'Point' and buf <= 0:
+        idx = raster.index(feature['coordinates'][0], feature['coordinates'][1])
+        if idx is None:
+            return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+        return np.array([idx[0]]), np.array([idx[1]]), np.ones(1)
+
+    xmin, ymin, xmax, ymax = featureBounds(raster, feature, buf)
+
+    #pixels whose centre is within half a pixel of the bounding box may be partly covered
+    hx = abs(raster.transform[1]) / 2.0 if subsamples > 1 else 0.0
+    hy = abs(raster.transform[3]) / 2.0 if subsamples > 1 else 0.0
+    rows, cols = raster.window(xmin - hx, ymin - hy, xmax + hx, ymax + hy)
+
+    cx, cy = raster.centres(rows, cols)
+    if subsamples > 1:
+        offsets = (np.arange(subsamples) + 0.5) / subsamples - 0.5
+        ox, oy = np.meshgrid(offsets * raster.transform[1], offsets * raster.transform[3])
+        inside = insideFeature(raster, feature, buf, cx[:, None] + ox.ravel()[None, :],
+                               cy[:, None] + oy.ravel()[None, :])
+        weights = inside.mean(axis = 1)
+    else:
+        weights = insideFeature(raster, feature, buf, cx, cy).astype(float)
+
+    keep = weights > 0
+    if feature['type'] == 'Point' and not keep.any():
+        return featurePixels(raster, feature, 0, poly)
+
+    return rows[keep], cols[keep], weights[keep]
+
+class PixelTable(object):
+    """
+    Sparse table of the pixels of each feature (CSR layout)
+
+    indptr - array (nFeatures + 1,): the pixels of feature n are the entries indptr[n]:indptr[n+1]
+
+    rows, cols, weights - arrays (nEntries,)
+
+    shape - (rows, cols) of the raster grid
+
+    """
+
+    def __init__(self, indptr, rows, cols, weights, shape):
+        self.indptr = indptr
+        self.rows = rows
+        self.cols = cols
+        self.weights = weights
+        self.shape = tuple(shape)
+        self.uniqueL = None
+        self.unitL = None
+        self.singleL = None
+        self.weightL = None
+
+    @property
+    def nFeatures(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nEntries(self):
+        return len(self.rows)
+
+    def unique(self):
+        """
+        Returns the rows and cols of the distinct pixels of the table (sorted in storage order),
+        and the index of the pixel of each entry
+        """
+        import numpy as np
+
+        if self.uniqueL is None:
+            flat = self.rows.astype(np.int64) * self.shape[1] + self.cols
+            uFlat, inverse = np.unique(flat, return_inverse = True)
+            self.uniqueL = (uFlat // self.shape[1], uFlat % self.shape[1], inverse.ravel())
+
+        return self.uniqueL
+
+    def unitWeights(self):
+        """
+        Returns True if every entry has weight 1
+        """
+        if self.unitL is None:
+            self.unitL = bool((self.weights == 1).all())
+        return self.unitL
+
+    def singlePixel(self):
+        """
+        Returns True if every feature has exactly one pixel, with weight 1
+        """
+        import numpy as np
+
+        if self.singleL is None:
+            self.singleL = bool((np.diff(self.indptr) == 1).all()) and self.unitWeights()
+        return self.singleL
+
+    def featureWeights(self):
+        """
+        Returns the total weight of the pixels of each feature
+        """
+        if self.weightL is None:
+            self.weightL = segmentSums(self.weights[None, :], self.indptr)[0]
+        return self.weightL
+
+    def featureOf(self):
+        """
+        Returns the feature number of each entry
+        """
+        import numpy as np
+
+        return np.repeat(np.arange(self.nFeatures), np.diff(self.indptr))
+
+def buildTable(raster, pts1, buf, poly, subsamples = None):
+    """
+    Rasterizes every feature of pts1 on the grid of raster. Returns a PixelTable.
+    """
+    import numpy as np
+
+    rowL = []
+    colL = []
+    weightL = []
+    counts = np.zeros(len(pts1), dtype = np.int64)
+
+    for n, feature in enumerate(pts1):
+        rows, cols, weights = featurePixels(raster, feature, buf, poly, subsamples)
+        rowL.append(rows)
+        colL.append(cols)
+        weightL.append(weights)
+        counts[n] = len(rows)
+
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    if len(rowL) == 0:
+        return PixelTable(indptr, np.zeros(0, int), np.zeros(0, int), np.zeros(0), raster.shape)
+
+    return PixelTable(indptr, np.concatenate(rowL).astype(np.int64), np.concatenate(colL).astype(np.int64),
+                      np.concatenate(weightL), raster.shape)
+
+def segmentSums(values, indptr):
+    """
+    Returns the sums of values (time, entries) over the entries of each feature: (time, features)
+    """
+    import numpy as np
+
+    out = np.zeros((values.shape[0], len(indptr) - 1))
+
+    starts = indptr[:-1]
+    nonEmpty = indptr[1:] > starts
+    if values.shape[1] > 0 and nonEmpty.any():
+        #entries of empty features are empty ranges, so the sums of the others are not affected
+        out[:, nonEmpty] = np.add.reduceat(values, starts[nonEmpty], axis = 1)
+
+    return out
+
+def classValues(values, valid):
+    """
+    Returns the possible values of a block of class codes (integers within maxClasses of each
+    other), or None for other data
+    """
+    import numpy as np
+
+    if not valid.any():
+        return None
+
+    if not valid.all():
+        values = values[valid]
+
+    vmin = values.min()
+    vmax = values.max()
+    if vmax - vmin >= maxClasses or (np.floor(values) != values).any():
+        return None
+
+    return np.arange(vmin, vmax + 1)
+
+def countValues(values, table):
+    """
+    Returns the distinct values, and for every (time, feature, value) with data, its flat
+    (time * nFeatures + feature) index, the index of its value and its total weight
+    """
+    import numpy as np
+
+    valid = ~np.isnan(values)
+
+    classes = classValues(values, valid)
+    if classes is not None:
+        #class codes: one weighted count per class, with the same segment sums as the mean
+        groupL = []
+        vIdxL = []
+        weightL = []
+        for k, value in enumerate(classes):
+            counts = segmentSums(np.where(values == value, table.weights, 0), table.indptr).ravel()
+            nonZero = np.flatnonzero(counts)
+            groupL.append(nonZero)
+            vIdxL.append(np.full(len(nonZero), k, dtype = np.int64))
+            weightL.append(counts[nonZero])
+
+        return classes, np.concatenate(groupL), np.concatenate(vIdxL), np.concatenate(weightL)
+
+    tIdx, eIdx = np.nonzero(valid)
+    if len(tIdx) == 0:
+        return np.zeros(0), np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+
+    uValues, vIdx = np.unique(values[tIdx, eIdx], return_inverse = True)
+    nValues = len(uValues)
+
+    groups = tIdx.astype(np.int64) * table.nFeatures + table.featureOf()[eIdx]
+    keys, kIdx = np.unique(groups * nValues + vIdx.ravel(), return_inverse = True)
+    weights = np.bincount(kIdx.ravel(), weights = table.weights[eIdx])
+
+    return uValues, keys // nValues, keys % nValues, weights
+
+def reduceBlock(values, table, reducer):
+    """
+    Reduction: reduces values (time, entries), the pixel values of the entries of table, per
+    feature with 'mean', 'sum', 'mode' or 'frequencyHistogram'. Returns an array (time, features),
+    or a list of lists of dictionaries for 'frequencyHistogram'.
+    """
+    import numpy as np
+
+    nTimes = values.shape[0]
+
+    if reducer in ['mean', 'sum', 'mode'] and table.singlePixel():
+        #one pixel per feature (points without buffer): the values are the result
+        return values
+
+    if reducer in ['mean', 'sum']:
+        missing = np.isnan(values)
+        if missing.any():
+            values = np.where(missing, 0, values)
+            weight = segmentSums(~missing * table.weights, table.indptr)
+        else:
+            weight = table.featureWeights()[None, :]
+
+        if not table.unitWeights():
+            values = values * table.weights
+        total = segmentSums(values, table.indptr)
+
+        if reducer == 'sum':
+            return np.where(weight > 0, total, np.nan)
+
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            return np.where(weight > 0, total / np.where(weight > 0, weight, 1), np.nan)
+
+    if reducer == 'mode':
+        classes = classValues(values, ~np.isnan(values))
+        if classes is not None:
+            #class codes: keeps the class with the largest weighted count so far (the first one for ties)
+            out = np.full((nTimes, table.nFeatures), np.nan)
+            best = np.zeros((nTimes, table.nFeatures))
+            for value in classes:
+                counts = segmentSums(np.where(values == value, table.weights, 0), table.indptr)
+                better = counts > best
+                out[better] = value
+                best[better] = counts[better]
+            return out
+
+    if reducer in ['mode', 'frequencyHistogram']:
+        uValues, groups, vIdx, weights = countValues(values, table)
+
+        if reducer == 'mode':
+            out = np.full(nTimes * table.nFeatures, np.nan)
+            if len(groups) > 0:
+                #largest weight first, then smallest value
+                order = np.lexsort((vIdx, -weights, groups))
+                first = order[np.concatenate([[True], groups[order][1:] != groups[order][:-1]])]
+                out[groups[first]] = uValues[vIdx[first]]
+            return out.reshape(nTimes, table.nFeatures)
+
+        out = [[None] * table.nFeatures for t in range(nTimes)]
+        for g, v, w in zip(groups, vIdx, weights):
+            t, n = divmod(int(g), table.nFeatures)
+            if out[t][n] is None:
+                out[t][n] = {}
+            out[t][n][float(uValues[v])] = float(w)
+        return out
+
+    raise ValueError('Unsupported reducer: ' + str(reducer))
+
+def blockSize(table, memoryBudget = None):
+    """
+    Returns the number of time steps that can be reduced at once within memoryBudget bytes
+    """
+    if memoryBudget is None:
+        memoryBudget = defaultMemoryBudget
+
+    nPixels = len(table.unique()[0])
+
+    #source images read for a composite, pixel values, the gathered matrix and the temporary
+    #arrays of the reduction
+    bytesPerStep = 8 * (2 * nPixels + 6 * table.nEntries + 2 * table.nFeatures) + 1
+    return max(1, int(memoryBudget // bytesPerStep))
+
+def iterBlocks(raster, table, reducer = 'mean', timeBlock = None, memoryBudget = None):
+    """
+    Yields (first time step, reduced block) for consecutive blocks of time steps of the
+    raster stack. Each block is an array (time, features), see reduceBlock. Composites are
+    computed from at most timeBlock source images at a time (see localBackend.CompositeStack).
+    """
+    rows, cols, inverse = table.unique()
+
+    if timeBlock is None:
+        timeBlock = blockSize(table, memoryBudget)
+
+    for t0 in range(0, raster.nTimes, timeBlock):
+        values = raster.values(rows, cols, slice(t0, min(t0 + timeBlock, raster.nTimes)), timeBlock)
+        yield t0, reduceBlock(values[:, inverse], table, reducer)
+
+def reduceImage(raster, table, reducer = 'mean'):
+    """
+    Reduces a raster image per feature of table. Returns an array (features,), or a list
+    of dictionaries for 'frequencyHistogram'.
+    """
+    rows, cols, inverse = table.unique()
+
+    values = raster.values(rows, cols)
+    return reduceBlock(values[inverse][None, :], table, reducer)[0]
+
+def reduceStack(raster, table, reducer = 'mean', memoryBudget = None):
+    """
+    Reduces every time step of a raster stack per feature of table. Returns an array (time, features).
+    The result itself is held in memory: use iterBlocks to stream long time-series.
+    """
+    import numpy as np
+
+    blocks = [block for t0, block in iterBlocks(raster, table, reducer, memoryBudget = memoryBudget)]
+
+    if reducer == 'frequencyHistogram':
+        return [row for block in blocks for row in block]
+
+    return np.concatenate(blocks, axis = 0)
+
+def benchmark(nFeatures = 2000, nTimes = 365, size = 500, buf = 2000, seed = 0):
+    """
+    Local benchmark: times reduceStack against a loop over features, for nFeatures random
+    buffered points over a random (nTimes, size, size) stack.
+
+    Returns a dictionary with 'loopSeconds', 'vectorSeconds' and 'maxDifference'.
+    """
+    import time
+    import numpy as np
+
+    from geedataextract import localBackend
+
+    rng = np.random.RandomState(seed)
+    raster = localBackend.Raster(rng.rand(nTimes, size, size), [-120.0, 0.01, 45.0, -0.01])
+    pts1 = [{'geeID': n, 'type': 'Point', 'coordinates': [x, y]}
+            for n, (x, y) in enumerate(zip(rng.uniform(-119.9, -115.1, nFeatures),
+                                           rng.uniform(40.1, 44.9, nFeatures)))]
+
+    out = {}
+
+    t0 = time.time()
+    loop = np.zeros((nTimes, nFeatures))
+    for n, feature in enumerate(pts1):
+        rows, cols, weights = featurePixels(raster, feature, buf, 0)
+        loop[:, n] = raster.values(rows, cols).mean(axis = 1)
+    out['loopSeconds'] = time.time() - t0
+
+    t0 = time.time()
+    vector = reduceStack(raster, buildTable(raster, pts1, buf, 0), 'mean')
+    out['vectorSeconds'] = time.time() - t0
+
+    out['maxDifference'] = float(np.abs(loop - vector).max())
+
+    return out
@@ -21,5 +21,9 @@ setuptools.setup(
         "Development Status :: 3 - Alpha",
     ],
     python_requires='>=3.5',
+    extras_require={
+        'parquet': ['pyarrow', 'pandas'],
+        'direct': ['pandas'],
+    },
 )
 #setuptools.find_packages()
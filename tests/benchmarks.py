@@ -0,0 +1,187 @@
+#####Benchmarks of the GEE* functions with the fake ee module
+
+"""
+Measurements quoted in the history of the extraction engine, reproduced offline
+
+Run from the root of the repository:
+
+    python -m tests.benchmarks
+
+Every benchmark runs against tests/fakeEE, so it measures the expressions built
+by the GEE* functions and the number of blocking requests, not Earth Engine itself.
+"""
+
+import math
+import sys
+
+from tests import fakeEE
+
+sys.modules['ee'] = fakeEE
+
+from geedataextract import collectionCache
+from geedataextract import downloadData
+
+def setUp(nImages = None):
+    """
+    Resets the fake ee; collections then have nImages images (size().getInfo())
+    """
+    fakeEE.reset()
+    collectionCache.setCache(collectionCache.CollectionCache(path = None))
+
+    if nImages is not None:
+        def info(node):
+            if node.expr().endswith('.size()'):
+                return nImages
+            return fakeEE.defaultInfo(node)
+
+        fakeEE.infoHook[0] = info
+
+def reductions(graph):
+    """
+    Returns the number of reduceRegions calls in the graph of an export, and True if they are mapped
+    over the images of a collection (one reduction per image) instead of reducing a stack of bands
+    """
+    return graph.count('reduceRegions('), 'toBands().reduceRegions(' not in graph
+
+def benchTimeAsBands(years = 40):
+    """
+    Daily GRIDMET at points: reductions of the per-image path versus timeAsBands
+    """
+    nImages = int(years * 365.25)
+
+    print('timeAsBands: ' + str(years) + ' years of daily GRIDMET (' + str(nImages) + ' images)')
+
+    for timeAsBands in [False, True]:
+        setUp(nImages)
+        downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 1980, 1980 + years - 1, 'day', 0, 0, 'u', 'f',
+                                      timeAsBands = timeAsBands)
+
+        graphs = [line.rsplit(' -> ', 1)[0] for line in fakeEE.LOG]
+        perImage = any([reductions(g)[1] for g in graphs])
+        nReductions = nImages if perImage else sum([reductions(g)[0] for g in graphs])
+
+        print('  timeAsBands = ' + str(timeAsBands) + ': ' + str(len(graphs)) + ' export(s), ' +
+              str(nReductions) + ' region reductions' + (' (one per image)' if perImage else ''))
+
+    print('  expected stacked exports: ceil(' + str(nImages) + ' / maxBands) = ' +
+          str(int(math.ceil(nImages / 1000.0))))
+
+def calendarRangeComposites(imgCol, timeStep, yearsEE, monthsEE, firstYear, stat = 'mean'):
+    """
+    Reference: the composites of extractEngine.aggregateTime as they were built before they used
+    filterDate, selecting each month with calendarRange(m, m, 'month') and calendarRange(y, y, 'year')
+    """
+    import ee
+
+    if timeStep == 'year':
+
+        def map_m(i):
+            i = ee.Number(i).int()
+            image2 = imgCol.filter(ee.Filter.calendarRange(i, i, 'year')).first()
+            return (getattr(imgCol.filter(ee.Filter.calendarRange(i, i, 'year')), stat)()
+                    .copyProperties(image2,['system:time_start','system:time_end']))
+
+        return ee.ImageCollection(yearsEE.map(map_m).flatten())
+
+    def map_m(i):
+        i = ee.Number(i)
+        y = i.divide(12).add(firstYear).int()
+        m = i.mod(12).add(1)
+        image2 = (imgCol.filter(ee.Filter.calendarRange(m, m, 'month'))
+                  .filter(ee.Filter.calendarRange(y, y, 'year')).first())
+        return (getattr(imgCol.filter(ee.Filter.calendarRange(m, m, 'month'))
+                        .filter(ee.Filter.calendarRange(y, y, 'year')), stat)()
+                .copyProperties(image2,['system:time_start','system:time_end']))
+
+    return ee.ImageCollection(monthsEE.map(map_m).flatten())
+
+def lastCall(expr):
+    """
+    Returns the name and arguments of the outermost call of an expression, e.g. ('filterDate', '(a,b)')
+    """
+    depth = 0
+    for i in range(len(expr) - 1, -1, -1):
+        if expr[i] == ')':
+            depth += 1
+        elif expr[i] == '(':
+            depth -= 1
+            if depth == 0:
+                return expr[:i].split('.')[-1], expr[i:]
+    return expr, ''
+
+def collectionFilters(imgCol):
+    """
+    Returns the number of distinct collection filters (filter or filterDate calls) in the graph of imgCol
+    """
+    import json
+
+    values = json.loads(imgCol.serialize())['values'].values()
+
+    return len([v for v in values if lastCall(v)[0] in ['filter', 'filterDate']])
+
+def benchAggregateTime(years = 20):
+    """
+    Yearly and monthly composites of a collection: graph nodes and collection filters per time step,
+    calendarRange pairs versus one filterDate window
+    """
+    import ee
+
+    from geedataextract import extractEngine
+
+    setUp()
+    yearsL = list(range(2000, 2000 + years))
+
+    print('aggregateTime: ' + str(years) + ' years of a collection')
+
+    for timeStep in ['year', 'month']:
+        nSteps = len(yearsL) if timeStep == 'year' else 12 * len(yearsL)
+        row = '  ' + timeStep + ':'
+
+        for name, aggregate in [('calendarRange', calendarRangeComposites),
+                                ('filterDate', extractEngine.aggregateTime)]:
+            imgCol = aggregate(ee.ImageCollection('IDAHO_EPSCOR/GRIDMET'), timeStep, ee.List(yearsL),
+                               ee.List(list(range(nSteps))), yearsL[0])
+            row += (' ' + name + ' ' + str(extractEngine.graphSize(imgCol)) + ' graph nodes, ' +
+                    str(collectionFilters(imgCol)) + ' filter(s) per step;')
+
+        print(row.rstrip(';'))
+
+def benchInitialize(initLatency = 0.3):
+    """
+    15 calls of the GEE* functions (GRIDMET, topography and TerraClimate, five times each) with an
+    ee.Initialize taking initLatency seconds: one initialization per call versus one per process
+    """
+    import time
+
+    from geedataextract import eeSession
+
+    print('eeSession: 15 calls, ee.Initialize takes ' + str(initLatency) + ' s')
+
+    for perCall in [True, False]:
+        setUp()
+        fakeEE.latency['Initialize'] = initLatency
+        eeSession.setSession(None)
+
+        calls = [(downloadData.GEEgridmetPtsAvg, ('pts', ['tmin'], 2000, 2001, 'month', 0, 0, 'u', 'f')),
+                 (downloadData.GEEtopoPts, ('pts', ['elev'], 0, 0, 'u', 'f')),
+                 (downloadData.GEEterraClimatePtsAvgMonth, ('pts', ['tmmx'], 2000, 2001, 0, 0, 'u', 'f'))]
+
+        start = time.time()
+        for i in range(5):
+            for function, args in calls:
+                if perCall:
+                    #what the functions did before eeSession: initialize on every call
+                    eeSession.getSession().reset()
+                function(*args)
+        elapsed = time.time() - start
+
+        print('  ' + ('ee.Initialize on every call' if perCall else 'eeSession, once per process') +
+              ': %.2f s, %.3f s/call, %d Initialize calls' % (elapsed, elapsed / 15,
+                                                              fakeEE.COUNTS['Initialize']))
+
+benchmarks = [benchTimeAsBands, benchAggregateTime, benchInitialize]
+
+if __name__ == '__main__':
+    for bench in benchmarks:
+        bench()
+        print('')
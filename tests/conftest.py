@@ -0,0 +1,31 @@
+#####Offline test setup: the fake ee module replaces the earthengine-api
+
+import sys
+
+import pytest
+
+from tests import fakeEE
+
+sys.modules['ee'] = fakeEE
+
+from geedataextract import collectionCache
+from geedataextract import eeSession
+from geedataextract import extractEngine
+from geedataextract import pixelCache
+from geedataextract import spatialOrder
+
+@pytest.fixture(autouse = True)
+def ee():
+    """
+    The fake ee module, with no recorded calls, a new session and empty in-memory caches
+    """
+    fakeEE.reset()
+    eeSession.setSession(None)
+    collectionCache.setCache(collectionCache.CollectionCache(path = None))
+    pixelCache.setCache(pixelCache.PixelCache(folder = None))
+    extractEngine.idsMemo.clear()
+    spatialOrder.centroidsMemo.clear()
+
+    yield fakeEE
+
+    fakeEE.reset()
@@ -0,0 +1,260 @@
+#####Recording fake of the Earth Engine API used by the offline tests
+
+"""
+Offline stand-in for the earthengine-api, installed as the ee module by conftest
+
+Every ee call builds a Node whose repr is the expression it stands for, e.g.
+ImageCollection('IDAHO_EPSCOR/GRIDMET').select(['tmmn']).mean(). Functions
+passed to map/iterate are called once with a variable node, so the recorded
+expression is the whole graph that would be sent to Earth Engine.
+
+ee.batch.Export.table.toDrive returns a StubTask. Starting it records the
+graph of the exported table in LOG, and status() walks through the states
+given to the task (READY, RUNNING, COMPLETED by default). ee.data.getTaskStatus
+answers with the status() of the tasks of TASKS, and ee.data.getInfo describes
+every asset with ASSET_INFO.
+
+getInfo answers with infoHook[0](node) if set, otherwise with plausible values
+for the requests of the GEE* functions (date ranges of the collections, sizes).
+Initialize, getInfo, start and status sleep latency[<name>] seconds, to
+measure the effect of blocking requests (see benchmarks).
+"""
+
+import itertools
+import json
+import sys
+import threading
+import time
+import types
+
+#graph of every started export, number of calls of the blocking requests
+LOG = []
+COUNTS = {}
+
+#seconds slept by each blocking request (Initialize, getInfo, start, status), and function(node)
+#answering getInfo
+latency = {}
+infoHook = [None]
+
+#keyword arguments of every ee.Initialize call
+initArgs = []
+
+#every StubTask made, by id, and the answer of ee.data.getInfo(assetId)
+TASKS = {}
+ASSET_INFO = {'type': 'TABLE', 'updateTime': '2020-01-01T00:00:00Z'}
+
+countLock = threading.Lock()
+varIds = itertools.count(1)
+taskIds = itertools.count(1)
+
+def reset():
+    """
+    Forgets the recorded exports and calls and removes the latencies and getInfo hook
+    """
+    del LOG[:]
+    del initArgs[:]
+    TASKS.clear()
+    COUNTS.clear()
+    latency.clear()
+    for name in ['Initialize', 'getInfo', 'start', 'status']:
+        COUNTS[name] = 0
+        latency[name] = 0
+    infoHook[0] = None
+
+def blocking(name):
+    """
+    Counts a blocking request and waits latency[name] seconds
+    """
+    with countLock:
+        COUNTS[name] = COUNTS.get(name, 0) + 1
+    if latency.get(name, 0) > 0:
+        time.sleep(latency[name])
+
+def text(x):
+    """
+    Returns the expression of a node, or the repr of a plain value
+    """
+    if isinstance(x, Node):
+        return x.expr()
+    if isinstance(x, (list, tuple)):
+        return '[' + ','.join([text(i) for i in x]) + ']'
+    if isinstance(x, dict):
+        return '{' + ','.join([k + ':' + text(x[k]) for k in sorted(x)]) + '}'
+    if callable(x):
+        return '<fn>'
+    return repr(x)
+
+class Node(object):
+    """
+    Any ee object: name called on receiver with args and kwargs
+    """
+
+    def __init__(self, name, receiver = None, args = (), kwargs = None):
+        self.name = name
+        self.receiver = receiver
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.cached = None
+
+    def expr(self):
+        if self.cached is None:
+            head = text(self.receiver) + '.' if self.receiver is not None else ''
+            parts = [text(a) for a in self.args] + [k + '=' + text(v) for k, v in sorted(self.kwargs.items())]
+            self.cached = head + self.name + '(' + ','.join(parts) + ')'
+        return self.cached
+
+    __repr__ = expr
+
+    def serialize(self):
+        """
+        JSON graph with one value per distinct subexpression, like the compact serializer of ee
+        """
+        values = {}
+
+        def walk(x):
+            if isinstance(x, Node):
+                if x.expr() in values:
+                    return
+                values[x.expr()] = str(len(values))
+                walk(x.receiver)
+                walk(list(x.args) + list(x.kwargs.values()))
+            elif isinstance(x, (list, tuple)):
+                for item in x:
+                    walk(item)
+
+        walk(self)
+
+        graph = {'result': values[self.expr()], 'values': dict([(v, k) for k, v in values.items()])}
+        return json.dumps(graph)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            args = list(args)
+            if name in ['map', 'iterate'] and args and callable(args[0]):
+                var = Node('_v' + str(next(varIds)))
+                args[0] = Node('lambda', None, (var, args[0](var)))
+            if name == 'getInfo':
+                blocking('getInfo')
+                return getInfo(self)
+            return Node(name, self, tuple(args), kwargs)
+
+        return call
+
+    def __call__(self, *args, **kwargs):
+        return Node('call', self, args, kwargs)
+
+class Namespace(Node):
+    """
+    ee.<name>: a constructor (ee.Image(...)) or a namespace of constructors (ee.Reducer.mean())
+    """
+
+    def expr(self):
+        return self.name
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Namespace(self.name + '.' + name)
+
+    def __call__(self, *args, **kwargs):
+        if self.name == 'batch.Export.table.toDrive':
+            return StubTask(kwargs)
+        if self.name == 'data.getTaskStatus':
+            return [TASKS[i].status() if i in TASKS else {'id': i, 'state': 'UNKNOWN'} for i in args[0]]
+        if self.name == 'data.getInfo':
+            blocking('getInfo')
+            return dict(ASSET_INFO)
+        return Node(self.name, None, tuple(args), kwargs)
+
+class StubTask(object):
+    """
+    Stub of ee.batch.Task
+
+    config - export parameters (collection, description, folder, fileFormat)
+
+    states - states returned by successive status() calls, the last one repeated.
+        Default: ['READY', 'RUNNING', 'COMPLETED']
+
+    startError - message of the exception raised by every start() call, or None
+
+    errorMessage - error_message reported with the FAILED state, or None
+    """
+
+    def __init__(self, config, states = None, startError = None, errorMessage = None):
+        self.config = config
+        self.id = 'TASK' + str(next(taskIds))
+        self.states = list(states or ['READY', 'RUNNING', 'COMPLETED'])
+        self.startError = startError
+        self.errorMessage = errorMessage
+        self.started = False
+        TASKS[self.id] = self
+
+    def start(self):
+        blocking('start')
+        if self.startError is not None:
+            raise Exception(self.startError)
+        self.started = True
+        LOG.append(text(self.config.get('collection')) + ' -> ' + str(self.config.get('description')))
+
+    def status(self):
+        blocking('status')
+        state = self.states.pop(0) if len(self.states) > 1 else self.states[0]
+        status = {'id': self.id, 'state': state, 'description': self.config.get('description')}
+        if state == 'FAILED':
+            status['error_message'] = self.errorMessage
+        return status
+
+def getInfo(node):
+    """
+    Answers a getInfo request with infoHook[0], or with defaultInfo
+    """
+    if infoHook[0] is not None:
+        return infoHook[0](node)
+    return defaultInfo(node)
+
+def defaultInfo(node):
+    """
+    Plausible answers to the requests of the GEE* functions: lists of values, band names,
+    sizes and the first/last system:index of the collections
+    """
+    if node.name == 'List' and node.receiver is None and node.args and isinstance(node.args[0], list):
+        return [defaultInfo(a) if isinstance(a, Node) else a for a in node.args[0]]
+    if node.name == 'bandNames':
+        return ['b1']
+
+    s = node.expr()
+    if s.endswith('.size()'):
+        return 30
+
+    #limit(1, 'system:time_start', False) probes the last image of a collection
+    last = "'system:time_start',False" in s
+    if 'GRIDMET' in s:
+        return '20190501' if last else '19790101'
+    if 'LANDSAT' in s:
+        return 'LC08_044034_20190501' if last else 'LC08_044034_20130411'
+    if 'MODIS' in s:
+        return '2019_05_01' if last else '2000_02_18'
+    if 'soil_moisture' in s:
+        return 'SM_20190501' if last else 'SM_20100101'
+    return 'x'
+
+class FakeModule(types.ModuleType):
+    """
+    Module class of the fake: unknown attributes are ee namespaces
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Namespace(name)
+
+def Initialize(*args, **kwargs):
+    blocking('Initialize')
+    initArgs.append(kwargs)
+
+reset()
+
+sys.modules[__name__].__class__ = FakeModule
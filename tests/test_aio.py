@@ -0,0 +1,96 @@
+#####Tests of the asyncio interface with the fake ee and injected latency
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from geedataextract import aio
+from geedataextract import taskScheduler
+
+from tests.fakeEE import StubTask
+
+@pytest.fixture(autouse = True)
+def executor(monkeypatch):
+    """
+    A pool of 8 threads for the blocking calls, and status polls 10 ms apart
+    """
+    pool = ThreadPoolExecutor(max_workers = 8)
+    aio.setExecutor(pool)
+    monkeypatch.setattr(aio, 'pollInterval', 0.01)
+    monkeypatch.setattr(aio, 'maxInterval', 0.01)
+
+    yield pool
+
+    aio.setExecutor(None)
+    pool.shutdown()
+
+def topoJobs(n):
+    return [aio.GEEtopoPts('pts' + str(i), ['elev'], 0, 0, 'u', 'f') for i in range(n)]
+
+def test_jobs_run_concurrently(ee):
+    ee.latency['start'] = 0.1
+
+    async def main():
+        return await asyncio.gather(*topoJobs(8))
+
+    start = time.time()
+    results = asyncio.run(main())
+    elapsed = time.time() - start
+
+    #one after the other, the 8 exports would take 0.8 s to start
+    assert elapsed < 0.4
+    assert len(ee.LOG) == 8
+    assert all([len(tasks) == 1 for tasks in results])
+
+def test_event_loop_is_not_blocked(ee):
+    ee.latency['start'] = 0.1
+    ee.latency['getInfo'] = 0.02
+    ticks = []
+
+    async def heartbeat(done):
+        while not done.is_set():
+            ticks.append(time.time())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        done = asyncio.Event()
+        beat = asyncio.ensure_future(heartbeat(done))
+        await asyncio.gather(*topoJobs(4))
+        done.set()
+        await beat
+
+    asyncio.run(main())
+
+    #the loop kept ticking every ~10 ms while the calls blocked in the thread pool
+    assert len(ticks) >= 5
+    assert max([b - a for a, b in zip(ticks, ticks[1:])]) < 0.08
+
+def test_waitTasks_returns_final_states(ee):
+    tasks = [StubTask({'description': 'a'}),
+             StubTask({'description': 'b'}, states = ['RUNNING', 'RUNNING', 'FAILED'])]
+    for task in tasks:
+        task.start()
+
+    states = asyncio.run(aio.waitTasks(tasks))
+
+    assert states == {'a': 'COMPLETED', 'b': 'FAILED'}
+
+def test_waitTasks_timeout(ee):
+    task = StubTask({'description': 'a'}, states = ['RUNNING'])
+    task.start()
+
+    states = asyncio.run(aio.waitTasks([task], timeout = 0.05))
+
+    assert states == {'a': 'RUNNING'}
+
+def test_waitTasks_polls_the_scheduler(ee):
+    scheduler = taskScheduler.TaskScheduler(maxRunning = 1, pollInterval = 0)
+    handles = [scheduler.submit('job' + str(i), lambda: StubTask({'description': 'job'})) for i in range(3)]
+
+    assert [h.state for h in handles] == ['READY', 'QUEUED', 'QUEUED']
+
+    states = asyncio.run(aio.waitTasks(handles, scheduler = scheduler))
+
+    assert states == {'job0': 'COMPLETED', 'job1': 'COMPLETED', 'job2': 'COMPLETED'}
@@ -0,0 +1,43 @@
+#####Tests of the collection metadata cache with the fake ee
+
+import threading
+import time
+
+from geedataextract import collectionCache
+
+def test_missing_datasets_are_fetched_in_one_request(ee):
+    collectionCache.prefetch(['IDAHO_EPSCOR/GRIDMET', 'MODIS/006/MOD11A2'])
+
+    assert collectionCache.indexRange('IDAHO_EPSCOR/GRIDMET') == ('19790101', '20190501')
+    assert collectionCache.indexRange('MODIS/006/MOD11A2') == ('2000_02_18', '2019_05_01')
+    assert ee.COUNTS['getInfo'] == 1
+
+def test_entries_are_persisted(ee, tmp_path):
+    path = str(tmp_path / 'collections.json')
+    collectionCache.CollectionCache(path = path).get('IDAHO_EPSCOR/GRIDMET')
+
+    assert collectionCache.CollectionCache(path = path).isFresh('IDAHO_EPSCOR/GRIDMET')
+    assert ee.COUNTS['getInfo'] == 1
+
+def test_getCache_creates_one_cache_for_concurrent_callers(ee, monkeypatch):
+    Cache = collectionCache.CollectionCache
+
+    class SlowCache(Cache):
+        def __init__(self):
+            time.sleep(0.01)
+            Cache.__init__(self, path = None)
+
+    monkeypatch.setattr(collectionCache, 'CollectionCache', SlowCache)
+    collectionCache.setCache(None)
+    caches = []
+
+    def get():
+        caches.append(collectionCache.getCache())
+
+    threads = [threading.Thread(target = get) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set([id(cache) for cache in caches])) == 1
@@ -0,0 +1,35 @@
+#####Tests of consolidate: the long rows of the exported tables
+
+from geedataextract import consolidate
+
+def longRows(name, row):
+    """
+    Returns the (metric, value) of the long rows of one row of the export name
+    """
+    desc = consolidate.parseDescription(name)
+
+    return [(r['metric'], r['value']) for r in consolidate.tableRows([row], desc)]
+
+def test_combined_mean_and_sum_are_different_metrics():
+    row = {'geeID': '1', 'startDate': '2000-01-01', 'mean': '3', 'sum': '30'}
+
+    assert sorted(longRows('cm_tmin_2000_2001_pts1_rmean-sum', row)) == [('tmin', '3'), ('tmin_sum', '30')]
+
+def test_statistics_of_several_metrics():
+    row = {'geeID': '1', 'startDate': '2000-01-01', 'tmin_mean': '3', 'tmin_sum': '30', 'vpd_mean': '1'}
+
+    expected = [('tmin', '3'), ('tmin_sum', '30'), ('vpd', '1')]
+    assert sorted(longRows('cm_tmin-vpd_2000_2001_pts1_rmean-sum', row)) == expected
+
+def test_default_statistic_of_the_function_keeps_the_metric_name():
+    #soil class maps are reduced with the mode, so the mean gets its own metric
+    row = {'geeID': '1', 'mean': '3', 'mode': '30'}
+
+    assert sorted(longRows('s_subordersUS_soil_ptsB_rmean-mode', row)) == [('subordersUS', '30'),
+                                                                            ('subordersUS_mean', '3')]
+    assert sorted(longRows('s_elev_topo_pts1_rmean-mode', row)) == [('elev', '3'), ('elev_mode', '30')]
+
+def test_single_reducer_is_stored_as_the_metric():
+    row = {'geeID': '1', 'startDate': '2000-01-01', 'sum': '30'}
+
+    assert longRows('cm_pr_2000_2001_pts1', row) == [('pr', '30')]
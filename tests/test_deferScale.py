@@ -0,0 +1,46 @@
+#####Tests of deferScale: bands reduced in their stored units, converted by consolidate
+
+from geedataextract import consolidate
+from geedataextract import downloadData
+
+def nexExports(ee, **kwargs):
+    downloadData.GEEnasaNEXGDDP('pts', ['pr', 'tasmax'], 'month', 2000, 2001, ['rcp45'], 0, 0, 'u', 'f',
+                                models = ['CCSM4'], **kwargs)
+    return [line.rsplit(' -> ', 1) for line in ee.LOG]
+
+def test_nex_keeps_names_and_units_by_default(ee):
+    exports = nexExports(ee)
+
+    assert [desc for graph, desc in exports] == ['projm_NEX_pr_rcp45_CCSM4_2000_2001_pts1',
+                                                 'projm_NEX_tasmax_rcp45_CCSM4_2000_2001_pts1']
+    assert not any(['multiply(' in graph or 'add(' in graph for graph, desc in exports])
+
+def test_nex_deferScale(ee):
+    exports = nexExports(ee, deferScale = True)
+
+    assert [desc for graph, desc in exports] == ['projm_NEX_pr_rcp45_CCSM4_2000_2001_pts1_dn',
+                                                 'projm_NEX_tasmax_rcp45_CCSM4_2000_2001_pts1_dn']
+    assert not any(['multiply(' in graph or 'add(' in graph for graph, desc in exports])
+
+def test_summed_offsets_are_converted_on_earth_engine(ee):
+    exports = nexExports(ee, deferScale = True, reducers = ['mean', 'sum'])
+
+    assert [desc for graph, desc in exports] == ['projm_NEX_pr_rcp45_CCSM4_2000_2001_pts1_rmean-sum_dn',
+                                                 'projm_NEX_tasmax_rcp45_CCSM4_2000_2001_pts1_rmean-sum']
+    assert 'add(-273.15)' in exports[1][0]
+
+def test_consolidate_converts_deferred_values():
+    desc = consolidate.parseDescription('projm_NEX_tasmax_rcp45_CCSM4_2000_2001_pts1_rmean-stdDev-count_dn')
+    rows = [{'geeID': '1', 'startDate': '2000-01-01', 'mean': '300', 'stdDev': '2', 'count': '7'}]
+
+    values = dict([(r['metric'], r['value']) for r in consolidate.tableRows(rows, desc)])
+
+    assert abs(values['tasmax'] - 26.85) < 1e-9
+    assert values['tasmax_stdDev'] == 2.0
+    assert values['tasmax_count'] == '7'
+
+def test_values_are_not_converted_without_suffix():
+    desc = consolidate.parseDescription('projm_NEX_pr_rcp45_CCSM4_2000_2001_pts1')
+    rows = [{'geeID': '1', 'startDate': '2000-01-01', 'mean': '0.0001'}]
+
+    assert [r['value'] for r in consolidate.tableRows(rows, desc)] == ['0.0001']
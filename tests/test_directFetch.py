@@ -0,0 +1,70 @@
+#####Tests of direct retrieval (mode = 'direct') with the fake ee
+
+import pytest
+
+from geedataextract import directFetch
+from geedataextract import downloadData
+
+from tests import benchmarks
+
+def serve(ee, nFeatures, nImages, pages):
+    """
+    Answers getInfo with nFeatures points, nImages images and the rows of the pages requested with
+    toList(pageSize, offset), recorded in pages
+    """
+    def info(node):
+        expr = node.expr()
+        if expr.endswith('.size()'):
+            return nFeatures if expr.startswith('FeatureCollection(') else nImages
+
+        name, args = benchmarks.lastCall(expr)
+        if name == 'toList':
+            pageSize, offset = [int(a) for a in args[1:-1].split(',')]
+            pages.append((pageSize, offset))
+            rows = range(offset, min(offset + pageSize, nFeatures * nImages))
+            return [{'type': 'Feature', 'geometry': None,
+                     'properties': {'geeID': str(i % nFeatures),
+                                    'startDate': {'type': 'Date', 'value': 946684800000},
+                                    'mean': float(i)}} for i in rows]
+
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+
+def test_direct_returns_a_dataframe_fetched_in_pages(ee, monkeypatch):
+    pytest.importorskip('pandas')
+    monkeypatch.setattr(directFetch, 'defaultPageSize', 10)
+    pages = []
+    serve(ee, 3, 24, pages)
+
+    df = downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2001, 'month', 0, 0, 'u', 'f', mode = 'direct')
+
+    #nothing is exported
+    assert ee.LOG == []
+    assert sorted(pages) == [(10, offset) for offset in range(0, 72, 10)]
+
+    assert list(df.columns) == ['geeID', 'startDate', 'timeStep', 'dataset', 'metric', 'model', 'scenario',
+                                'geom', 'value']
+    assert len(df) == 72
+    assert list(df['value']) == [float(i) for i in range(72)]
+    assert set(df['startDate']) == set(['2000-01-01'])
+    assert set(df['geom']) == set(['pts1'])
+    assert set(df['metric']) == set(['tmin'])
+    assert set(df['dataset']) == set(['GRIDMET'])
+
+def test_direct_refuses_large_jobs(ee, monkeypatch):
+    monkeypatch.setattr(directFetch, 'directLimit', 50)
+    serve(ee, 3, 24, [])
+
+    with pytest.raises(ValueError, match = "use mode = 'export'"):
+        downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2001, 'month', 0, 0, 'u', 'f', mode = 'direct')
+
+    assert ee.LOG == []
+
+def test_unknown_mode(ee):
+    with pytest.raises(ValueError, match = "mode must be"):
+        downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2001, 'month', 0, 0, 'u', 'f', mode = 'fast')
+
+def test_plainValue_converts_dates():
+    assert directFetch.plainValue({'type': 'Date', 'value': 5}) == 5
+    assert directFetch.plainValue(1.5) == 1.5
@@ -0,0 +1,78 @@
+#####Tests of the GEE* functions with the fake ee: every function, points, buffers and polygons
+
+import pytest
+
+from geedataextract import downloadData
+
+#function, arguments before buf/poly, arguments after buf/poly, keyword arguments and the exports of points
+#(the descriptions written by the functions before they were routed through extractEngine)
+calls = [
+    ('GEEtcPts', ('pts', 2011), ('u', 'f'), {}, ['s_tc_2011']),
+    ('GEEicPts', ('pts', 2011), ('u', 'f'), {}, ['s_ic_2011']),
+    ('GEElcPts', ('pts', 2011), ('u', 'f'), {}, ['s_lc_2011']),
+    ('GEEsoilPts', ('pts', ['oc', 'soilDepth']), ('u', 'f'), {}, ['s_oc_soil', 's_soilDepth_soil']),
+    ('GEEtopoPts', ('pts', ['elev', 'slope']), ('u', 'f'), {}, ['s_elev_topo', 's_slope_topo']),
+    ('GEEgridmetPtsAvg', ('pts', ['tmin', 'vpd'], 2000, 2002, 'month'), ('u', 'f'), {},
+     ['cm_tmin_2000_2002', 'cm_vpd_2000_2002']),
+    ('GEEgridmetPtsSum', ('pts', ['pr'], 2000, 2002, 'year'), ('u', 'f'), {}, ['cy_pr_2000_2002']),
+    ('GEEphenMODIS', ('pts', ['GreenInc'], 2001, 2003), ('u', 'f'), {}, ['p_MCD12Q2_GreenInc_2001_2003']),
+    ('GEEviLandsat', ('pts', ['NDVI'], 'year', ['L8']), ('u', 'f'), {}, ['ry_L8_NDVI_2013_2018']),
+    ('GEElaiMODIS', ('pts', ['Lai'], 'month'), ('Op1', 'u', 'f'), {'startYear': 2003, 'endYear': 2005},
+     ['rm_MCD15A3H_Lai_2003_2005']),
+    ('GEElstMODIS', ('pts', ['day1030', 'night0130'], 'year'), ('Op1', 'u', 'f'), {},
+     ['ry_MOD11A2_day1030_2000_2018', 'ry_MYD11A2_night0130_2000_2019']),
+    ('GEEviMODIS', ('pts', ['NDVI'], 'lowest'), ('Op2', 'u', 'f'), {'startYear': 2003, 'endYear': 2005},
+     ['rl_MOD13Q1_NDVI_2003_2005']),
+    ('GEEsmos', ('pts', ['ssm'], 'month'), ('u', 'f'), {}, ['rm_SMOS_ssm_2010_2018']),
+    ('GEEterraClimatePtsAvgMonth', ('pts', ['pr', 'tmmx'], 2000, 2002), ('u', 'f'), {},
+     ['tcy_pr_2000_2002', 'tcy_tmmx_2000_2002']),
+    ('GEEnasaNEXGDDP', ('pts', ['tasmin'], 'month', 2000, 2001, ['rcp45']), ('u', 'f'),
+     {'models': ['CCSM4', 'MIROC5']},
+     ['projm_NEX_tasmin_rcp45_CCSM4_2000_2001', 'projm_NEX_tasmin_rcp45_MIROC5_2000_2001']),
+    ('GEEmonthTRMM', ('pts', 2000, 2002), ('u', 'f'), {}, ['rm_TRMM_pr_2000_2002']),
+    ('GEEprismPtsAvgMonth', ('pts', ['ppt'], 2000, 2002), ('u', 'f'), {}, ['pri_ppt_2000_2002']),
+    ('GEEmacaGCMs', ('pts', ['tasmax'], 'year', 2000, 2001, ['rcp45']), (['CCSM4'], 'u', 'f'), {},
+     ['projy_MACA_tasmax_rcp45_CCSM4_2000_2001']),
+    ('GEEetMODIS', ('pts', ['ET'], 'month'), ('Op1', 'u', 'f'), {'startYear': 2003, 'endYear': 2005},
+     ['rm_MOD16A2_ET_2003_2005']),
+    ]
+
+def run(ee, call, buf, poly):
+    """
+    Runs a GEE* function and returns the (graph, description) of its exports, sorted by description
+    """
+    name, before, after, kwargs, expected = call
+    tasks = getattr(downloadData, name)(*(before + (buf, poly) + after), **kwargs)
+
+    assert len(tasks) == len(ee.LOG)
+
+    return sorted([tuple(line.rsplit(' -> ', 1)) for line in ee.LOG], key = lambda x: x[1])
+
+@pytest.mark.parametrize('call', calls, ids = [c[0] for c in calls])
+def test_points(ee, call):
+    exports = run(ee, call, 0, 0)
+
+    assert [desc for graph, desc in exports] == sorted([d + '_pts1' for d in call[4]])
+    for graph, desc in exports:
+        assert "FeatureCollection('users/u/pts')" in graph
+        assert 'buffer(' not in graph
+        assert 'reduceRegions(' in graph
+
+@pytest.mark.parametrize('call', calls, ids = [c[0] for c in calls])
+def test_buffered_points(ee, call):
+    exports = run(ee, call, 100, 0)
+
+    #the land cover fractions of buffers and polygons are exported as f_lc
+    expected = [d.replace('s_lc_', 'f_lc_') + '_ptsB' for d in call[4]]
+    assert [desc for graph, desc in exports] == sorted(expected)
+    for graph, desc in exports:
+        assert '.buffer(100)' in graph
+
+@pytest.mark.parametrize('call', calls, ids = [c[0] for c in calls])
+def test_polygons(ee, call):
+    exports = run(ee, call, 0, 1)
+
+    expected = [d.replace('s_lc_', 'f_lc_') + '_poly1' for d in call[4]]
+    assert [desc for graph, desc in exports] == sorted(expected)
+    for graph, desc in exports:
+        assert 'buffer(' not in graph
@@ -0,0 +1,49 @@
+#####Tests of eeSession: one ee.Initialize per process, thread safety, explicit project and credentials
+
+import threading
+
+from geedataextract import downloadData
+from geedataextract import eeSession
+
+def test_initialize_once_for_many_calls(ee):
+    for i in range(5):
+        downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2001, 'month', 0, 0, 'u', 'f')
+        downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f')
+        downloadData.GEEterraClimatePtsAvgMonth('pts', ['tmmx'], 2000, 2001, 0, 0, 'u', 'f')
+
+    assert len(ee.LOG) == 15
+    assert ee.COUNTS['Initialize'] == 1
+
+def test_concurrent_callers_wait_for_one_initialization(ee):
+    ee.latency['Initialize'] = 0.05
+
+    threads = [threading.Thread(target = eeSession.initialize) for i in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert ee.COUNTS['Initialize'] == 1
+    assert eeSession.getSession().initialized
+
+def test_project_and_credentials_passed_to_initialize(ee):
+    eeSession.setSession(eeSession.EESession(project = 'my-project', credentials = 'creds',
+                                             opt_url = 'https://example.com'))
+
+    downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f')
+
+    assert ee.initArgs == [{'project': 'my-project', 'credentials': 'creds',
+                            'opt_url': 'https://example.com'}]
+
+def test_default_session_passes_no_arguments(ee):
+    eeSession.initialize()
+
+    assert ee.initArgs == [{}]
+
+def test_reset_initializes_again(ee):
+    eeSession.initialize()
+    eeSession.initialize()
+    eeSession.getSession().reset()
+    eeSession.initialize()
+
+    assert ee.COUNTS['Initialize'] == 2
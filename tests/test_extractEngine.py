@@ -0,0 +1,189 @@
+#####Tests of the extraction engine with the fake ee
+
+import pytest
+
+from geedataextract import downloadData
+from geedataextract import extractEngine
+
+from tests import benchmarks
+
+def test_timeAsBands_reduces_one_stack_per_chunk(ee):
+    benchmarks.setUp(nImages = 2500)
+
+    tasks = downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2006, 'day', 0, 0, 'u', 'f',
+                                          timeAsBands = True)
+
+    descs = [line.rsplit(' -> ', 1)[1] for line in ee.LOG]
+    assert descs == ['cd_tmin_2000_2006_pts1_tb0', 'cd_tmin_2000_2006_pts1_tb1', 'cd_tmin_2000_2006_pts1_tb2']
+    assert len(tasks) == 3
+
+    for line in ee.LOG:
+        graph = line.rsplit(' -> ', 1)[0]
+        assert benchmarks.reductions(graph) == (1, False)
+        assert '.forEachBand(' in graph
+
+    #time steps 1000 to 1999 in the second stack
+    assert '.toList(1000,1000)' in ee.LOG[1]
+
+def test_default_reduces_every_image(ee):
+    downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2006, 'day', 0, 0, 'u', 'f')
+
+    graph = ee.LOG[0].rsplit(' -> ', 1)[0]
+    assert benchmarks.reductions(graph) == (1, True)
+
+def test_graphSize_counts_distinct_subexpressions(ee):
+    image = ee.Image('a').add(ee.Image('a'))
+
+    #Image('a') is serialized once
+    assert extractEngine.graphSize(image) == 2
+
+def composites(ee, aggregate, timeStep):
+    years = list(range(2000, 2020))
+    return aggregate(ee.ImageCollection('c'), timeStep, ee.List(years), ee.List(list(range(240))), 2000)
+
+def test_aggregateTime_selects_each_step_with_one_filterDate(ee):
+    for timeStep in ['year', 'month']:
+        imgCol = composites(ee, extractEngine.aggregateTime, timeStep)
+
+        assert 'calendarRange' not in repr(imgCol)
+        #the composite and its time properties come from the same window
+        assert benchmarks.collectionFilters(imgCol) == 1
+
+def test_aggregateTime_graph_is_smaller_for_months(ee):
+    new = composites(ee, extractEngine.aggregateTime, 'month')
+    old = composites(ee, benchmarks.calendarRangeComposites, 'month')
+
+    assert benchmarks.collectionFilters(old) == 2
+    assert extractEngine.graphSize(new) < extractEngine.graphSize(old)
+
+def test_aggregateTime_keeps_other_time_steps(ee):
+    imgCol = ee.ImageCollection('c')
+
+    assert extractEngine.aggregateTime(imgCol, 'day', None, None, 2000) is imgCol
+
+def serveIds(ee, ids_d):
+    """
+    Answers the sorted ID requests of each asset in ids_d (asset name -> IDs)
+    """
+    def info(node):
+        for name in ids_d:
+            if "'users/u/" + name + "'" in node.expr():
+                return ids_d[name]
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+
+def test_sortedIds_are_fetched_once_per_collection(ee):
+    serveIds(ee, {'a': [1, 2, 3], 'b': [10, 20]})
+
+    #collections loaded separately from the same asset share an entry
+    assert extractEngine.sortedIds(extractEngine.loadPts('a', 'u')) == [1, 2, 3]
+    assert extractEngine.sortedIds(extractEngine.loadPts('a', 'u')) == [1, 2, 3]
+    assert extractEngine.sortedIds(extractEngine.loadPts('b', 'u')) == [10, 20]
+    assert extractEngine.sortedIds(extractEngine.loadPts('a', 'u')) == [1, 2, 3]
+
+    assert ee.COUNTS['getInfo'] == 2
+
+def test_sortedIds_from_concurrent_threads(ee):
+    import threading
+
+    serveIds(ee, dict([('p' + str(i), list(range(i, i + 5))) for i in range(8)]))
+    ee.latency['getInfo'] = 0.01
+    results = {}
+
+    def extract(i):
+        results[i] = extractEngine.sortedIds(extractEngine.loadPts('p' + str(i % 8), 'u'))
+
+    threads = [threading.Thread(target = extract, args = (i,)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all([results[i] == list(range(i % 8, i % 8 + 5)) for i in range(32)])
+
+def test_memo_keeps_at_most_maxMemo_collections(ee, monkeypatch):
+    monkeypatch.setattr(extractEngine, 'maxMemo', 2)
+
+    for name in ['a', 'b', 'c']:
+        extractEngine.sortedIds(extractEngine.loadPts(name, 'u'))
+
+    assert len(extractEngine.idsMemo) == 2
+
+def test_outColumns_keeps_ensemble_band_names():
+    assert extractEngine.outColumns(['ens_p90']) == ['ens_p90']
+    assert extractEngine.outColumns(['ens_mean', 'ens_p90']) == ['ens_mean', 'ens_p90']
+    assert extractEngine.outColumns(['tmin']) == ['mean']
+    assert extractEngine.outColumns('tmin', 'sum') == ['sum']
+
+def test_single_ensemble_statistic_is_written_to_its_column(ee):
+    downloadData.GEEnasaNEXGDDP('pts', ['pr'], 'month', 2000, 2001, ['rcp45'], 0, 0, 'u', 'f',
+                                models = ['CCSM4', 'MIROC5'], ensembleStats = ['p90'])
+
+    graph, description = ee.LOG[0].rsplit(' -> ', 1)
+    assert description == 'projm_NEX_pr_rcp45_ensembleStats_2000_2001_pts1'
+    assert "setOutputs(['ens_p90'])" in graph
+    assert "Filter.neq('ens_p90',None)" in graph
+
+def test_extractOptions_adds_the_defaults():
+    options = extractEngine.extractOptions({'chunkSize': 'auto'})
+
+    assert options == {'scheduler': None, 'manifest': None, 'chunkSize': 'auto', 'chunkOrder': 'geeID',
+                       'dedupe': False, 'since': None, 'cache': None, 'reducers': None, 'mode': 'export'}
+    assert 'since' not in extractEngine.extractOptions({}, timeSeries = False)
+
+def test_unknown_options_are_rejected(ee):
+    with pytest.raises(TypeError):
+        downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2001, 'month', 0, 0, 'u', 'f', chunksize = 10)
+    with pytest.raises(TypeError):
+        downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f', since = '2000-01-01')
+
+    assert ee.LOG == []
+
+def test_options_are_passed_to_the_engine(ee):
+    downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f', reducers = ['mean', 'max'])
+
+    assert [line.rsplit(' -> ', 1)[1] for line in ee.LOG] == ['s_elev_topo_pts1_rmean-max']
+
+def test_copyRows_adds_one_row_per_removed_feature(ee):
+    table = ee.FeatureCollection('table')
+    pairs = ee.FeatureCollection([ee.Feature(None, {'geeID': 2, 'rep': 1}),
+                                  ee.Feature(None, {'geeID': 5, 'rep': 4})])
+
+    merged = extractEngine.copyRows(table, pairs)
+
+    #the reduced rows, plus the rows of each pair joined on the geeID of its representative
+    assert merged.name == 'merge' and merged.receiver is table
+    copies = merged.args[0]
+    joined = copies.receiver
+    assert joined.args[0:2] == (pairs, table)
+    assert joined.args[2].expr() == "Filter.equals(leftField='rep',rightField='geeID')"
+    assert joined.receiver.expr() == "Join.inner('pair','row')"
+    #each copy is the row of the representative with the geeID of the removed feature
+    var, copy = copies.args[0].args
+    assert copy.expr() == ("Feature(" + var.expr() + ".get('row')).set('geeID',Feature(" + var.expr() +
+                           ".get('pair')).get('geeID'))")
+
+def test_dedupe_copies_the_rows_of_points_in_the_same_pixel(ee):
+    def info(node):
+        if node.name == 'aggregate_array':
+            return [[1, 0.5, 0.5], [2, 0.5, 0.5], [3, None, None], [4, 1.5, 0.5], [5, 1.5, 0.5]]
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+
+    downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f', dedupe = True)
+
+    graph = ee.LOG[0].rsplit(' -> ', 1)[0]
+    #points 2 and 5 are reduced as 1 and 4, then given one row each
+    assert "filter(Filter.inList('geeID',[2,5]).Not())" in graph
+    assert (".merge(Join.inner('pair','row').apply(FeatureCollection([Feature(None,{geeID:2,rep:1}),"
+            "Feature(None,{geeID:5,rep:4})])" in graph)
+
+def test_dedupe_groups_buffered_points_by_geometry(ee):
+    downloadData.GEEtopoPts('pts', ['elev'], 100, 0, 'u', 'f', dedupe = True)
+
+    graph = ee.LOG[0].rsplit(' -> ', 1)[0]
+    assert ".distinct(['pixKey'])" in graph
+    assert "filter(Filter.eq('isRep',False))" in graph
+    assert 'inList' not in graph
@@ -0,0 +1,121 @@
+#####Tests of incremental updates (since) with the fake ee
+
+import csv
+
+import pytest
+
+from geedataextract import consolidate
+from geedataextract import downloadData
+from geedataextract import incremental
+from geedataextract import jobManifest
+
+def row(dataset, metric, timeStep, startDate, model = '', scenario = '', geom = 'pts1'):
+    return {'geeID': '1', 'startDate': startDate, 'timeStep': timeStep, 'dataset': dataset,
+            'metric': metric, 'model': model, 'scenario': scenario, 'geom': geom, 'value': '1.0'}
+
+@pytest.fixture(autouse = True)
+def sources():
+    incremental.source_d.clear()
+    yield
+    incremental.source_d.clear()
+
+def test_time_steps_have_their_own_last_date(tmp_path):
+    path = str(tmp_path / 'all_data.csv')
+    with open(path, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, consolidate.columns)
+        writer.writeheader()
+        writer.writerow(row('GRIDMET', 'tmin', 'month', '2018-12-01'))
+        writer.writerow(row('GRIDMET', 'tmin', 'year', '2015-01-01'))
+
+    assert incremental.sinceDate(path, 'cm_tmin_2000_2020_pts1') == '2018-12-01'
+    assert incremental.sinceDate(path, 'cy_tmin_2000_2020_pts1') == '2015-01-01'
+    assert incremental.sinceDate(path, 'cd_tmin_2000_2020_pts1') is None
+
+def test_geometries_have_their_own_last_date(tmp_path):
+    path = str(tmp_path / 'all_data.csv')
+    with open(path, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, consolidate.columns)
+        writer.writeheader()
+        writer.writerow(row('GRIDMET', 'tmin', 'month', '2018-12-01'))
+        writer.writerow(row('GRIDMET', 'tmin', 'month', '2010-12-01', geom = 'poly1'))
+
+    assert incremental.sinceDate(path, 'cm_tmin_2000_2020_pts1') == '2018-12-01'
+    assert incremental.sinceDate(path, 'cm_tmin_2000_2020_poly1') == '2010-12-01'
+    assert incremental.sinceDate(path, 'cm_tmin_2000_2020_ptsB') is None
+
+def test_tables_without_geom_are_refused(tmp_path):
+    path = str(tmp_path / 'all_data.csv')
+    with open(path, 'w', newline = '') as f:
+        f.write('geeID,startDate,timeStep,dataset,metric,model,scenario,value\n'
+                '1,2018-12-01,month,GRIDMET,tmin,,,1.0\n')
+
+    with pytest.raises(ValueError):
+        incremental.sinceDate(path, 'cm_tmin_2000_2020_ptsB')
+
+    #nor can the new exports be appended to it
+    with pytest.raises(ValueError):
+        consolidate.consolidate(str(tmp_path), path, pattern = '*_u*.csv', append = True)
+
+def test_folder_of_exports_gives_the_geometry(tmp_path):
+    with open(str(tmp_path / 'cm_tmin_2000_2001_pts1.csv'), 'w') as f:
+        f.write('system:index,geeID,mean,startDate\n0,1,270.5,2001-12-01\n')
+
+    assert incremental.sinceDate(str(tmp_path), 'cm_tmin_2000_2001_pts1') == '2001-12-01'
+    assert incremental.sinceDate(str(tmp_path), 'cm_tmin_2000_2001_ptsB') is None
+
+def test_since_filters_the_exported_steps(ee, tmp_path):
+    path = str(tmp_path / 'all_data.csv')
+    with open(path, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, consolidate.columns)
+        writer.writeheader()
+        writer.writerow(row('GRIDMET', 'tmin', 'year', '2005-01-01'))
+
+    downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2010, 'year', 0, 0, 'u', 'f', since = path)
+    downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2010, 'month', 0, 0, 'u', 'f', since = path)
+
+    assert [line.rsplit(' -> ', 1)[1] for line in ee.LOG] == ['cy_tmin_2000_2010_pts1_u20050101',
+                                                              'cm_tmin_2000_2010_pts1']
+
+def test_manifest_gives_the_last_exported_startDate(ee, tmp_path):
+    def info(node):
+        if 'aggregate_max' in node.expr():
+            return '2010-12-01'
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+    manifest = jobManifest.JobManifest(str(tmp_path / 'jobs.jsonl'))
+
+    downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2010, 'month', 0, 0, 'u', 'f', manifest = manifest)
+    manifest.record('cm_tmin_2000_2010_pts1', 'COMPLETED')
+
+    assert manifest.params('cm_tmin_2000_2010_pts1')['lastDate'] == '2010-12-01'
+    assert incremental.sinceDate(manifest, 'cm_tmin_2000_2010_pts1') == '2010-12-01'
+    assert incremental.sinceDate(manifest, 'cy_tmin_2000_2010_pts1') is None
+
+def test_manifest_without_last_date_uses_the_end_year(tmp_path):
+    manifest = jobManifest.JobManifest(str(tmp_path / 'jobs.jsonl'))
+    manifest.record('cm_tmin_2000_2017_pts1', 'COMPLETED', 'TASK1', {'folder': 'f'})
+
+    assert incremental.sinceDate(manifest, 'cm_tmin_2000_2020_pts1') == '2017-12-31'
+
+def test_new_files_in_nested_partitions_are_read(tmp_path):
+    pytest.importorskip('pyarrow')
+    from geedataextract import parquetStore
+
+    csvFolder = tmp_path / 'csv'
+    csvFolder.mkdir()
+    outDir = str(tmp_path / 'parquet')
+
+    with open(str(csvFolder / 'cm_tmin_2000_2001_pts1.csv'), 'w') as f:
+        f.write('system:index,geeID,mean,startDate\n0,1,270.5,2000-01-01\n')
+    parquetStore.writeParquet(str(csvFolder), outDir)
+
+    assert incremental.sinceDate(outDir, 'cm_tmin_2000_2001_pts1') == '2000-01-01'
+
+    #the new rows go to dataset=GRIDMET/metric=tmin/year=2000, below the top folder
+    with open(str(csvFolder / 'cm_tmin_2000_2001_pts1.csv'), 'w') as f:
+        f.write('system:index,geeID,mean,startDate\n0,1,271.5,2000-02-01\n')
+    parquetStore.writeParquet(str(csvFolder), outDir)
+
+    assert incremental.sinceDate(outDir, 'cm_tmin_2000_2001_pts1') == '2000-02-01'
+    assert incremental.sinceDate(outDir, 'cm_tmin_2000_2001_poly1') is None
@@ -0,0 +1,122 @@
+#####Tests of the local raster backend, through the backend parameter of the GEE* functions
+
+import csv
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from geedataextract import downloadData
+
+def writeRaster(folder, name, data, dates = None):
+    """
+    Writes folder/name.npy and folder/name.json: 1 degree pixels, upper left corner at (0, 10)
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    np.save(os.path.join(folder, name + '.npy'), np.asarray(data, dtype = float))
+    with open(os.path.join(folder, name + '.json'), 'w') as f:
+        json.dump({'transform': [0, 1, 10, -1], 'dates': dates, 'nodata': -9999}, f)
+
+@pytest.fixture
+def dataDir(tmp_path):
+    """
+    Two points, a 10 x 10 DEM and 13 monthly GRIDMET images from January 2000 to January 2001
+    """
+    with open(str(tmp_path / 'pts.csv'), 'w') as f:
+        f.write('geeID,x,y\n0,0.5,9.5\n1,3.5,7.5\n')
+
+    writeRaster(str(tmp_path / 'SRTM'), 'elevation', np.arange(100).reshape(10, 10))
+
+    dates = ['2000-%02d-01' % m for m in range(1, 13)] + ['2001-01-01']
+    stack = np.arange(13).reshape(13, 1, 1) * np.ones((13, 10, 10))
+    writeRaster(str(tmp_path / 'GRIDMET'), 'tmmn', stack, dates)
+
+    return str(tmp_path)
+
+def readTable(path):
+    with open(path) as f:
+        return list(csv.DictReader(f))
+
+def test_topo_local_backend(ee, dataDir, tmp_path):
+    folderOut = str(tmp_path / 'out')
+
+    files = downloadData.GEEtopoPts('pts', ['elev'], 0, 0, dataDir, folderOut, backend = 'local')
+
+    assert files == [os.path.join(folderOut, 's_elev_topo_pts1.csv')]
+    assert [(row['geeID'], float(row['mean'])) for row in readTable(files[0])] == [('0', 0.0), ('1', 23.0)]
+    #nothing is sent to Earth Engine
+    assert ee.LOG == []
+    assert ee.COUNTS['Initialize'] == 0
+
+def test_gridmet_local_backend(ee, dataDir, tmp_path):
+    folderOut = str(tmp_path / 'out')
+
+    files = downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2005, 'month', 0, 0, dataDir, folderOut,
+                                          backend = 'local')
+
+    assert [os.path.basename(f) for f in files] == ['cm_tmin_2000_2000_pts1.csv']
+    rows = readTable(files[0])
+    assert len(rows) == 2 * 12
+    assert sorted(set([float(row['mean']) for row in rows])) == [float(m) for m in range(12)]
+    assert ee.LOG == []
+
+def test_gridmet_last_partial_year(ee, tmp_path):
+    #images from January 2000 to June 2001
+    dates = ['2000-%02d-01' % m for m in range(1, 13)] + ['2001-%02d-01' % m for m in range(1, 7)]
+    stack = np.arange(18).reshape(18, 1, 1) * np.ones((18, 10, 10))
+    writeRaster(str(tmp_path / 'GRIDMET'), 'tmmn', stack, dates)
+    with open(str(tmp_path / 'pts.csv'), 'w') as f:
+        f.write('geeID,x,y\n0,0.5,9.5\n')
+
+    def values(timeStep):
+        files = downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2005, timeStep, 0, 0, str(tmp_path),
+                                              str(tmp_path / timeStep), backend = 'local')
+        return [os.path.basename(f) for f in files], [float(row['mean']) for row in readTable(files[0])]
+
+    #like Earth Engine: the complete months of 2001 before the month of the last image
+    assert values('month') == (['cm_tmin_2000_2000_pts1.csv'], [float(m) for m in range(17)])
+    #every image up to endYear
+    assert values('day') == (['cd_tmin_2000_2000_pts1.csv'], [float(m) for m in range(18)])
+    #complete years only
+    assert values('year') == (['cy_tmin_2000_2000_pts1.csv'], [5.5])
+
+def test_unsupported_options_are_rejected(ee, dataDir, tmp_path):
+    with pytest.raises(ValueError):
+        downloadData.GEEtopoPts('pts', ['elev'], 0, 0, dataDir, 'out', backend = 'local', chunkSize = 10)
+    with pytest.raises(ValueError):
+        downloadData.GEEgridmetPtsAvg('pts', ['tmin'], 2000, 2005, 'month', 0, 0, dataDir, 'out',
+                                      timeAsBands = True, backend = 'local')
+    with pytest.raises(ValueError):
+        downloadData.GEEsoilPts('pts', ['oc'], 0, 0, 'u', 'f', backend = 'gcs')
+
+    assert not os.path.exists('out')
+
+def test_composites_are_read_within_the_time_block(ee, monkeypatch):
+    from geedataextract import localBackend
+    from geedataextract import zonalStats
+
+    days = np.arange(np.datetime64('2000-01-01'), np.datetime64('2010-01-01'))
+    raster = localBackend.Raster(np.ones((len(days), 10, 10)), [0, 1, 10, -1], [str(d) for d in days])
+    years = localBackend.aggregateTime(raster, 'year', list(range(2000, 2010)))
+
+    reads = []
+    values = localBackend.Raster.values
+
+    def recordReads(self, rows, cols, times = None, maxImages = None):
+        vals = values(self, rows, cols, times, maxImages)
+        reads.append(vals.shape[0])
+        return vals
+
+    monkeypatch.setattr(localBackend.Raster, 'values', recordReads)
+
+    pts1 = [{'geeID': '0', 'type': 'Point', 'coordinates': [5.0, 5.0]}]
+    table = zonalStats.buildTable(years, pts1, 200000, 0)
+    blocks = list(zonalStats.iterBlocks(years, table, 'mean', timeBlock = 5))
+
+    #365 or 366 daily images per yearly composite, read at most 5 at a time
+    assert max(reads) == 5
+    assert [t0 for t0, block in blocks] == [0, 5]
+    assert np.allclose(np.concatenate([block for t0, block in blocks]), 1)
@@ -0,0 +1,55 @@
+#####Tests of the Parquet output: round trip of time series and static exports
+
+import datetime
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from geedataextract import parquetStore
+
+def writeCsv(folder, name, lines):
+    with open(str(folder / name), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    A Parquet dataset written from a monthly GRIDMET export and a static topography export
+    """
+    csvFolder = tmp_path / 'csv'
+    csvFolder.mkdir()
+    writeCsv(csvFolder, 'cm_tmin_2000_2001_pts1.csv', ['system:index,geeID,mean,startDate',
+                                                       '0,1,270.5,2000-01-01',
+                                                       '1,2,271.5,2000-01-01',
+                                                       '2,1,280.5,2001-02-01'])
+    writeCsv(csvFolder, 's_elev_topo_pts1.csv', ['system:index,geeID,mean',
+                                                 '0,1,1500.0',
+                                                 '1,2,1600.0'])
+
+    outDir = str(tmp_path / 'parquet')
+    nRows, skipped = parquetStore.writeParquet(str(csvFolder), outDir)
+
+    assert (nRows, skipped) == (5, [])
+
+    return outDir
+
+def test_time_series_and_static_exports_are_read_back(store):
+    df = parquetStore.readParquet(store).sort_values(['dataset', 'geeID', 'startDate'], na_position = 'last')
+
+    assert list(df['dataset']) == ['GRIDMET', 'GRIDMET', 'GRIDMET', 'SRTM', 'SRTM']
+    assert list(df['metric']) == ['tmin', 'tmin', 'tmin', 'elev', 'elev']
+    assert list(df['value']) == [270.5, 280.5, 271.5, 1500.0, 1600.0]
+    assert list(df['year'].iloc[:3]) == [2000, 2001, 2000]
+    assert df['year'].iloc[3:].isnull().all()
+
+def test_dates_prune_partitions(store):
+    df = parquetStore.readParquet(store, startDate = '2001-01-01')
+
+    assert list(df['startDate']) == [datetime.date(2001, 2, 1)]
+    assert list(df['value']) == [280.5]
+
+def test_static_dataset(store):
+    df = parquetStore.readParquet(store, dataset = 'SRTM', columns = ['geeID', 'value'])
+
+    assert sorted(df['value']) == [1500.0, 1600.0]
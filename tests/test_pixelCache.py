@@ -0,0 +1,109 @@
+#####Tests of the pixel cache of the local backend
+
+import threading
+import time
+
+from geedataextract import pixelCache
+
+def point(geeID, lon, lat):
+    return {'geeID': geeID, 'type': 'Point', 'coordinates': [lon, lat]}
+
+def test_featuresKey_depends_on_the_features():
+    pts1 = [point(1, 0.0, 0.0), point(2, 1.0, 1.0)]
+
+    assert pixelCache.featuresKey(pts1) == pixelCache.featuresKey([dict(f) for f in pts1])
+    assert pixelCache.featuresKey(pts1) != pixelCache.featuresKey([point(1, 0.0, 0.0), point(2, 1.0, 2.0)])
+
+def test_getCache_creates_one_cache_for_concurrent_callers(monkeypatch):
+    Cache = pixelCache.PixelCache
+
+    class SlowCache(Cache):
+        def __init__(self):
+            time.sleep(0.01)
+            Cache.__init__(self, folder = None)
+
+    monkeypatch.setattr(pixelCache, 'PixelCache', SlowCache)
+    pixelCache.setCache(None)
+    caches = []
+
+    def get():
+        caches.append(pixelCache.getCache())
+
+    threads = [threading.Thread(target = get) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set([id(cache) for cache in caches])) == 1
+
+def test_pixel_keys_are_fetched_again_for_a_new_asset_version(ee, monkeypatch):
+    from geedataextract import extractEngine
+    from geedataextract import resultCache
+
+    #the fake serializer does not name the table assets like Earth Engine does
+    monkeypatch.setattr(resultCache, 'tableIds', lambda graph: ['users/u/pts'])
+    monkeypatch.setattr(resultCache, 'asset_d', {})
+
+    fetches = []
+
+    def info(node):
+        if node.name == 'aggregate_array':
+            fetches.append(node)
+            return [[1, 0.5, 0.5], [2, 1.5, 0.5]]
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+
+    pts1 = extractEngine.loadPts('pts', 'u')
+    image = ee.Image('USGS/SRTMGL1_003')
+
+    pixelCache.pixelKeys(pts1, image, 30)
+    pixelCache.pixelKeys(pts1, image, 30)
+    assert len(fetches) == 1
+
+    #the shapefile is uploaded again: its pixels are requested again in the next session
+    monkeypatch.setitem(ee.ASSET_INFO, 'updateTime', '2021-01-01T00:00:00Z')
+    resultCache.asset_d.clear()
+
+    assert pixelCache.pixelKeys(pts1, image, 30) == ([1, 2], [[0.5, 0.5], [1.5, 0.5]])
+    assert len(fetches) == 2
+
+def test_sharedPixels_groups_points_by_pixel():
+    ids = [1, 2, 3, 4, 5, 6]
+    pixels = [[0.5, 0.5], [1.5, 0.5], [0.5, 0.5], None, None, [1.5, 0.5]]
+
+    #the first point of each pixel represents the others; points outside the image are not grouped
+    assert pixelCache.sharedPixels(ids, pixels) == [(3, 1), (6, 2)]
+    assert pixelCache.sharedPixels([1, 2], [[0.5, 0.5], [1.5, 0.5]]) == []
+
+def test_dedupePts_filters_the_points_of_shared_pixels(ee):
+    from geedataextract import extractEngine
+
+    def info(node):
+        if node.name == 'aggregate_array':
+            return [[1, 0.5, 0.5], [2, 0.5, 0.5], [3, None, None], [4, 1.5, 0.5], [5, 1.5, 0.5]]
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+
+    pts1 = extractEngine.loadPts('pts', 'u')
+    pts, fanOut = pixelCache.dedupePts(pts1, ee.Image('IDAHO_EPSCOR/GRIDMET'), 4000)
+
+    #the points of pixels already taken are removed, the point outside the image is kept
+    assert pts.expr() == "FeatureCollection('users/u/pts').filter(Filter.inList('geeID',[2,5]).Not())"
+    assert fanOut is not None
+
+def test_dedupePts_keeps_points_in_distinct_pixels(ee):
+    from geedataextract import extractEngine
+
+    def info(node):
+        if node.name == 'aggregate_array':
+            return [[1, 0.5, 0.5], [2, 1.5, 0.5], [3, None, None], [4, None, None]]
+        return ee.defaultInfo(node)
+
+    ee.infoHook[0] = info
+
+    pts1 = extractEngine.loadPts('pts', 'u')
+
+    assert pixelCache.dedupePts(pts1, ee.Image('IDAHO_EPSCOR/GRIDMET'), 4000) == (pts1, None)
@@ -0,0 +1,95 @@
+#####Tests of the result cache with the fake ee: collecting downloaded exports
+
+import os
+import time
+
+import pytest
+
+from geedataextract import downloadData
+from geedataextract import resultCache
+
+description = 's_elev_topo_pts1'
+
+@pytest.fixture
+def cache(tmp_path):
+    resultCache.asset_d.clear()
+    yield resultCache.ResultCache(folder = str(tmp_path / 'cache'))
+    resultCache.asset_d.clear()
+
+def download(folder, name, text, mtime):
+    """
+    Writes folder/name as if it was downloaded from Drive at mtime
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    path = os.path.join(folder, name)
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+    return path
+
+def extract(cache):
+    return downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f', cache = cache)
+
+def test_tables_are_collected_once_their_task_completed(ee, cache, tmp_path):
+    folder = str(tmp_path / 'drive')
+    tasks = extract(cache)
+    download(folder, description + '.csv', 'geeID,mean\n1,1500\n', time.time() + 10)
+
+    #the stub task reports READY, then RUNNING, then COMPLETED
+    assert cache.collect(folder) == 0
+    assert cache.collect(folder) == 0
+    assert cache.collect(folder) == 1
+
+    cached = extract(cache)
+
+    assert len(ee.LOG) == 1
+    assert isinstance(cached[0], resultCache.CachedResult)
+    with open(cached[0].path) as f:
+        assert f.read() == 'geeID,mean\n1,1500\n'
+    assert cache.pending == {}
+    assert len(tasks) == 1
+
+def test_files_older_than_the_export_are_ignored(ee, cache, tmp_path):
+    folder = str(tmp_path / 'drive')
+    download(folder, description + '.csv', 'geeID,mean\n1,0\n', time.time() - 3600)
+
+    tasks = extract(cache)
+    tasks[0].states = ['COMPLETED']
+
+    assert cache.collect(folder) == 0
+    assert len(cache.pending) == 1
+
+def test_failed_exports_are_not_collected(ee, cache, tmp_path):
+    folder = str(tmp_path / 'drive')
+    tasks = extract(cache)
+    tasks[0].states = ['FAILED']
+    download(folder, description + '.csv', 'geeID,mean\n1,1500\n', time.time() + 10)
+
+    assert cache.collect(folder) == 0
+
+def test_newest_duplicate_is_collected(ee, cache, tmp_path):
+    folder = str(tmp_path / 'drive')
+    tasks = extract(cache)
+    tasks[0].states = ['COMPLETED']
+    download(folder, description + '.csv', 'geeID,mean\n1,1\n', time.time() + 10)
+    download(folder, description + ' (2).csv', 'geeID,mean\n1,3\n', time.time() + 30)
+    download(folder, description + ' (1).csv', 'geeID,mean\n1,2\n', time.time() + 20)
+
+    assert cache.collect(folder) == 1
+
+    with open(extract(cache)[0].path) as f:
+        assert f.read() == 'geeID,mean\n1,3\n'
+
+def test_scheduled_exports_record_their_task(ee, cache, tmp_path):
+    from geedataextract import taskScheduler
+
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0)
+    downloadData.GEEtopoPts('pts', ['elev'], 0, 0, 'u', 'f', cache = cache, scheduler = scheduler)
+    scheduler.wait()
+
+    folder = str(tmp_path / 'drive')
+    download(folder, description + '.csv', 'geeID,mean\n1,1500\n', time.time() + 10)
+
+    assert list(cache.pending.values())[0]['taskId'] is not None
+    assert cache.collect(folder) == 1
@@ -0,0 +1,25 @@
+#####Tests of the spatial ordering of chunks with the fake ee
+
+from geedataextract import extractEngine
+from geedataextract import spatialOrder
+
+def test_centroids_are_fetched_once_per_collection(ee):
+    def info(node):
+        if "'users/u/a'" in node.expr():
+            return [[1, 2], [[0.0, 0.0], [1.0, 1.0]]]
+        return [[3], [[5.0, 5.0]]]
+
+    ee.infoHook[0] = info
+
+    assert spatialOrder.centroids(extractEngine.loadPts('a', 'u')) == ([1, 2], [[0.0, 0.0], [1.0, 1.0]])
+    assert spatialOrder.centroids(extractEngine.loadPts('b', 'u')) == ([3], [[5.0, 5.0]])
+    assert spatialOrder.centroids(extractEngine.loadPts('a', 'u')) == ([1, 2], [[0.0, 0.0], [1.0, 1.0]])
+
+    assert ee.COUNTS['getInfo'] == 2
+
+def test_orderIds_groups_neighbours():
+    coords = [[0.0, 0.0], [50.0, 50.0], [0.001, 0.001], [50.001, 50.001]]
+
+    ordered = spatialOrder.orderIds([1, 2, 3, 4], coords, 'hilbert')
+
+    assert sorted([sorted(chunk) for chunk in spatialOrder.splitIds(ordered, 2)]) == [[1, 3], [2, 4]]
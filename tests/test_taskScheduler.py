@@ -0,0 +1,105 @@
+#####Tests of the export task scheduler, with stub tasks
+
+from geedataextract import taskScheduler
+
+from tests.fakeEE import StubTask
+
+def factory(*taskArgs):
+    """
+    Returns a makeTask function returning a new StubTask for every call, made with the successive
+    keyword arguments of taskArgs (the last ones repeated), and the list of tasks it made
+    """
+    made = []
+
+    def makeTask():
+        kwargs = taskArgs[min(len(made), len(taskArgs) - 1)]
+        made.append(StubTask({'description': 'job'}, **kwargs))
+        return made[-1]
+
+    return makeTask, made
+
+def test_at_most_maxRunning_tasks_are_started():
+    scheduler = taskScheduler.TaskScheduler(maxRunning = 2, pollInterval = 0)
+
+    handles = [scheduler.submit('job' + str(i), factory({})[0]) for i in range(5)]
+
+    assert [h.state for h in handles] == ['READY', 'READY', 'QUEUED', 'QUEUED', 'QUEUED']
+
+    states = scheduler.wait()
+
+    assert set(states.values()) == set(['COMPLETED'])
+    assert all([h.attempts == 1 for h in handles])
+
+def test_transient_failures_are_restarted():
+    makeTask, made = factory({'states': ['RUNNING', 'FAILED'], 'errorMessage': 'Internal error'}, {})
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0, retries = 2)
+
+    handle = scheduler.submit('job', makeTask)
+    scheduler.wait()
+
+    assert handle.state == 'COMPLETED'
+    assert handle.attempts == 2
+    assert len(made) == 2
+
+def test_transient_failures_stop_after_retries():
+    makeTask, made = factory({'states': ['FAILED'], 'errorMessage': 'Backend error'})
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0, retries = 2)
+
+    handle = scheduler.submit('job', makeTask)
+    scheduler.wait()
+
+    assert handle.state == 'FAILED'
+    assert handle.attempts == 3
+
+def test_other_failures_are_not_restarted():
+    makeTask, made = factory({'states': ['FAILED'], 'errorMessage': 'Collection.reduceRegions: bad band'})
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0)
+
+    handle = scheduler.submit('job', makeTask)
+    scheduler.wait()
+
+    assert handle.state == 'FAILED'
+    assert handle.attempts == 1
+    assert handle.error == 'Collection.reduceRegions: bad band'
+
+def test_callback_follows_states():
+    seen = []
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0)
+
+    scheduler.submit('job', factory({})[0], callback = lambda h: seen.append(h.state))
+    scheduler.wait()
+
+    assert seen == ['READY', 'RUNNING', 'COMPLETED']
+
+def test_transient_start_errors_stop_after_retries():
+    makeTask, made = factory({'startError': 'Too many tasks already in the queue'})
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0, retries = 2)
+
+    handle = scheduler.submit('job', makeTask)
+    assert handle.state == 'QUEUED'
+
+    scheduler.wait(timeout = 5)
+
+    assert handle.state == 'FAILED'
+    assert handle.startErrors == 3
+    assert handle.attempts == 0
+    assert len(made) == 3
+
+def test_transient_start_errors_are_tried_again():
+    makeTask, made = factory({'startError': 'Service unavailable'}, {})
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0, retries = 2)
+
+    handle = scheduler.submit('job', makeTask)
+    scheduler.wait(timeout = 5)
+
+    assert handle.state == 'COMPLETED'
+    assert (handle.startErrors, handle.attempts) == (1, 1)
+
+def test_other_start_errors_fail_at_once():
+    makeTask, made = factory({'startError': 'Invalid argument: description'})
+    scheduler = taskScheduler.TaskScheduler(pollInterval = 0)
+
+    handle = scheduler.submit('job', makeTask)
+
+    assert handle.state == 'FAILED'
+    assert len(made) == 1
@@ -0,0 +1,115 @@
+#####Tests of zonalStats with small hand-computed rasters
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from geedataextract import localBackend
+from geedataextract import zonalStats
+
+def raster(data, nodata = None):
+    """
+    Raster in projected units with 1 x 1 pixels, upper left corner at (0, 5): the centre of pixel
+    (row, col) is (col + 0.5, 4.5 - row)
+    """
+    return localBackend.Raster(np.asarray(data, dtype = float), [0, 1, 5, -1], None, nodata, False)
+
+def square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+def polygon(*rings):
+    return {'geeID': '0', 'type': 'Polygon', 'coordinates': list(rings)}
+
+def point(x, y):
+    return {'geeID': '0', 'type': 'Point', 'coordinates': [x, y]}
+
+def pixels(feature, buf = 0, poly = 1, subsamples = None):
+    rows, cols, weights = zonalStats.featurePixels(raster(np.zeros((5, 5))), feature, buf, poly, subsamples)
+    return sorted(zip(rows.tolist(), cols.tolist(), weights.tolist()))
+
+def test_polygon_pixels_by_centre():
+    assert pixels(polygon(square(0, 3, 2, 5))) == [(0, 0, 1.0), (0, 1, 1.0), (1, 0, 1.0), (1, 1, 1.0)]
+
+def test_polygon_hole_is_left_out():
+    cells = pixels(polygon(square(0, 2, 3, 5), square(1, 3, 2, 4)))
+
+    assert len(cells) == 8
+    assert (1, 1, 1.0) not in cells
+
+def test_buffer_pixels():
+    #pixel centres within 1 of (2.5, 2.5): the pixel of the point and its 4 neighbours
+    assert pixels(point(2.5, 2.5), buf = 1, poly = 0) == [(1, 2, 1.0), (2, 1, 1.0), (2, 2, 1.0),
+                                                          (2, 3, 1.0), (3, 2, 1.0)]
+    #a buffer smaller than a pixel gives the pixel of the point
+    assert pixels(point(2.2, 2.7), buf = 0.3, poly = 0) == [(2, 2, 1.0)]
+
+def test_subsamples_weight_partly_covered_pixels():
+    #half of pixel (0, 1) is inside
+    assert pixels(polygon(square(0, 4, 1.5, 5)), subsamples = 2) == [(0, 0, 1.0), (0, 1, 0.5)]
+
+def test_weighted_mean_and_sum():
+    image = raster(np.arange(25).reshape(5, 5))
+    table = zonalStats.buildTable(image, [polygon(square(0, 4, 1.5, 5))], 0, 1, subsamples = 2)
+
+    #values 0 (weight 1) and 1 (weight 0.5)
+    assert zonalStats.reduceImage(image, table, 'mean')[0] == pytest.approx(0.5 / 1.5)
+    assert zonalStats.reduceImage(image, table, 'sum')[0] == pytest.approx(0.5)
+
+def test_missing_pixels_are_ignored():
+    image = raster([[-1, 4, 8], [-1, -1, -1], [0, 0, 0]], nodata = -1)
+    #the first row (one missing pixel), and the second row (only missing pixels)
+    pts1 = [polygon(square(0, 4, 3, 5)), polygon(square(0, 3, 3, 4))]
+
+    table = zonalStats.buildTable(image, pts1, 0, 1)
+
+    mean = zonalStats.reduceImage(image, table, 'mean')
+    total = zonalStats.reduceImage(image, table, 'sum')
+    assert mean[0] == 6.0 and total[0] == 12.0
+    #only missing pixels: NaN, and None for frequencyHistogram
+    assert np.isnan(mean[1]) and np.isnan(total[1])
+    assert zonalStats.reduceImage(image, table, 'frequencyHistogram') == [{4.0: 1.0, 8.0: 1.0}, None]
+
+def classTable(data):
+    image = raster(data)
+    return image, zonalStats.buildTable(image, [polygon(square(0, 3, 3, 5))], 0, 1)
+
+def test_mode_of_class_codes():
+    #class codes in the first two rows: 3 x 11, 3 x 21 (tie: the smallest class)
+    image, table = classTable([[11, 11, 21], [21, 11, 21], [0, 0, 0]])
+
+    assert zonalStats.reduceImage(image, table, 'mode')[0] == 11.0
+
+    image, table = classTable([[11, 21, 21], [21, 11, 41], [0, 0, 0]])
+    assert zonalStats.reduceImage(image, table, 'mode')[0] == 21.0
+
+def test_mode_of_other_values_is_counted_by_sorting():
+    #non-integer values, and integers too far apart for one count per class
+    image, table = classTable([[0.5, 0.25, 0.5], [0.25, 0.5, 0.75], [0, 0, 0]])
+    assert zonalStats.classValues(image.values(table.rows, table.cols), np.ones(6, bool)) is None
+    assert zonalStats.reduceImage(image, table, 'mode')[0] == 0.5
+
+    image, table = classTable([[1, 1000, 1000], [1, 1000, 5], [0, 0, 0]])
+    assert zonalStats.reduceImage(image, table, 'mode')[0] == 1000.0
+
+def test_frequencyHistogram():
+    image, table = classTable([[11, 11, 21], [21, 11, 41], [0, 0, 0]])
+    assert zonalStats.reduceImage(image, table, 'frequencyHistogram') == [{11.0: 3.0, 21.0: 2.0, 41.0: 1.0}]
+
+    image, table = classTable([[0.5, 0.5, 2.5], [0.5, 0.5, 0.5], [0, 0, 0]])
+    assert zonalStats.reduceImage(image, table, 'frequencyHistogram') == [{0.5: 5.0, 2.5: 1.0}]
+
+def test_stack_is_streamed_in_blocks():
+    stack = raster(np.arange(7).reshape(7, 1, 1) * np.ones((7, 5, 5)) + np.arange(25).reshape(1, 5, 5))
+    pts1 = [polygon(square(0, 3, 2, 5)), point(4.5, 0.5)]
+    table = zonalStats.buildTable(stack, pts1, 0, 1)
+
+    blocks = list(zonalStats.iterBlocks(stack, table, 'mean', timeBlock = 3))
+
+    assert [t0 for t0, block in blocks] == [0, 3, 6]
+    #mean of pixels 0, 1, 5, 6 and value of pixel 24, plus the time step
+    expected = np.array([[3.0 + t, 24.0 + t] for t in range(7)])
+    assert np.allclose(np.concatenate([block for t0, block in blocks]), expected)
+
+    #a budget of one time step gives the same result
+    assert np.allclose(zonalStats.reduceStack(stack, table, 'mean', memoryBudget = 1), expected)
+    assert zonalStats.blockSize(table, memoryBudget = 1) == 1